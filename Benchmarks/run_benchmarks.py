@@ -0,0 +1,203 @@
+# run_benchmarks.py
+# Mesure du passage à l'échelle du pipeline sur données synthétiques
+#   python Benchmarks/run_benchmarks.py                              -> échelles par défaut
+#   python Benchmarks/run_benchmarks.py --scales 50x20 200x40        -> N piézomètres x Y ans
+#   python Benchmarks/run_benchmarks.py --compare ancien.json        -> écarts avec un run précédent
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(ROOT)
+from Pipeline.dag import Pipeline, Stage
+from run_pipeline import STAGES
+
+# Étapes mesurées (dans l'ordre du pipeline) ; les étapes de téléchargement sont remplacées par le générateur
+BENCH_STAGES = ['associations', 'combinaison', 'nettoyage', 'valeurs_aberrantes', 'normalisation', 'lags',
+                'stats_descriptives', 'correlation_croisee', 'granger', 'chi2', 'clustering']
+
+DEFAULT_SCALES = ['5x10', '20x20', '100x40']
+
+# Onglets du tableau de bord dont on mesure le temps de réponse
+APP_TABS = ['gene-visual', 'stats-descriptives', 'granger-tests', 'chi2-tests', 'cross-corr', 'clustering']
+APP_PIEZOMETRES = 5
+
+# Objectif de démarrage à froid de l'application (création + premier affichage de la page), en ms :
+# il ne doit pas croître avec la taille des résultats
+COLD_START_TARGET_MS = float(os.environ.get('COLD_START_TARGET_MS', 500))
+
+
+def parse_scale(scale):
+    n_piezometres, n_years = scale.lower().split('x')
+    return int(n_piezometres), int(n_years)
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _isolated(func, *args):
+    """
+    Exécute `func` dans un processus neuf : le processus principal reste léger (sans pandas), car
+    la mémoire maximale mesurée pour un script hérite de celle du processus qui l'a lancé.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(func, *args).result()
+
+
+def generate(directory, n_piezometres, n_years, seed):
+    from synthetic import write_dataset
+    return write_dataset(directory, n_piezometres, n_years, seed)
+
+
+def bench_pipeline(workspace, stages):
+    """Exécute les étapes depuis l'espace de travail ; mesures du DAG (temps, CPU, mémoire max par processus)."""
+    selected = [stage for stage in STAGES if stage.name in stages]
+    absolute = [Stage(s.name, os.path.join(ROOT, s.script), s.cwd, s.inputs, s.outputs) for s in selected]
+    pipeline = Pipeline(absolute, root=workspace, state_file='.bench_state.json')
+    return pipeline.run([s.name for s in absolute], force=True, jobs=1, with_deps=False)
+
+
+def bench_app(workspace, tabs=APP_TABS, n_piezometres=APP_PIEZOMETRES):
+    """
+    Démarrage à froid (import, création de l'application, premier affichage de la page) et temps de
+    réponse de render_tab_content (ms) par onglet, sur les données de l'espace de travail.
+    """
+    start = time.perf_counter()
+    import app
+    from Dashboard import figures
+    import_ms = (time.perf_counter() - start) * 1000
+
+    figures.DATA_PATH = os.path.join(workspace, 'data', 'data_cleaned_outliers')
+    figures._load_piezometre.cache_clear()
+    start = time.perf_counter()
+    dash_app = app.create_app(os.path.join(workspace, 'assets'))
+    create_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    app.serve_layout(dash_app.asset_index)
+    first_layout_ms = (time.perf_counter() - start) * 1000
+    cold_start_ms = create_ms + first_layout_ms
+
+    piezometres = dash_app.asset_index.piezometres[:n_piezometres]
+    latencies = {}
+    for tab in tabs:
+        timings = []
+        for piezometre in piezometres:
+            start = time.perf_counter()
+            app.render_tab_content(dash_app.asset_index, tab, piezometre)
+            timings.append((time.perf_counter() - start) * 1000)
+        if timings:
+            latencies[tab] = {
+                'median_ms': round(statistics.median(timings), 2),
+                'max_ms': round(max(timings), 2),
+            }
+    return {
+        'import_ms': round(import_ms, 2),
+        'create_app_ms': round(create_ms, 2),
+        'first_layout_ms': round(first_layout_ms, 2),
+        'cold_start_ms': round(cold_start_ms, 2),
+        'cold_start_ok': cold_start_ms <= COLD_START_TARGET_MS,
+        'tabs': latencies,
+        'peak_memory_mb': _peak_rss_mb(),
+    }
+
+
+def bench_scale(scale, seed, stages, keep=False):
+    n_piezometres, n_years = parse_scale(scale)
+    workspace = tempfile.mkdtemp(prefix=f'bench_{scale}_')
+    os.makedirs(os.path.join(workspace, 'data'))
+    os.makedirs(os.path.join(workspace, 'assets'))
+    try:
+        start = time.perf_counter()
+        n_rows = _isolated(generate, os.path.join(workspace, 'data'), n_piezometres, n_years, seed)
+        generation_s = round(time.perf_counter() - start, 3)
+        print(f"\n=== {scale} : {n_piezometres} piézomètres x {n_years} ans, {n_rows} mesures ({generation_s} s) ===")
+
+        metrics = bench_pipeline(workspace, stages)
+        for result in metrics:
+            wall = result['wall_time_s']
+            result['rows_per_s'] = round(n_rows / wall) if wall else None
+        return {
+            'scale': scale,
+            'piezometres': n_piezometres,
+            'years': n_years,
+            'rows': n_rows,
+            'generation_s': generation_s,
+            'stages': metrics,
+            'app': _isolated(bench_app, workspace),
+        }
+    finally:
+        if keep:
+            print(f"Espace de travail conservé : {workspace}")
+        else:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """Affiche le rapport des temps (courant / précédent) par échelle et par étape."""
+    before = {(r['scale'], s['stage']): s['wall_time_s'] for r in previous['results'] for s in r['stages']}
+    print(f"\nComparaison avec {previous.get('commit')} (rapport > 1 : plus lent) :")
+    for result in current['results']:
+        for stage in result['stages']:
+            old = before.get((result['scale'], stage['stage']))
+            if old:
+                print(f"{result['scale']:>8} {stage['stage']:<22} {old:>8} s -> {stage['wall_time_s']:>8} s  "
+                      f"x{stage['wall_time_s'] / old:.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks du pipeline sur données synthétiques.")
+    parser.add_argument('--scales', nargs='+', default=DEFAULT_SCALES, help="Échelles NxY (piézomètres x années).")
+    parser.add_argument('--seed', type=int, default=0, help="Graine du générateur.")
+    parser.add_argument('--stages', nargs='+', default=BENCH_STAGES, help="Étapes mesurées.")
+    parser.add_argument('--output', default='benchmark_results.json', help="Fichier JSON des résultats.")
+    parser.add_argument('--compare', help="Fichier JSON d'un run précédent à comparer.")
+    parser.add_argument('--keep', action='store_true', help="Conserver les espaces de travail générés.")
+    args = parser.parse_args()
+
+    # Mesurer le calcul réel : pas de cache de résultats, figures rendues sans affichage
+    os.environ['RESULT_CACHE'] = '0'
+    os.environ['MPLBACKEND'] = 'Agg'
+
+    report = {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'results': [bench_scale(scale, args.seed, args.stages, args.keep) for scale in args.scales],
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nRésultats sauvegardés dans '{args.output}'.")
+
+    for result in report['results']:
+        for stage in result['stages']:
+            print(f"{result['scale']:>8} {stage['stage']:<22} {stage['wall_time_s']:>8} s  "
+                  f"{stage['rows_per_s']} lignes/s  mémoire max {stage['peak_memory_mb']} Mo")
+        app_metrics = result['app']
+        print(f"{result['scale']:>8} {'démarrage application':<22} {app_metrics['cold_start_ms']:>8} ms  "
+              f"(objectif {COLD_START_TARGET_MS:g} ms : {'atteint' if app_metrics['cold_start_ok'] else 'DÉPASSÉ'})")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
@@ -0,0 +1,144 @@
+# synthetic.py
+# Générateur de données synthétiques (piézomètres, stations météo, chroniques) à échelle configurable
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+# Emprise approximative de l'Hérault (degrés)
+LAT_RANGE = (43.2, 43.9)
+LON_RANGE = (2.6, 4.2)
+
+# Dernier jour des chroniques générées
+END_DATE = '2024-12-31'
+
+# Nombre de piézomètres par station météo
+PIEZOMETRES_PAR_STATION = 4
+
+
+def _stations(n_stations, rng):
+    return pd.DataFrame({
+        'Id_station': 34000000 + np.arange(n_stations),
+        'Id_omm': np.nan,
+        'Nom_usuel': [f'STATION_{i:04d}' for i in range(n_stations)],
+        'Latitude': rng.uniform(*LAT_RANGE, n_stations).round(6),
+        'Longitude': rng.uniform(*LON_RANGE, n_stations).round(6),
+        'Altitude': rng.integers(0, 900, n_stations),
+        'Date_ouverture': '1950-01-01',
+        'Pack': 'ETENDU',
+    })
+
+
+def _meteo(stations, dates, rng):
+    """Pluie journalière (jours de pluie plus fréquents en automne-hiver) et températures saisonnières."""
+    n, days = len(stations), len(dates)
+    season = np.cos(2 * np.pi * (dates.dayofyear.to_numpy() - 15) / 365.25)
+    p_wet = 0.22 + 0.1 * season
+    wet = rng.random((n, days)) < p_wet
+    rr = np.where(wet, rng.gamma(0.7, 9.0, (n, days)), 0.0).round(1)
+    tx = (21 - 9 * season + rng.normal(0, 3, (n, days))).round(1)
+    tn = (tx - 9 - np.abs(rng.normal(0, 2.5, (n, days)))).round(1)
+    frame = pd.DataFrame({
+        'station_name': np.repeat(stations['Nom_usuel'].to_numpy(), days),
+        'DATE': np.tile(dates.strftime('%Y-%m-%d'), n),
+        'RR': rr.ravel(),
+        'TX': tx.ravel(),
+        'TN': tn.ravel(),
+        'TM': ((tx + tn) / 2).round(1).ravel(),
+    })
+    # Quelques valeurs manquantes, comme dans les archives Météo-France
+    for col in ['RR', 'TX', 'TN', 'TM']:
+        frame.loc[rng.random(len(frame)) < 0.005, col] = np.nan
+    return frame, rr
+
+
+def _levels(rr, station_of, dates, rng):
+    """
+    Niveaux journaliers : recharge par la pluie (réponse retardée et amortie, propre à chaque
+    nappe), vidange saisonnière et bruit de mesure.
+    """
+    n, days = len(station_of), len(dates)
+    delay = rng.integers(1, 60, n)
+    decay = rng.uniform(0.95, 0.995, n)
+    gain = rng.uniform(0.002, 0.02, n)
+    base = rng.uniform(5, 150, n)
+    season = np.sin(2 * np.pi * dates.dayofyear.to_numpy() / 365.25)
+    levels = np.empty((n, days))
+    for i in range(n):
+        rain = np.roll(rr[station_of[i]], delay[i])
+        rain[:delay[i]] = 0.0
+        recharge = lfilter([gain[i]], [1.0, -decay[i]], rain)
+        levels[i] = base[i] + recharge - recharge.mean() - 0.8 * season + rng.normal(0, 0.03, days)
+    return levels.round(2), base
+
+
+def _gaps(n, days, n_years, rng):
+    """Masque des jours mesurés : début décalé, périodes sans mesure et jours manquants isolés."""
+    mask = rng.random((n, days)) > 0.02
+    start = rng.integers(0, max(days // 10, 1), n)
+    mask[np.arange(days)[None, :] < start[:, None]] = False
+    for i in range(n):
+        for _ in range(rng.poisson(max(n_years / 4, 1))):
+            begin = rng.integers(0, days)
+            mask[i, begin:begin + rng.integers(5, 120)] = False
+    return mask
+
+
+def generate(n_piezometres, n_years, seed=0):
+    """
+    Jeux de données aux formats du dépôt pour `n_piezometres` sur `n_years` ans :
+    'stations_meteo', 'selected_piezometres', 'chroniques_piezo' et 'filtered_stations'.
+    Chaque piézomètre est placé à moins de 5 km d'une station (association garantie).
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=END_DATE, periods=int(round(n_years * 365.25)), freq='D')
+    n_stations = max(1, -(-n_piezometres // PIEZOMETRES_PAR_STATION))
+    stations = _stations(n_stations, rng)
+    meteo, rr = _meteo(stations, dates, rng)
+
+    station_of = rng.integers(0, n_stations, n_piezometres)
+    # Décalage d'au plus ~3 km en latitude et en longitude
+    lat = stations['Latitude'].to_numpy()[station_of] + rng.uniform(-0.027, 0.027, n_piezometres)
+    lon = stations['Longitude'].to_numpy()[station_of] + rng.uniform(-0.037, 0.037, n_piezometres)
+    codes = [f'{9000 + i // 100:05d}X{i % 100:04d}/SYN' for i in range(n_piezometres)]
+    names = [f'PIEZO {i:04d}' for i in range(n_piezometres)]
+
+    levels, base = _levels(rr, station_of, dates, rng)
+    mask = _gaps(n_piezometres, len(dates), n_years, rng)
+    rows, cols = np.nonzero(mask)
+    chroniques = pd.DataFrame({
+        'code_bss': np.asarray(codes)[rows],
+        'date_mesure': dates.strftime('%Y-%m-%d').to_numpy()[cols],
+        'niveau_nappe_eau': levels[rows, cols],
+        'profondeur_nappe': (base[rows] + 10 - levels[rows, cols]).round(2),
+        'nom_piezo': np.asarray(names)[rows],
+    })
+
+    first = np.argmax(mask, axis=1)
+    last = len(dates) - 1 - np.argmax(mask[:, ::-1], axis=1)
+    piezometres = pd.DataFrame({
+        'code_bss': codes,
+        'nom_departement': 'Hérault',
+        'libelle_pe': names,
+        'nom_commune': 'Synthétique',
+        'x': lon,
+        'y': lat,
+        'noms_masse_eau_edl': 'Synthétique',
+        'nb_mesures_piezo': mask.sum(axis=1),
+        'date_debut_mesure': dates[first].strftime('%Y-%m-%d'),
+        'date_fin_mesure': dates[last].strftime('%Y-%m-%d'),
+        'date_maj': '',
+    })
+    return {
+        'stations_meteo': stations,
+        'selected_piezometres': piezometres,
+        'chroniques_piezo': chroniques,
+        'filtered_stations': meteo,
+    }
+
+
+def write_dataset(directory, n_piezometres, n_years, seed=0):
+    """Écrit les fichiers d'entrée du pipeline dans `directory` ; retourne le nombre de mesures générées."""
+    frames = generate(n_piezometres, n_years, seed)
+    for name, frame in frames.items():
+        frame.to_csv(f'{directory}/{name}.csv', index=False)
+    return len(frames['chroniques_piezo'])
@@ -0,0 +1,148 @@
+# figures.py
+# Figures Plotly générées à la demande à partir des données nettoyées (remplace les fichiers HTML)
+import os
+import sys
+from functools import lru_cache
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Dashboard.lttb import downsample
+from Pipeline.storage import csv_path, parquet_path, read_table
+
+# Données nettoyées lues par le tableau de bord
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'data_cleaned_outliers')
+
+# Nombre maximal de points envoyés au navigateur par série (≈ 2 points par pixel d'un graphe pleine largeur)
+POINT_BUDGET = 2000
+
+# Séries temporelles affichées : colonne -> (titre, libellé de l'axe)
+TIME_SERIES = {
+    'niveau_nappe_eau': ("Évolution temporelle du niveau des nappes", 'Niveau des nappes (mètre NGF)'),
+    'RR': ("Évolution temporelle des précipitations (RR)", 'Précipitations (mm)'),
+}
+
+COLUMNS = ['nom_piezo', 'date_mesure', 'niveau_nappe_eau', 'RR', 'TX', 'TN', 'type_averse', 'niveau_categorise']
+
+
+def data_version():
+    """Date de modification des données nettoyées (Parquet, sinon CSV) ; None si elles n'existent pas."""
+    for path in (parquet_path(DATA_PATH), csv_path(DATA_PATH)):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+    return None
+
+
+def load_piezometre(piezometre):
+    """Données d'un piézomètre triées par date (seules les colonnes et lignes utiles sont lues)."""
+    # La version fait partie de la clé du cache : des données réécrites sont relues
+    return _load_piezometre(piezometre, data_version())
+
+
+@lru_cache(maxsize=32)
+def _load_piezometre(piezometre, version):
+    data = read_table(DATA_PATH, columns=COLUMNS, filters=[('nom_piezo', '==', piezometre)])
+    data['date_mesure'] = pd.to_datetime(data['date_mesure'])
+    return data.sort_values(by='date_mesure').reset_index(drop=True)
+
+
+def time_series_figure(piezometre, column, x_range=None, budget=POINT_BUDGET):
+    """
+    Série temporelle sous-échantillonnée par LTTB à `budget` points. Avec `x_range`
+    (bornes de la fenêtre zoomée), seule la fenêtre est rééchantillonnée, donc plus finement.
+    """
+    data = load_piezometre(piezometre)
+    if x_range is not None:
+        start, end = pd.to_datetime(x_range[0]), pd.to_datetime(x_range[1])
+        data = data[(data['date_mesure'] >= start) & (data['date_mesure'] <= end)]
+    dates, values = downsample(data['date_mesure'].to_numpy(), data[column].to_numpy(), budget)
+
+    title, label = TIME_SERIES[column]
+    fig = go.Figure(go.Scattergl(x=dates, y=values, mode='lines', name=column))
+    fig.update_layout(
+        title=f"{title}<br>(Piézomètre : {piezometre})",
+        xaxis_title='Date de mesure',
+        yaxis_title=label,
+        template="plotly_white",
+        uirevision=f"{piezometre}-{column}",
+    )
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
+    return fig
+
+
+def boxplot_rr_figure(piezometre):
+    """Boîtes à moustaches de RR par type d'averse, à partir des quartiles calculés côté serveur."""
+    data = load_piezometre(piezometre)
+    fig = go.Figure()
+    for type_averse, rr in data.groupby('type_averse', observed=True)['RR']:
+        q1, median, q3 = rr.quantile([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        fig.add_trace(go.Box(
+            name=str(type_averse), q1=[q1], median=[median], q3=[q3],
+            lowerfence=[rr[rr >= q1 - 1.5 * iqr].min()], upperfence=[rr[rr <= q3 + 1.5 * iqr].max()],
+        ))
+    fig.update_layout(
+        title=f"Répartition des précipitations (RR) par type d'averse<br>(Piézomètre : {piezometre})",
+        xaxis_title="Type d'averse", yaxis_title='Précipitations (mm)',
+        template="plotly_white", showlegend=False,
+    )
+    return fig
+
+
+def stacked_categories_figure(piezometre):
+    data = load_piezometre(piezometre)
+    stacked_counts = pd.crosstab(data['type_averse'], data['niveau_categorise'])
+    fig = go.Figure()
+    for niveau in stacked_counts.columns:
+        fig.add_trace(go.Bar(name=str(niveau), x=stacked_counts.index.astype(str), y=stacked_counts[niveau]))
+    fig.update_layout(
+        barmode='stack',
+        title=f"Proportion des niveaux par type d'averse<br>(Piézomètre : {piezometre})",
+        xaxis_title="Type d'averse",
+        yaxis_title="Nombre d'observations",
+        template="plotly_white"
+    )
+    return fig
+
+
+def correlation_matrix_figure(piezometre):
+    data = load_piezometre(piezometre)
+    corr_matrix = data[['niveau_nappe_eau', 'RR', 'TX', 'TN']].corr(method='spearman')
+    return px.imshow(
+        corr_matrix,
+        text_auto=True,
+        color_continuous_scale='viridis',
+        title=f"Matrice de corrélation (Spearman)<br>(Piézomètre : {piezometre})",
+        labels={'color': 'Corrélation'}
+    )
+
+
+def relayout_range(relayout_data):
+    """Fenêtre zoomée extraite de relayoutData ; None pour un retour à la vue complète."""
+    if not relayout_data or 'xaxis.autorange' in relayout_data:
+        return None
+    if 'xaxis.range[0]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'])
+    return None
+
+
+def correlogram_figure(piezometre, records):
+    """Corrélogramme (Spearman et Pearson en fonction du lag) à partir des lignes de lag_correlogram.csv."""
+    data = pd.DataFrame(records).sort_values(by='lag')
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=data['lag'], y=data['spearman'], mode='lines+markers', name='Spearman'))
+    fig.add_trace(go.Scatter(x=data['lag'], y=data['pearson'], mode='lines+markers', name='Pearson'))
+    fig.update_layout(
+        title=f"Corrélation entre précipitations décalées et niveau des nappes<br>(Piézomètre : {piezometre})",
+        xaxis_title='Décalage (jours)',
+        yaxis_title='Corrélation',
+        template="plotly_white"
+    )
+    return fig
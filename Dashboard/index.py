@@ -0,0 +1,172 @@
+# index.py
+# Index en mémoire des graphiques et résultats du tableau de bord, par piézomètre et type d'analyse
+import os
+import re
+import threading
+
+import pandas as pd
+
+
+# Fonction pour normaliser les noms de fichiers
+def normalize_filename(name):
+    """Remplace les espaces et caractères spéciaux par des underscores."""
+    return name.replace(" ", "_").replace("-", "_").replace("/", "_").replace("(", "").replace(")", "")
+
+
+# Types d'averse utilisés en suffixe des nuages de points de Tests/test_corrélation.py
+TYPES_AVERSE = ["légère/nulle", "modérée", "forte", "très forte"]
+_AVERSE_SUFFIXES = '|'.join(re.escape(normalize_filename(t)) for t in TYPES_AVERSE)
+
+# Graphiques par onglet : (dossier sous assets/, motif du nom de fichier)
+# Le groupe 'piezo' du motif donne le piézomètre ; 'lag' est conservé s'il existe
+ASSET_PATTERNS = {
+    'gene-visual': ('visualizations',
+                    r'^(?:boxplot_rr|temporal_rr|temporal_niveau|stacked_categories|correlation_matrix)_'
+                    r'(?P<piezo>.+?)\.(?:html|png)$'),
+    'clustering': ('clustering', r'^(?:elbow_plot|cluster_plot)_(?P<piezo>.+)\.png$'),
+    'clustering-lags': ('clustering_lags', r'^clustering_(?P<piezo>.+)_lag(?P<lag>\d+)\.png$'),
+    'cross-corr': ('cross_correlation', r'^cross_correlation_(?P<piezo>.+)\.png$'),
+    'corr-matrices': ('correlation_matrices', r'^correlation_matrix_(?P<piezo>.+)_lag(?P<lag>\d+)\.html$'),
+    'chi2-tests': ('chi2_visualizations', r'^chi2_(?P<piezo>.+)\.png$'),
+    'corr-lags': ('corr_lag_visualizations', r'^(?:scatter|temporal)_(?P<piezo>.+)_lag(?P<lag>\d+)\.png$'),
+    'correlation-tests': ('correlation_visualizations', rf'^scatter_(?P<piezo>.+?)_(?:{_AVERSE_SUFFIXES})\.png$'),
+}
+
+# Tables de résultats : (chemin sous assets/, colonne contenant le piézomètre)
+RESULT_TABLES = {
+    'stats': ('stats_descriptives.csv', 'nom_piezo'),
+    'granger': ('granger_results.csv', 'nom_piezo'),
+    'chi2': ('chi2_results.csv', 'piezometre'),
+    'correlation': (os.path.join('correlation_visualizations', 'correlation_results.csv'), 'piezometre'),
+    'correlogram': ('lag_correlogram.csv', 'nom_piezo'),
+}
+
+# Tables lues par chaque onglet (en plus de son dossier de graphiques)
+TAB_TABLES = {
+    'stats-descriptives': ['stats'],
+    'correlation-tests': ['correlation'],
+    'granger-tests': ['granger'],
+    'corr-lags': ['correlogram'],
+}
+
+
+class AssetIndex:
+    """
+    Index chargé à la demande : chaque dossier de graphiques et chaque CSV de résultats est lu au
+    premier accès, puis relu uniquement si sa date de modification change (rechargement à chaud).
+    La construction ne lit aucun fichier : le démarrage de l'application ne dépend pas de la taille
+    des résultats. Le chargement est protégé par un verrou ; une entrée est remplacée en un bloc,
+    les callbacks voient l'ancienne ou la nouvelle version, jamais un mélange.
+    graph_paths(onglet, piézomètre) -> liste de chemins ; frame(table, piézomètre) -> DataFrame.
+    """
+
+    def __init__(self, assets_dir='assets', url_prefix='/assets'):
+        self.assets_dir = assets_dir
+        self.url_prefix = url_prefix.rstrip('/')
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _mtime(path):
+        """Date de modification (un fichier ajouté modifie celle du dossier) ; None si le chemin n'existe pas."""
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self, key, path, loader):
+        # Date relevée avant la lecture : un fichier réécrit pendant le chargement sera relu au prochain accès
+        mtime = self._mtime(path)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != mtime:
+                entry = (mtime, loader(path))
+                self._entries[key] = entry
+        return entry[1]
+
+    def _graphs(self, tab):
+        folder, pattern = ASSET_PATTERNS[tab]
+        return self._load(('graphs', tab), os.path.join(self.assets_dir, folder),
+                          lambda path: self._index_folder(folder, pattern))
+
+    def _table(self, name):
+        path, column = RESULT_TABLES[name]
+        return self._load(('table', name), os.path.join(self.assets_dir, path),
+                          lambda path: self._index_table(path, column))
+
+    def refresh(self, force=False):
+        """Charge (ou recharge si modifié) tous les dossiers et tables, par exemple pour préchauffer un worker."""
+        if force:
+            with self._lock:
+                self._entries.clear()
+        for tab in ASSET_PATTERNS:
+            self._graphs(tab)
+        for name in RESULT_TABLES:
+            self._table(name)
+
+    def version(self, tab=None):
+        """
+        Dates de modification des dossiers et tables indexés (ou seulement de ceux lus par l'onglet `tab`) :
+        change dès qu'un résultat est réécrit.
+        """
+        folders = ASSET_PATTERNS.values() if tab is None else [ASSET_PATTERNS[tab]] if tab in ASSET_PATTERNS else []
+        tables = RESULT_TABLES if tab is None else TAB_TABLES.get(tab, [])
+        paths = [os.path.join(self.assets_dir, folder) for folder, _ in folders]
+        paths += [os.path.join(self.assets_dir, RESULT_TABLES[name][0]) for name in tables]
+        return tuple(self._mtime(path) for path in paths)
+
+    @property
+    def piezometres(self):
+        """Piézomètres listés dans les statistiques descriptives."""
+        return self._table('stats')[2]
+
+    def _index_folder(self, folder, pattern):
+        index = {}
+        directory = os.path.join(self.assets_dir, folder)
+        if not os.path.isdir(directory):
+            return index
+        regex = re.compile(pattern)
+        for file in sorted(os.listdir(directory)):
+            match = regex.match(file)
+            if match:
+                key = normalize_filename(match.group('piezo'))
+                index.setdefault(key, []).append({
+                    'path': f"{self.url_prefix}/{folder}/{file}",
+                    'lag': match.groupdict().get('lag'),
+                })
+        return index
+
+    @staticmethod
+    def _index_table(path, column):
+        """Regroupe un CSV de résultats par piézomètre : {piézomètre normalisé: DataFrame}."""
+        if not os.path.exists(path):
+            return {}, [], []
+        data = pd.read_csv(path)
+        if column not in data.columns:
+            return {}, list(data.columns), []
+        keys = data[column].astype(str).map(normalize_filename)
+        grouped = {key: part.reset_index(drop=True) for key, part in data.groupby(keys, sort=False)}
+        return grouped, list(data.columns), list(data[column].astype(str).unique())
+
+    def graph_paths(self, tab, piezometre):
+        """Chemins des graphiques d'un onglet pour un piézomètre (recherche exacte en O(1))."""
+        return [entry['path'] for entry in self.graph_entries(tab, piezometre)]
+
+    def graph_entries(self, tab, piezometre):
+        return self._graphs(tab).get(normalize_filename(piezometre or ''), [])
+
+    def frame(self, table, piezometre):
+        """Lignes d'une table de résultats pour un piézomètre (recherche exacte en O(1)) ; None si absentes."""
+        return self._table(table)[0].get(normalize_filename(piezometre or ''))
+
+    def records(self, table, piezometre):
+        """Enregistrements (dicts) d'une table de résultats pour un piézomètre."""
+        frame = self.frame(table, piezometre)
+        return [] if frame is None else frame.to_dict('records')
+
+    def columns(self, table):
+        """Colonnes d'une table de résultats (liste vide si le fichier n'existe pas)."""
+        return self._table(table)[1]
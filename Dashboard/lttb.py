@@ -0,0 +1,47 @@
+# lttb.py
+# Sous-échantillonnage Largest-Triangle-Three-Buckets (LTTB) des séries temporelles
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Indices des points conservés par LTTB : le premier, le dernier, et dans chaque seau
+    le point formant le plus grand triangle avec le point retenu précédemment et la
+    moyenne du seau suivant. `x` et `y` sont des tableaux numériques sans NaN, x croissant.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (threshold - 2)
+    bounds = (np.floor(np.arange(threshold) * every) + 1).astype(int)
+    bounds[-1] = n - 1
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        next_end = bounds[i + 2] if i + 2 < threshold - 1 else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample(dates, values, threshold):
+    """Applique LTTB à une série datée (les valeurs manquantes sont ignorées)."""
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values) & ~np.isnat(dates)
+    dates, values = dates[valid], values[valid]
+    # Jours flottants : évite les dépassements sur les nanosecondes dans le calcul des aires
+    x = dates.astype('int64') / 86_400e9
+    keep = lttb_indices(x, values, threshold)
+    return dates[keep], values[keep]
@@ -0,0 +1,85 @@
+# tab_cache.py
+# Cache du contenu des onglets partagé entre les workers (flask-caching, dossier commun ou Redis),
+# indexé par (onglet, piézomètre, version des fichiers de résultats de l'onglet)
+import hashlib
+import json
+import os
+
+from plotly.io.json import to_json_plotly
+
+from Pipeline.instrumentation import count
+
+try:
+    from flask_caching import Cache
+except ImportError:
+    Cache = None
+
+# TAB_CACHE=0 désactive le cache (chaque requête reconstruit l'onglet)
+ENABLED = os.environ.get('TAB_CACHE', '1') == '1'
+
+# Backend : 'FileSystemCache' (partagé par les workers d'une même machine) ou 'RedisCache' (TAB_CACHE_REDIS_URL)
+CACHE_TYPE = os.environ.get('TAB_CACHE_TYPE', 'FileSystemCache')
+CACHE_DIR = os.environ.get(
+    'TAB_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'tabs')
+)
+REDIS_URL = os.environ.get('TAB_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+# Durée de vie d'une entrée (s) et nombre maximal d'entrées avant éviction
+TTL = int(os.environ.get('TAB_CACHE_TTL', 600))
+MAX_ITEMS = int(os.environ.get('TAB_CACHE_MAX_ITEMS', 500))
+
+
+class TabCache:
+    """
+    Contenu d'onglet déjà construit, relu tant que les fichiers dont il dépend n'ont pas changé :
+    la version (dates de modification) fait partie de la clé, une réécriture par le pipeline
+    produit donc une nouvelle clé et les anciennes entrées expirent (TTL) ou sont évincées.
+    """
+
+    def __init__(self, server, enabled=ENABLED):
+        self.cache = None
+        if not enabled:
+            return
+        if Cache is None:
+            print("flask-caching n'est pas installé : contenu des onglets non mis en cache.")
+            return
+        config = {'CACHE_TYPE': CACHE_TYPE, 'CACHE_DEFAULT_TIMEOUT': TTL, 'CACHE_KEY_PREFIX': 'tab:'}
+        if CACHE_TYPE == 'FileSystemCache':
+            config.update({'CACHE_DIR': CACHE_DIR, 'CACHE_THRESHOLD': MAX_ITEMS})
+        elif CACHE_TYPE == 'RedisCache':
+            config['CACHE_REDIS_URL'] = REDIS_URL
+        else:
+            config['CACHE_THRESHOLD'] = MAX_ITEMS
+        self.cache = Cache(server, config=config)
+
+    @staticmethod
+    def key(tab, piezometre, version):
+        payload = json.dumps([tab, piezometre, version], default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def serialize(content):
+        """
+        Arbre de composants converti en dicts/listes ({'type', 'namespace', 'props'}, que le navigateur
+        affiche comme les composants) : relu sans reconstruire ni revalider les figures Plotly.
+        """
+        return json.loads(to_json_plotly(content))
+
+    def get_or_render(self, tab, piezometre, version, render):
+        """Contenu en cache pour cette version, sinon `render()` (résultat sérialisé puis mis en cache)."""
+        if self.cache is None:
+            return render()
+        key = self.key(tab, piezometre, version)
+        content = self.cache.get(key)
+        if content is not None:
+            count('tab_cache.hit')
+            return content
+        count('tab_cache.miss')
+        content = self.serialize(render())
+        self.cache.set(key, content)
+        return content
+
+    def clear(self):
+        if self.cache is not None:
+            self.cache.clear()
@@ -0,0 +1,86 @@
+# tables.py
+# Pagination, tri et filtrage côté serveur des tables de résultats (DataTable en mode 'custom') :
+# seules les lignes de la page affichée sont envoyées au navigateur
+import math
+import re
+
+import pandas as pd
+
+# Nombre de lignes par page
+PAGE_SIZE = 10
+
+# Expression élémentaire de filter_query (syntaxe de DataTable) : '{colonne} opérateur valeur', l'opérateur
+# pouvant être préfixé par 'i' (insensible à la casse) ou 's' (sensible). L'opérateur est lu juste après le
+# nom de colonne : une valeur peut contenir '>' ou '=' ('RR -> niveau')
+FILTER_PART = re.compile(
+    r'^\s*\{(?P<name>[^}]+)\}\s*(?P<case>[is](?=\S))?'
+    r'(?P<operator>>=|<=|!=|<|>|=|eq|ne|lt|le|gt|ge|contains|datestartswith)\s*(?P<value>.*?)\s*$'
+)
+
+# Formes symboliques ramenées aux formes textuelles
+SYMBOLS = {'>=': 'ge', '<=': 'le', '!=': 'ne', '<': 'lt', '>': 'gt', '=': 'eq'}
+
+
+def split_filter_part(filter_part):
+    """
+    '{colonne} >= 3' -> ('colonne', 'ge', 3.0, False) ; le dernier élément indique une comparaison
+    insensible à la casse. (None, None, None, False) si l'expression n'est pas reconnue.
+    """
+    match = FILTER_PART.match(filter_part)
+    if not match:
+        return None, None, None, False
+    name, case, operator, value_part = match.group('name', 'case', 'operator', 'value')
+    if value_part and len(value_part) > 1 and value_part[0] == value_part[-1] and value_part[0] in ("'", '"', '`'):
+        value = value_part[1:-1].replace('\\' + value_part[0], value_part[0])
+    else:
+        try:
+            value = float(value_part)
+        except ValueError:
+            value = value_part
+    return name, SYMBOLS.get(operator, operator), value, case == 'i'
+
+
+def filter_frame(frame, filter_query):
+    """Applique un filter_query de DataTable ('{a} > 1 && {b} contains x') en un seul masque."""
+    if not filter_query:
+        return frame
+    mask = pd.Series(True, index=frame.index)
+    for part in filter_query.split(' && '):
+        name, operator, value, insensitive = split_filter_part(part)
+        if name not in frame.columns:
+            continue
+        column = frame[name]
+        if operator in ('eq', 'ne', 'lt', 'le', 'gt', 'ge'):
+            if isinstance(value, float) and not pd.api.types.is_numeric_dtype(column):
+                column = pd.to_numeric(column, errors='coerce')
+            elif isinstance(value, str):
+                column = column.astype(str)
+                if insensitive:
+                    column, value = column.str.lower(), value.lower()
+            mask &= getattr(column, operator)(value)
+        elif operator == 'contains':
+            mask &= column.astype(str).str.contains(str(value), case=not insensitive, regex=False, na=False)
+        elif operator == 'datestartswith':
+            mask &= column.astype(str).str.startswith(str(value), na=False)
+    return frame[mask]
+
+
+def sort_frame(frame, sort_by):
+    """Tri multi-colonnes selon le sort_by de DataTable ([{'column_id': ..., 'direction': 'asc'}, ...])."""
+    sort_by = [s for s in sort_by or [] if s['column_id'] in frame.columns]
+    if not sort_by:
+        return frame
+    return frame.sort_values(
+        [s['column_id'] for s in sort_by],
+        ascending=[s['direction'] == 'asc' for s in sort_by],
+        kind='stable',
+    )
+
+
+def query_page(frame, page_current=0, page_size=PAGE_SIZE, sort_by=None, filter_query=''):
+    """Filtre, trie puis découpe la page demandée : (enregistrements de la page, nombre de pages)."""
+    frame = sort_frame(filter_frame(frame, filter_query), sort_by)
+    page_size = page_size or PAGE_SIZE
+    page_count = max(1, math.ceil(len(frame) / page_size))
+    start = (page_current or 0) * page_size
+    return frame.iloc[start:start + page_size].to_dict('records'), page_count
@@ -0,0 +1,169 @@
+# cache.py
+# Cache disque des résultats de tests statistiques, indexé par l'empreinte des données
+# du piézomètre, le nom du test et ses paramètres
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+
+from Pipeline.instrumentation import count
+
+# Dossier du cache (partagé par tous les scripts et processus)
+CACHE_DIR = os.environ.get(
+    'RESULT_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'results')
+)
+
+# Taille maximale du cache en Mo ; les entrées les moins récemment utilisées sont évincées au-delà
+MAX_SIZE_MB = float(os.environ.get('RESULT_CACHE_MAX_MB', 256))
+
+# Une éviction ramène le cache à cette fraction de sa taille maximale : les écritures suivantes
+# ne déclenchent pas chacune un nouveau parcours du dossier
+EVICT_TO = 0.9
+
+# RESULT_CACHE=0 désactive le cache (tout est recalculé)
+ENABLED = os.environ.get('RESULT_CACHE', '1') == '1'
+
+
+def data_fingerprint(data):
+    """Empreinte SHA-256 du contenu d'un DataFrame (noms de colonnes et valeurs, index ignoré)."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(c) for c in data.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Un fichier pickle par résultat : <dossier>/<clé[:2]>/<clé>.pkl. Les écritures passent par un
+    fichier temporaire renommé (os.replace, atomique) : des processus concurrents peuvent partager
+    le cache sans lire d'entrée partielle. La date de modification, mise à jour à chaque lecture,
+    sert à l'éviction LRU. La taille totale est mesurée une fois puis tenue à jour à chaque écriture :
+    le dossier n'est parcouru à nouveau que lorsqu'elle dépasse la taille maximale.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_size_mb=MAX_SIZE_MB, enabled=ENABLED):
+        self.directory = directory
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    @staticmethod
+    def key(test, fingerprint, params=None):
+        payload = json.dumps({'test': test, 'data': fingerprint, 'params': params or {}},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.pkl')
+
+    def get(self, key):
+        """Résultat en cache, ou None s'il est absent (ou illisible)."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        # Marque l'entrée comme récemment utilisée
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                written = f.tell()
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self._size is None:
+            self._size = self._scan()[1]
+        else:
+            self._size += written - replaced
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _scan(self):
+        """Entrées du cache (date de dernière utilisation, taille, chemin) et taille totale en octets."""
+        entries, total = [], 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.pkl'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+        return entries, total
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées jusqu'à revenir sous EVICT_TO de la taille maximale."""
+        entries, total = self._scan()
+        if total <= self.max_bytes:
+            self._size = total
+            return
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+
+    def cached(self, test, data, params, compute):
+        """
+        Retourne le résultat de `compute()` pour (données, test, paramètres), calculé une seule fois :
+        tant que les données d'un piézomètre ne changent pas, le résultat est relu depuis le disque.
+        """
+        if not self.enabled:
+            self.misses += 1
+            return compute()
+        key = self.key(test, data_fingerprint(data), params)
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            count('result_cache.hit')
+            return value
+        self.misses += 1
+        count('result_cache.miss')
+        value = compute()
+        self.put(key, value)
+        return value
+
+
+# Cache du processus courant : un seul parcours du dossier (taille initiale) par worker
+_process_cache = None
+
+
+def process_cache():
+    """
+    ResultCache partagé par tous les appels d'un même processus, à utiliser dans les fonctions
+    exécutées pour chaque piézomètre par run_per_piezometre (un cache par worker, et non par appel).
+    """
+    global _process_cache
+    if _process_cache is None or _process_cache[0] != os.getpid():
+        _process_cache = (os.getpid(), ResultCache())
+    return _process_cache[1]
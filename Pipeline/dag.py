@@ -0,0 +1,188 @@
+# dag.py
+# Exécution incrémentale du pipeline : étapes déclarées avec leurs entrées/sorties,
+# reconstruites uniquement si le contenu de leurs entrées (ou leur script) a changé
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+# Nombre d'exécutions conservées dans l'historique des mesures
+MAX_RUNS = 50
+
+
+@dataclass
+class Stage:
+    """Étape du pipeline : un script exécuté depuis `cwd`, avec ses fichiers d'entrée et de sortie."""
+    name: str
+    script: str
+    cwd: str = '.'
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+
+
+def _hash_file(path, cache):
+    """Empreinte SHA-256 d'un fichier ; réutilisée tant que sa taille et sa date de modification sont inchangées."""
+    stat = os.stat(path)
+    key = f'{stat.st_size}:{stat.st_mtime_ns}'
+    cached = cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    cache[path] = [key, digest.hexdigest()]
+    return cache[path][1]
+
+
+def content_hash(path, cache):
+    """Empreinte d'un fichier ou d'un dossier (tous les fichiers qu'il contient, triés) ; None s'il n'existe pas."""
+    if os.path.isfile(path):
+        return _hash_file(path, cache)
+    if not os.path.isdir(path):
+        return None
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode())
+            digest.update(_hash_file(file_path, cache).encode())
+    return digest.hexdigest()
+
+
+class Pipeline:
+    """Graphe d'étapes ; les dépendances sont déduites des sorties d'une étape utilisées en entrée d'une autre."""
+
+    def __init__(self, stages, root='.', state_file='.pipeline_state.json'):
+        self.stages = {stage.name: stage for stage in stages}
+        self.root = os.path.abspath(root)
+        self.state_path = os.path.join(self.root, state_file)
+        self.state = {'stages': {}, 'hashes': {}, 'runs': []}
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.state.update(json.load(f))
+        producers = {self._path(stage, out): stage.name for stage in stages for out in stage.outputs}
+        self.dependencies = {
+            stage.name: {producers[p] for p in map(lambda i: self._path(stage, i), stage.inputs) if p in producers}
+            for stage in stages
+        }
+
+    def _path(self, stage, path):
+        return os.path.normpath(os.path.join(self.root, stage.cwd, path))
+
+    def _fingerprint(self, stage):
+        cache = self.state['hashes']
+        files = {'script': content_hash(os.path.join(self.root, stage.script), cache)}
+        for path in stage.inputs:
+            files[path] = content_hash(self._path(stage, path), cache)
+        return files
+
+    def is_stale(self, stage):
+        """Une étape est à reconstruire si une sortie manque ou si le script ou une entrée a changé."""
+        if any(not os.path.exists(self._path(stage, out)) for out in stage.outputs):
+            return True
+        return self.state['stages'].get(stage.name, {}).get('fingerprint') != self._fingerprint(stage)
+
+    def _selection(self, targets, with_deps=True):
+        """Étapes demandées et (par défaut) toutes leurs dépendances amont."""
+        if not targets:
+            return set(self.stages)
+        unknown = set(targets) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Étapes inconnues : {sorted(unknown)}")
+        if not with_deps:
+            return set(targets)
+        selected, todo = set(), list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in selected:
+                selected.add(name)
+                todo.extend(self.dependencies[name])
+        return selected
+
+    def _run_stage(self, stage):
+        """Exécute le script et mesure le temps écoulé, le temps CPU et la mémoire maximale du processus."""
+        env = dict(os.environ, MPLBACKEND='Agg')
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, os.path.join(self.root, stage.script)],
+                                   cwd=os.path.join(self.root, stage.cwd), env=env)
+        cpu_time, peak_mb = None, None
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            cpu_time = usage.ru_utime + usage.ru_stime
+            # ru_maxrss est en kilo-octets sous Linux et en octets sous macOS
+            peak_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+        else:
+            process.wait()
+        return {
+            'stage': stage.name,
+            'returncode': process.returncode,
+            'wall_time_s': round(time.perf_counter() - start, 3),
+            'cpu_time_s': None if cpu_time is None else round(cpu_time, 3),
+            'peak_memory_mb': None if peak_mb is None else round(peak_mb, 1),
+        }
+
+    def run(self, targets=None, force=False, jobs=4, dry_run=False, with_deps=True):
+        """
+        Exécute les étapes périmées dans l'ordre des dépendances ; les branches indépendantes
+        tournent en parallèle (au plus `jobs` scripts à la fois). Retourne les mesures par étape.
+        """
+        selected = self._selection(targets, with_deps)
+        pending = set(selected)
+        done, failed, metrics = set(), set(), []
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            running = {}
+            while pending or running:
+                n_pending = len(pending)
+                for name in sorted(pending):
+                    deps = self.dependencies[name] & selected
+                    if deps & failed:
+                        print(f"[{name}] ignorée : une dépendance a échoué.")
+                        pending.discard(name)
+                        failed.add(name)
+                    elif deps <= done:
+                        pending.discard(name)
+                        stage = self.stages[name]
+                        if not force and not self.is_stale(stage):
+                            print(f"[{name}] à jour.")
+                            done.add(name)
+                        elif dry_run:
+                            print(f"[{name}] serait exécutée.")
+                            done.add(name)
+                        else:
+                            print(f"[{name}] exécution de {stage.script}...")
+                            running[executor.submit(self._run_stage, stage)] = name
+                if not running:
+                    if pending and len(pending) == n_pending:
+                        raise ValueError(f"Dépendances circulaires entre les étapes : {sorted(pending)}")
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    result = future.result()
+                    metrics.append(result)
+                    print(f"[{name}] terminée en {result['wall_time_s']} s "
+                          f"(mémoire max : {result['peak_memory_mb']} Mo, code {result['returncode']}).")
+                    if result['returncode'] == 0:
+                        done.add(name)
+                        self.state['stages'][name] = {'fingerprint': self._fingerprint(self.stages[name]),
+                                                      'last_run': result}
+                    else:
+                        failed.add(name)
+
+        if metrics:
+            self.state['runs'].append({'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'stages': metrics})
+            self.state['runs'] = self.state['runs'][-MAX_RUNS:]
+        self.save()
+        return metrics
+
+    def save(self):
+        with open(self.state_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
@@ -0,0 +1,209 @@
+# instrumentation.py
+# Mesures par phase (temps écoulé, temps CPU, lignes traitées, mémoire maximale), compteurs,
+# profilage optionnel et export des métriques (journal JSON, format texte Prometheus)
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Journal JSON (une ligne par phase mesurée) ; METRICS_LOG= (vide) désactive l'écriture.
+# Le tableau de bord ne l'écrit que si METRICS_LOG est défini (voir set_metrics_log)
+METRICS_LOG = os.environ.get('METRICS_LOG', os.path.join(ROOT, 'metrics.jsonl'))
+
+# Profilage des phases : PROFILE=cprofile ou PROFILE=pyinstrument ; PROFILE_ONLY=phase1,phase2 pour cibler
+PROFILE = os.environ.get('PROFILE', '').lower()
+PROFILE_ONLY = {name for name in os.environ.get('PROFILE_ONLY', '').split(',') if name}
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(ROOT, 'profiles'))
+
+_lock = threading.Lock()
+_stages = {}
+_counters = {}
+
+
+def set_metrics_log(path):
+    """Change la destination du journal JSON ; None ou '' désactive l'écriture."""
+    global METRICS_LOG
+    METRICS_LOG = path
+
+
+def _peak_memory_mb():
+    """Mémoire résidente maximale du processus depuis son démarrage (ru_maxrss : Ko sous Linux, octets sous macOS)."""
+    if resource is None:
+        # Sans 'resource' (Windows) : pic de l'ensemble de travail via psutil s'il est installé, sinon 0
+        try:
+            import psutil
+        except ImportError:
+            return 0.0
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class StageRecord:
+    """Mesures d'une phase ; `rows` est renseigné par le code mesuré (nombre de lignes traitées)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.wall_time_s = None
+        self.cpu_time_s = None
+        self.peak_memory_mb = None
+        self.memory_growth_mb = None
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'pid': os.getpid(),
+            'wall_time_s': round(self.wall_time_s, 6),
+            'cpu_time_s': round(self.cpu_time_s, 6),
+            'rows': self.rows,
+            'rows_per_s': round(self.rows / self.wall_time_s) if self.rows and self.wall_time_s else None,
+            'peak_memory_mb': round(self.peak_memory_mb, 1),
+            'memory_growth_mb': round(self.memory_growth_mb, 1),
+        }
+
+
+def _profiler(name):
+    """Démarre un profileur pour la phase si PROFILE le demande ; retourne une fonction d'arrêt et d'écriture."""
+    if not PROFILE or (PROFILE_ONLY and name not in PROFILE_ONLY):
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f"{name.replace('/', '_')}-{os.getpid()}-{int(time.time())}")
+
+    if PROFILE == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("pyinstrument n'est pas installé : profilage avec cProfile.")
+        else:
+            profiler = Profiler()
+            profiler.start()
+
+            def stop():
+                profiler.stop()
+                with open(base + '.html', 'w') as f:
+                    f.write(profiler.output_html())
+            return stop
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    def stop():
+        profiler.disable()
+        profiler.dump_stats(base + '.prof')
+    return stop
+
+
+def _record(record):
+    entry = record.as_dict()
+    with _lock:
+        totals = _stages.setdefault(record.name, {'count': 0, 'wall_time_s': 0.0, 'cpu_time_s': 0.0,
+                                                  'rows': 0, 'peak_memory_mb': 0.0})
+        totals['count'] += 1
+        totals['wall_time_s'] += record.wall_time_s
+        totals['cpu_time_s'] += record.cpu_time_s
+        totals['rows'] += record.rows or 0
+        totals['peak_memory_mb'] = max(totals['peak_memory_mb'], record.peak_memory_mb)
+        if METRICS_LOG:
+            entry['timestamp'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+            entry['script'] = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None
+            # Une écriture par ligne en mode ajout : les processus parallèles ne s'entremêlent pas
+            with open(METRICS_LOG, 'a') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+@contextmanager
+def stage(name, rows=None):
+    """
+    Mesure une phase :
+        with stage('nettoyage.lecture') as m:
+            data = read_table(...)
+            m.rows = len(data)
+    """
+    record = StageRecord(name)
+    record.rows = rows
+    stop_profiler = _profiler(name)
+    memory_before = _peak_memory_mb()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        record.wall_time_s = time.perf_counter() - wall_start
+        record.cpu_time_s = time.process_time() - cpu_start
+        if stop_profiler:
+            stop_profiler()
+        record.peak_memory_mb = _peak_memory_mb()
+        record.memory_growth_mb = record.peak_memory_mb - memory_before
+        _record(record)
+
+
+def instrumented(name):
+    """Décorateur : mesure chaque appel de la fonction comme une phase `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """Incrémente un compteur (ex. succès / échecs de cache, graphiques écrits)."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def snapshot():
+    """Métriques cumulées du processus : {'stages': {...}, 'counters': {...}}."""
+    with _lock:
+        return {'stages': {name: dict(totals) for name, totals in _stages.items()}, 'counters': dict(_counters)}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text():
+    """Métriques cumulées au format texte d'exposition Prometheus."""
+    metrics = snapshot()
+    series = [
+        ('stage_calls_total', 'counter', 'Nombre d\'exécutions de la phase', 'count'),
+        ('stage_wall_seconds_total', 'counter', 'Temps écoulé cumulé de la phase', 'wall_time_s'),
+        ('stage_cpu_seconds_total', 'counter', 'Temps CPU cumulé de la phase', 'cpu_time_s'),
+        ('stage_rows_total', 'counter', 'Lignes traitées par la phase', 'rows'),
+        ('stage_peak_memory_megabytes', 'gauge', 'Mémoire résidente maximale observée en fin de phase', 'peak_memory_mb'),
+    ]
+    lines = []
+    for metric, kind, help_text, key in series:
+        lines.append(f'# HELP piezo_{metric} {help_text}')
+        lines.append(f'# TYPE piezo_{metric} {kind}')
+        for name, totals in sorted(metrics['stages'].items()):
+            lines.append(f'piezo_{metric}{{stage="{_escape(name)}"}} {totals[key]}')
+    lines.append('# HELP piezo_events_total Compteurs applicatifs')
+    lines.append('# TYPE piezo_events_total counter')
+    for name, value in sorted(metrics['counters'].items()):
+        lines.append(f'piezo_events_total{{name="{_escape(name)}"}} {value}')
+    lines.append('# HELP piezo_process_peak_memory_megabytes Mémoire résidente maximale du processus')
+    lines.append('# TYPE piezo_process_peak_memory_megabytes gauge')
+    lines.append(f'piezo_process_peak_memory_megabytes {round(_peak_memory_mb(), 1)}')
+    return '\n'.join(lines) + '\n'
+
+
+def register_metrics_endpoint(server, path='/metrics'):
+    """Ajoute au serveur Flask une route exposant les métriques au format Prometheus."""
+    def metrics():
+        return server.response_class(prometheus_text(), mimetype='text/plain; version=0.0.4')
+    server.add_url_rule(path, 'metrics', metrics)
@@ -0,0 +1,265 @@
+# on_demand.py
+# Calcul à la demande de la chaîne complète pour un seul piézomètre (code_bss), lancé depuis le tableau de bord :
+# les partitions du piézomètre sont mises à jour dans les jeux de data/, puis les étapes d'analyse du pipeline
+# sont relancées (leurs scripts relisent depuis le cache les résultats des piézomètres inchangés)
+import os
+import time
+from functools import lru_cache
+
+import pandas as pd
+
+from Pipeline.instrumentation import count, stage
+from Pipeline.storage import parquet_path, read_table, write_partition, write_table
+from Preparation_Data.alignment import DEFAULT_RULES as ALIGNMENT_RULES, align_daily
+from Preparation_Data.meteo_stream import ARCHIVES, load_archives
+from Traitement_Data.categorisation import classify_averse, classify_by_group_quantiles, classify_rainfall
+from Traitement_Data.features import DEFAULT_SPEC, write_feature_variants
+from Traitement_Data.outliers import DEFAULT_RULES, remove_outliers
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DATA_DIR = os.path.join(ROOT, 'data')
+
+# Dossier partagé par les workers : verrous, avancement et résultats des calculs (et file des callbacks Dash)
+JOBS_DIR = os.environ.get('ON_DEMAND_DIR', os.path.join(ROOT, '.cache', 'jobs'))
+
+# Durée maximale d'un calcul (s) : au-delà, le verrou d'un worker arrêté en cours de route expire
+JOB_TIMEOUT = int(os.environ.get('ON_DEMAND_TIMEOUT', 3600))
+
+# Intervalle de lecture de l'avancement d'un calcul déjà lancé par un autre utilisateur (s)
+POLL_INTERVAL = 1.0
+
+# Étapes d'analyse relancées après la mise à jour des données (voir run_pipeline.py)
+ANALYSIS_STAGES = ['stats_descriptives', 'correlation_croisee', 'chi2', 'correlation', 'granger', 'correlation_lags']
+
+# Variantes de lags écrites par Traitement_Data/add_lags.py
+LAG_OUTPUTS = {'data_with_lags7': 7, 'data_with_lags15': 15}
+
+PIEZO_COLUMNS = ['code_bss', 'date_mesure', 'niveau_nappe_eau', 'profondeur_nappe', 'nom_piezo']
+STATION_COLUMNS = ['station_name', 'DATE', 'RR', 'TX', 'TN', 'TM']
+
+
+def _data(name):
+    return os.path.join(DATA_DIR, name)
+
+
+@lru_cache(maxsize=4)
+def _read_associations(path, mtime):
+    return pd.read_csv(path)
+
+
+def candidates():
+    """Piézomètres associés à une station météo (piezometres_association_stations.csv), calculables à la demande."""
+    path = _data('piezometres_association_stations.csv')
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['code_bss', 'nom_de_piezometre', 'station_name'])
+    return _read_associations(path, os.stat(path).st_mtime_ns)
+
+
+def unprocessed(processed):
+    """Candidats absents des résultats du tableau de bord (`processed` : piézomètres déjà traités, nom ou code_bss)."""
+    rows = candidates()
+    processed = set(processed)
+    return rows[~(rows['nom_de_piezometre'].isin(processed) | rows['code_bss'].isin(processed))]
+
+
+def _association(code_bss):
+    rows = candidates()
+    rows = rows[rows['code_bss'] == code_bss]
+    if rows.empty:
+        raise ValueError(f"{code_bss} n'est associé à aucune station météo.")
+    return rows.iloc[[0]].reset_index(drop=True)
+
+
+def _replace_rows(path, frame, column, value):
+    """Remplace dans un CSV de résultats les lignes où `column` == `value`."""
+    if os.path.exists(path):
+        current = pd.read_csv(path)
+        if column in current.columns:
+            frame = pd.concat([current[current[column].astype(str) != str(value)], frame], ignore_index=True)
+    frame.to_csv(path, index=False)
+
+
+def fetch_piezo(association):
+    """Nouvelles mesures Hub'Eau du piézomètre, ajoutées à chroniques_piezo (comme get_chroniques_piezo.py)."""
+    from Preparation_Data.hubeau_client import fetch_chroniques
+
+    code_bss, nom = association.loc[0, 'code_bss'], association.loc[0, 'nom_de_piezometre']
+    path = _data('chroniques_piezo')
+    since = {}
+    if os.path.exists(parquet_path(path)):
+        stored = read_table(path, columns=['date_mesure'], filters=[('code_bss', '==', code_bss)])
+        if len(stored):
+            since = {code_bss: stored['date_mesure'].max()}
+
+    def store_page(page):
+        page['nom_piezo'] = nom
+        write_table(page, path, append=True)
+
+    return fetch_chroniques([code_bss], store_page, since=since, concurrency=1).get(code_bss, 0)
+
+
+def station_data(association):
+    """Chroniques de la station associée, lues dans les archives Météo-France et fusionnées dans filtered_stations.csv."""
+    archives = [_data(archive) for archive in ARCHIVES if os.path.exists(_data(archive))]
+    if not archives:
+        raise FileNotFoundError("Aucune archive Météo-France dans data/ : " + ", ".join(ARCHIVES))
+    stations = load_archives(archives, association, max_workers=1)
+
+    path = _data('filtered_stations.csv')
+    merged = stations
+    if os.path.exists(path):
+        merged = pd.concat([pd.read_csv(path, parse_dates=['DATE']), stations], ignore_index=True)
+    merged.drop_duplicates(subset=['station_name', 'DATE'], keep='last').to_csv(path, index=False)
+    return stations
+
+
+def combine(association, stations):
+    """
+    Chroniques du piézomètre alignées sur le calendrier journalier avec celles de sa station
+    (comme assiocations_chroniques.py) : (données alignées, rapport de couverture).
+    """
+    code_bss = association.loc[0, 'code_bss']
+    piezo = read_table(_data('chroniques_piezo'), columns=PIEZO_COLUMNS, filters=[('code_bss', '==', code_bss)])
+    piezo['date_mesure'] = pd.to_datetime(piezo['date_mesure'], errors='coerce')
+    stations = stations[STATION_COLUMNS].rename(columns={'DATE': 'date_mesure'})
+    stations['date_mesure'] = pd.to_datetime(stations['date_mesure'], errors='coerce')
+    return align_daily(piezo, stations, association[['code_bss', 'station_name']], ALIGNMENT_RULES)
+
+
+def clean(combined):
+    """Mêmes règles que clean_data.py : lignes incomplètes supprimées, averses et niveaux catégorisés."""
+    data = combined.dropna().copy()
+    data['type_averse'] = classify_rainfall(data['RR'])
+    data['niveau_categorise'] = classify_by_group_quantiles(data['niveau_nappe_eau'], data['nom_piezo'])
+    return data
+
+
+def lag_features(data):
+    """Variantes avec lags de add_lags.py pour ce seul piézomètre : {nom du jeu: DataFrame}."""
+    data = data.copy()
+    data['date_mesure'] = pd.to_datetime(data['date_mesure'], errors='coerce')
+    data['is_rainy'] = (data['RR'] > 0).astype(int)
+    data['type_averse'] = classify_averse(data['RR'])
+    frames = {name: [] for name in LAG_OUTPUTS}
+    write_feature_variants(data, LAG_OUTPUTS, spec=DEFAULT_SPEC,
+                           writer=lambda frame, name, append: frames[name].append(frame))
+    return {name: pd.concat(parts, ignore_index=True) for name, parts in frames.items() if parts}
+
+
+def compute_piezometre(code_bss, progress=None):
+    """
+    Chaîne complète pour un piézomètre. `progress(étape, total, libellé)` est appelé avant chaque étape.
+    Retourne {'code_bss', 'nom_piezo', 'rows', 'failed'} (étapes d'analyse en échec).
+    """
+    from run_pipeline import build_pipeline
+
+    total = 6 + len(ANALYSIS_STAGES)
+    step = 0
+
+    def advance(label):
+        nonlocal step
+        step += 1
+        if progress is not None:
+            progress(step, total, label)
+
+    association = _association(code_bss)
+    nom = association.loc[0, 'nom_de_piezometre']
+
+    advance("Téléchargement des chroniques piézométriques")
+    with stage('on_demand.chroniques_piezo'):
+        fetch_piezo(association)
+
+    advance("Lecture des chroniques de la station météo")
+    with stage('on_demand.chroniques_station'):
+        stations = station_data(association)
+
+    advance("Combinaison des chroniques")
+    with stage('on_demand.combinaison') as m:
+        combined, coverage = combine(association, stations)
+        if combined.dropna().empty:
+            raise ValueError(f"Aucune mesure commune entre {nom} et la station {association.loc[0, 'station_name']}.")
+        write_partition(combined, _data('combined_chroniques'), code_bss)
+        _replace_rows(_data('couverture_chroniques.csv'), coverage, 'code_bss', code_bss)
+        m.rows = len(combined)
+
+    advance("Nettoyage")
+    with stage('on_demand.nettoyage', rows=len(combined)):
+        cleaned = clean(combined)
+        write_partition(cleaned, _data('data_cleaned'), code_bss)
+
+    advance("Valeurs aberrantes")
+    with stage('on_demand.valeurs_aberrantes', rows=len(cleaned)):
+        filtered, removed, report = remove_outliers(cleaned, DEFAULT_RULES)
+        write_partition(filtered, _data('data_cleaned_outliers'), code_bss)
+        _replace_rows(_data('outliers_report.csv'), report, 'nom_piezo', nom)
+        _replace_rows(_data('outliers_rows.csv'), removed, 'nom_piezo', nom)
+
+    advance("Lags")
+    with stage('on_demand.lags', rows=len(cleaned)):
+        for name, frame in lag_features(cleaned).items():
+            write_partition(frame, _data(name), code_bss)
+
+    # Analyses : mêmes scripts et mêmes fichiers de résultats que le pipeline statique
+    pipeline = build_pipeline()
+    failed = []
+    for name in ANALYSIS_STAGES:
+        advance(f"Analyse : {name}")
+        metrics = pipeline.run([name], with_deps=False, jobs=1)
+        failed += [result['stage'] for result in metrics if result['returncode'] != 0]
+    return {'code_bss': code_bss, 'nom_piezo': nom, 'rows': len(filtered), 'failed': failed}
+
+
+class JobQueue:
+    """
+    Calculs à la demande partagés par tous les workers (diskcache) : un seul calcul par piézomètre à la fois,
+    les demandes suivantes suivent l'avancement du calcul en cours et en reçoivent le résultat. Les calculs
+    de piézomètres différents écrivent tour à tour dans les jeux partagés (verrou 'stores').
+    """
+
+    def __init__(self, directory=JOBS_DIR):
+        if diskcache is None:
+            raise ImportError("diskcache est requis pour les calculs à la demande.")
+        self.cache = diskcache.Cache(directory)
+
+    def progress(self, code_bss):
+        return self.cache.get(f'progress:{code_bss}')
+
+    def run(self, code_bss, progress=None):
+        """Lance (ou rejoint) le calcul de `code_bss` ; retourne son résultat, ou {'error': ...} en cas d'échec."""
+        key = f'job:{code_bss}'
+        if not self.cache.add(key, os.getpid(), expire=JOB_TIMEOUT):
+            count('on_demand.deduplicated')
+            return self._follow(code_bss, key, progress)
+
+        count('on_demand.started')
+
+        def report(step, total, label):
+            self.cache.set(f'progress:{code_bss}', (step, total, label), expire=JOB_TIMEOUT)
+            if progress is not None:
+                progress(step, total, label)
+
+        try:
+            report(0, 1, "En attente de la fin d'un autre calcul")
+            with diskcache.Lock(self.cache, 'stores', expire=JOB_TIMEOUT):
+                result = compute_piezometre(code_bss, report)
+        except Exception as error:
+            result = {'code_bss': code_bss, 'error': str(error)}
+        finally:
+            self.cache.delete(f'progress:{code_bss}')
+        self.cache.set(f'result:{code_bss}', result, expire=JOB_TIMEOUT)
+        self.cache.delete(key)
+        return result
+
+    def _follow(self, code_bss, key, progress):
+        while key in self.cache:
+            state = self.progress(code_bss)
+            if state is not None and progress is not None:
+                progress(*state)
+            time.sleep(POLL_INTERVAL)
+        return self.cache.get(f'result:{code_bss}',
+                              {'code_bss': code_bss, 'error': "Le calcul lancé par un autre utilisateur a été interrompu."})
@@ -0,0 +1,186 @@
+# render.py
+# Rendu des graphiques par lots : tâches réparties sur un pool de processus (backend Agg,
+# figures réutilisées dans chaque processus), graphiques ignorés si leurs données n'ont pas
+# changé, fichiers HTML plotly liés à un seul plotly.min.js local
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import pandas as pd
+
+from Pipeline.instrumentation import count, stage
+from Pipeline.runner import DEFAULT_WORKERS
+
+# Empreintes des graphiques déjà rendus, une entrée par fichier : <dossier>/.render_manifest.json
+MANIFEST = '.render_manifest.json'
+
+# Bundle plotly.js partagé par tous les fichiers HTML d'un dossier
+PLOTLY_JS = 'plotly.min.js'
+
+# Résolution des PNG (celle de matplotlib par défaut)
+DEFAULT_DPI = 100
+
+# RENDER_FORCE=1 régénère tous les graphiques
+FORCE = os.environ.get('RENDER_FORCE', '0') == '1'
+
+
+@dataclass
+class RenderJob:
+    """
+    Un graphique à produire.
+    - kind='matplotlib' : `renderer(fig, data, **params)` dessine sur une figure vide fournie
+    - kind='plotly'     : `renderer(data, **params)` retourne une figure plotly
+    `renderer` doit être définie au niveau d'un module (pour être transmise aux processus). Le code
+    de tout son module entre dans l'empreinte ; `version` est à changer quand le rendu dépend
+    d'un code défini ailleurs.
+    """
+    output: str
+    renderer: object
+    data: object = None
+    params: dict = field(default_factory=dict)
+    kind: str = 'matplotlib'
+    figsize: tuple = (10, 6)
+    dpi: int = DEFAULT_DPI
+    version: str = ''
+
+
+@lru_cache(maxsize=None)
+def _module_source(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _renderer_source(renderer):
+    """Nom de la fonction de rendu et code de son module (fonctions auxiliaires comprises)."""
+    name = f'{renderer.__module__}.{renderer.__qualname__}'
+    try:
+        return name + _module_source(inspect.getsourcefile(renderer))
+    except (OSError, TypeError):
+        try:
+            return name + inspect.getsource(renderer)
+        except (OSError, TypeError):
+            return name
+
+
+def job_hash(job):
+    """Empreinte des données, des paramètres et du code de rendu : tout changement régénère le graphique."""
+    digest = hashlib.sha256()
+    if isinstance(job.data, (pd.DataFrame, pd.Series)):
+        # Index inclus : les libellés (tables de contingence, dates) figurent sur les graphiques
+        frame = job.data.to_frame() if isinstance(job.data, pd.Series) else job.data
+        digest.update(json.dumps([str(c) for c in frame.columns]).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    else:
+        digest.update(json.dumps(job.data, sort_keys=True, default=str).encode())
+    digest.update(json.dumps(job.params, sort_keys=True, default=str).encode())
+    digest.update(json.dumps([job.kind, list(job.figsize), job.dpi, job.version]).encode())
+    digest.update(_renderer_source(job.renderer).encode())
+    return digest.hexdigest()
+
+
+def _load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomic(path, text):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.chmod(tmp_path, 0o644)  # mkstemp crée le fichier en 0600 ; plotly.min.js est servi par l'application
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def ensure_plotlyjs(directory):
+    """Écrit une seule fois le bundle plotly.js du dossier (référencé par tous ses fichiers HTML)."""
+    path = os.path.join(directory, PLOTLY_JS)
+    if not os.path.exists(path):
+        from plotly.offline import get_plotlyjs
+        _write_atomic(path, get_plotlyjs())
+    return path
+
+
+# Figures réutilisées par le processus courant, une par taille : vidées entre deux graphiques
+_figures = {}
+
+
+def _figure(figsize):
+    if figsize not in _figures:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        figure = Figure(figsize=figsize)
+        FigureCanvasAgg(figure)
+        _figures[figsize] = figure
+    figure = _figures[figsize]
+    figure.clear()
+    return figure
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render(job):
+    if job.kind == 'plotly':
+        figure = job.renderer(job.data, **job.params)
+        figure.write_html(job.output, include_plotlyjs=PLOTLY_JS)
+    else:
+        figure = _figure(tuple(job.figsize))
+        job.renderer(figure, job.data, **job.params)
+        figure.savefig(job.output, dpi=job.dpi)
+    return job.output
+
+
+def render_all(jobs, workers=DEFAULT_WORKERS, force=FORCE):
+    """
+    Produit les graphiques dont l'empreinte a changé (ou dont le fichier manque) et met à jour
+    les manifestes des dossiers. Retourne {'rendered': n, 'skipped': n}.
+    """
+    manifests, todo = {}, []
+    for job in jobs:
+        directory, name = os.path.split(os.path.abspath(job.output))
+        manifest = manifests.setdefault(directory, _load_manifest(directory))
+        digest = job_hash(job)
+        if not force and manifest.get(name) == digest and os.path.exists(job.output):
+            continue
+        todo.append((job, directory, name, digest))
+
+    for directory in {directory for job, directory, _, _ in todo if job.kind == 'plotly'}:
+        ensure_plotlyjs(directory)
+
+    with stage('rendu.graphiques', rows=len(todo)):
+        pending = [job for job, _, _, _ in todo]
+        if workers <= 1 or len(pending) <= 1:
+            _init_worker()
+            for job in pending:
+                _render(job)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                # Lots de tâches par processus : limite les échanges pour les petits graphiques
+                chunksize = max(1, len(pending) // (workers * 4))
+                list(executor.map(_render, pending, chunksize=chunksize))
+
+    for _, directory, name, digest in todo:
+        manifests[directory][name] = digest
+    for directory, manifest in manifests.items():
+        if os.path.isdir(directory):
+            _write_atomic(os.path.join(directory, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True))
+
+    skipped = len(jobs) - len(todo)
+    count('render.rendered', len(todo))
+    count('render.skipped', skipped)
+    return {'rendered': len(todo), 'skipped': skipped}
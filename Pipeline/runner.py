@@ -0,0 +1,49 @@
+# runner.py
+# Exécution parallèle (pool de processus) des traitements par piézomètre
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# Nombre de processus par défaut (variable d'environnement PIEZO_WORKERS, sinon nombre de cœurs)
+DEFAULT_WORKERS = int(os.environ.get('PIEZO_WORKERS', os.cpu_count() or 1))
+
+
+def split_by_piezometre(data, group_col='nom_piezo'):
+    """Découpe les données en une seule passe groupby : liste de (piézomètre, partition)."""
+    return [(name, part) for name, part in data.groupby(group_col, sort=True, observed=True)]
+
+
+def _call(func, name, part, kwargs):
+    return name, func(name, part, **kwargs)
+
+
+def run_per_piezometre(func, data, group_col='nom_piezo', workers=DEFAULT_WORKERS, **kwargs):
+    """
+    Applique `func(piezometre, partition, **kwargs)` à chaque piézomètre dans un pool de processus.
+    `func` doit être définie au niveau d'un module (pour être transmise aux processus).
+    Les résultats sont renvoyés dans l'ordre alphabétique des piézomètres, quel que soit
+    l'ordre de fin des tâches : [(piézomètre, résultat), ...].
+    """
+    partitions = split_by_piezometre(data, group_col)
+    if workers <= 1 or len(partitions) <= 1:
+        return [_call(func, name, part, kwargs) for name, part in partitions]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_call, func, name, part, kwargs) for name, part in partitions]
+        return [future.result() for future in futures]
+
+
+def collect_records(results, sort_by=None):
+    """
+    Fusionne les résultats (un dict ou une liste de dicts par piézomètre) en un DataFrame
+    trié de façon déterministe.
+    """
+    records = []
+    for _, result in results:
+        if result is None:
+            continue
+        records.extend(result if isinstance(result, list) else [result])
+    frame = pd.DataFrame(records)
+    if sort_by and not frame.empty:
+        frame = frame.sort_values(by=sort_by, kind='stable').reset_index(drop=True)
+    return frame
@@ -0,0 +1,175 @@
+# scaling.py
+# Normalisation par piézomètre à partir de statistiques courantes (moyenne / variance de Welford,
+# minimum / maximum) conservées sur disque : les nouvelles mesures mettent à jour les statistiques
+# sans relire l'historique, et les colonnes normalisées sont calculées à la lecture
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from Pipeline.storage import read_table
+
+# Colonnes normalisées par défaut
+COLUMNS = ['niveau_nappe_eau', 'RR', 'TX', 'TN']
+
+# Méthodes disponibles : 'minmax' (équivalent de MinMaxScaler) et 'zscore' (équivalent de StandardScaler)
+METHODS = ('minmax', 'zscore')
+
+_STATS = ['count', 'mean', 'm2', 'min', 'max']
+
+
+class PiezoScaler:
+    """
+    Statistiques par (piézomètre, colonne) : effectif, moyenne, somme des carrés des écarts (m2),
+    minimum et maximum. Pour chaque piézomètre, le nombre de lignes déjà intégrées et la date de la
+    dernière mesure permettent de n'intégrer que les nouvelles lignes.
+    """
+
+    def __init__(self, columns=COLUMNS, group_col='nom_piezo', date_col='date_mesure'):
+        self.columns = list(columns)
+        self.group_col = group_col
+        self.date_col = date_col
+        self.stats = pd.DataFrame(columns=_STATS, index=pd.MultiIndex.from_tuples([], names=[group_col, 'column']),
+                                  dtype=float)
+        self.seen = pd.DataFrame({'rows': pd.Series(dtype=float), 'last_date': pd.Series(dtype='datetime64[ns]')},
+                                 index=pd.Index([], name=group_col, dtype=object))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        scaler = cls(state['columns'], state['group_col'], state['date_col'])
+        records = [(piezo, col, *values) for piezo, entry in state['piezometres'].items()
+                   for col, values in entry['stats'].items()]
+        if records:
+            stats = pd.DataFrame(records, columns=[scaler.group_col, 'column'] + _STATS)
+            scaler.stats = stats.set_index([scaler.group_col, 'column']).astype(float)
+        scaler.seen = pd.DataFrame(
+            [(piezo, entry['rows'], pd.Timestamp(entry['last_date'])) for piezo, entry in state['piezometres'].items()],
+            columns=[scaler.group_col, 'rows', 'last_date'],
+        ).set_index(scaler.group_col)
+        return scaler
+
+    def save(self, path):
+        """Écriture atomique (fichier temporaire renommé) : un lecteur ne voit jamais un fichier partiel."""
+        piezometres = {}
+        for piezo, seen in self.seen.iterrows():
+            stats = self.stats.xs(piezo, level=0) if piezo in self.stats.index.get_level_values(0) else self.stats.iloc[:0]
+            piezometres[str(piezo)] = {
+                'rows': int(seen['rows']),
+                'last_date': pd.Timestamp(seen['last_date']).isoformat(),
+                'stats': {col: [float(v) for v in values] for col, values in stats[_STATS].iterrows()},
+            }
+        state = {'columns': self.columns, 'group_col': self.group_col, 'date_col': self.date_col,
+                 'piezometres': piezometres}
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f, indent=1)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def new_rows(self, data):
+        """
+        Lignes non encore intégrées : mesures postérieures à la dernière date vue du piézomètre.
+        Si l'historique d'un piézomètre ne compte plus le même nombre de lignes (valeurs aberrantes
+        retirées, corrections), ses statistiques sont réinitialisées et toutes ses lignes retournées.
+        """
+        if self.seen.empty:
+            return data
+        groups = data[self.group_col].astype(str)
+        last_date = groups.map(pd.to_datetime(self.seen['last_date']))
+        history = data[self.date_col] <= last_date
+        history_rows = history.groupby(groups).sum()
+        changed = history_rows[history_rows != self.seen['rows'].reindex(history_rows.index).fillna(0)].index
+        changed = changed[changed.isin(self.seen.index)]
+        if len(changed):
+            self.reset(changed)
+        return data[~history | groups.isin(changed)]
+
+    def reset(self, piezometres):
+        """Oublie les statistiques des piézomètres donnés (elles seront recalculées)."""
+        self.stats = self.stats.drop(index=list(piezometres), level=0, errors='ignore')
+        self.seen = self.seen.drop(index=list(piezometres), errors='ignore')
+
+    def partial_fit(self, data):
+        """
+        Intègre un lot de lignes. Les statistiques du lot sont calculées par groupby puis combinées aux
+        statistiques existantes (formule de Chan et al., généralisation de Welford à deux échantillons).
+        """
+        if data.empty:
+            return self
+        groups = data[self.group_col].astype(str)
+        long = data[self.columns].set_axis(groups, axis=0).rename_axis(self.group_col)
+        long = long.stack().rename('value').rename_axis([self.group_col, 'column'])
+        grouped = long.groupby(level=[0, 1])
+        batch = pd.DataFrame({
+            'count': grouped.count(),
+            'mean': grouped.mean(),
+            'm2': grouped.var(ddof=0) * grouped.count(),
+            'min': grouped.min(),
+            'max': grouped.max(),
+        }).astype(float)
+
+        old = self.stats.reindex(batch.index.union(self.stats.index))
+        new = batch.reindex(old.index)
+        n_a, n_b = old['count'].fillna(0), new['count'].fillna(0)
+        n = n_a + n_b
+        delta = new['mean'].fillna(0) - old['mean'].fillna(0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = old['mean'].fillna(0) + delta * np.where(n > 0, n_b / n, 0)
+            m2 = old['m2'].fillna(0) + new['m2'].fillna(0) + delta ** 2 * np.where(n > 0, n_a * n_b / n, 0)
+        self.stats = pd.DataFrame({
+            'count': n,
+            'mean': mean,
+            'm2': m2,
+            'min': np.fmin(old['min'], new['min']),
+            'max': np.fmax(old['max'], new['max']),
+        }).sort_index()
+
+        seen = pd.DataFrame({'rows': groups.value_counts(),
+                             'last_date': data[self.date_col].groupby(groups).max()})
+        merged = self.seen.reindex(seen.index.union(self.seen.index))
+        merged['rows'] = merged['rows'].fillna(0) + seen['rows'].reindex(merged.index).fillna(0)
+        merged['last_date'] = pd.concat([pd.to_datetime(merged['last_date']), seen['last_date']], axis=1).max(axis=1)
+        self.seen = merged.rename_axis(self.group_col)
+        return self
+
+    def params(self, method):
+        """Centre et échelle par (piézomètre, colonne) ; échelle nulle remplacée par 1 (comme scikit-learn)."""
+        if method == 'minmax':
+            center, scale = self.stats['min'], self.stats['max'] - self.stats['min']
+        elif method == 'zscore':
+            center, scale = self.stats['mean'], np.sqrt(self.stats['m2'] / self.stats['count'])
+        else:
+            raise ValueError(f"Méthode de normalisation inconnue : {method} (attendu : {', '.join(METHODS)})")
+        return center, scale.where(scale > 0, 1.0)
+
+    def transform(self, data, method='minmax', columns=None):
+        """Copie de `data` dont les colonnes sont normalisées avec les statistiques de leur piézomètre."""
+        center, scale = self.params(method)
+        groups = data[self.group_col].astype(str)
+        result = data.copy()
+        for col in columns or self.columns:
+            if col not in data.columns:
+                continue
+            col_center = center.xs(col, level='column') if col in center.index.get_level_values(1) else pd.Series(dtype=float)
+            col_scale = scale.xs(col, level='column') if col in scale.index.get_level_values(1) else pd.Series(dtype=float)
+            result[col] = (data[col] - groups.map(col_center).to_numpy()) / groups.map(col_scale).to_numpy()
+        return result
+
+
+def read_normalized(path, stats_path, method='minmax', columns=None, filters=None):
+    """
+    Lit un jeu de données (voir storage.read_table) et normalise ses colonnes à la volée avec les
+    statistiques enregistrées dans `stats_path` : aucune copie normalisée n'est écrite sur disque.
+    """
+    scaler = PiezoScaler.load(stats_path)
+    data = read_table(path, columns=columns, filters=filters)
+    return scaler.transform(data, method)
@@ -0,0 +1,238 @@
+# storage.py
+# Stockage en colonnes (Parquet / Arrow) des fichiers intermédiaires du dossier data/
+import os
+import shutil
+import uuid
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Colonnes texte répétées sur chaque ligne : stockées en dictionnaire (catégories)
+CATEGORICAL_COLUMNS = ['code_bss', 'nom_piezo', 'station_name', 'type_averse', 'niveau_categorise']
+
+# Colonnes de dates stockées avec un type date (plus besoin de pd.to_datetime à la relecture)
+DATE_COLUMNS = ['date_mesure', 'DATE', 'date_debut_mesure', 'date_fin_mesure']
+
+# Colonne de partitionnement des jeux de données
+PARTITION_COLUMN = 'code_bss'
+
+# Export CSV conservé pour la compatibilité avec les scripts qui lisent encore les CSV
+EXPORT_CSV = os.environ.get('EXPORT_CSV', '1') == '1'
+
+# Schémas fixes des jeux écrits page par page (append) : sans eux, une colonne entièrement vide dans
+# une page est écrite avec le type Arrow 'null' et la relecture dépend de l'ordre des fichiers
+SCHEMAS = {
+    # Champs de l'API Hub'Eau niveaux_nappes/chroniques, plus 'nom_piezo'
+    'chroniques_piezo': pa.schema([
+        ('code_bss', pa.string()),
+        ('urn_bss', pa.string()),
+        ('date_mesure', pa.timestamp('ns')),
+        ('timestamp_mesure', pa.int64()),
+        ('niveau_nappe_eau', pa.float64()),
+        ('mode_obtention', pa.string()),
+        ('statut', pa.string()),
+        ('qualification', pa.string()),
+        ('code_continuite', pa.string()),
+        ('nom_continuite', pa.string()),
+        ('code_producteur', pa.string()),
+        ('nom_producteur', pa.string()),
+        ('code_nature_mesure', pa.string()),
+        ('nom_nature_mesure', pa.string()),
+        ('profondeur_nappe', pa.float64()),
+        ('nom_piezo', pa.dictionary(pa.int32(), pa.string())),
+    ]),
+}
+
+
+def _base_path(path):
+    """Retire l'extension éventuelle : 'data/data_cleaned.csv' -> 'data/data_cleaned'."""
+    root, ext = os.path.splitext(path)
+    return root if ext in ('.csv', '.parquet') else path
+
+
+def parquet_path(path):
+    return _base_path(path) + '.parquet'
+
+
+def csv_path(path):
+    return _base_path(path) + '.csv'
+
+
+def _schema(path):
+    """Schéma fixe du jeu de données, ou None si ses types sont déduits des données."""
+    return SCHEMAS.get(os.path.basename(_base_path(path)))
+
+
+def _typed(df):
+    """Convertit les colonnes de dates et de catégories vers leurs types Arrow adaptés."""
+    df = df.copy()
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def remove_table(path):
+    """Supprime le jeu de données Parquet et son export CSV s'ils existent."""
+    target = parquet_path(path)
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    for file in (target, csv_path(path)):
+        if os.path.isfile(file):
+            os.remove(file)
+
+
+def write_table(df, path, partition=True, append=False, export_csv=EXPORT_CSV):
+    """
+    Écrit un DataFrame sous forme de jeu de données Parquet partitionné par 'code_bss'
+    ('<path>.parquet/code_bss=.../part-*.parquet'), et optionnellement en CSV.
+    Avec append=True, les lignes sont ajoutées aux fichiers existants.
+    """
+    target = parquet_path(path)
+    if not append and os.path.exists(target):
+        remove_table(path)
+
+    df = _write_parquet(df, target, _schema(path), partition)
+
+    if export_csv:
+        append_csv = append and os.path.exists(csv_path(path))
+        df.to_csv(csv_path(path), mode='a' if append_csv else 'w', header=not append_csv, index=False)
+
+
+def _write_parquet(df, target, schema=None, partition=True):
+    """Ajoute les lignes de `df` au dossier Parquet `target` ; retourne `df` aligné sur `schema`."""
+    if schema is not None:
+        # Colonnes du schéma uniquement, dans son ordre : pages Parquet et export CSV restent alignés
+        df = df.reindex(columns=schema.names)
+    table = pa.Table.from_pandas(_typed(df), preserve_index=False)
+    if schema is not None:
+        table = table.cast(schema)
+    partitioning = None
+    if partition and PARTITION_COLUMN in df.columns:
+        partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive')
+        table = table.set_column(table.schema.get_field_index(PARTITION_COLUMN), PARTITION_COLUMN,
+                                 table[PARTITION_COLUMN].cast(pa.string()))
+    ds.write_dataset(
+        table, target, format='parquet', partitioning=partitioning,
+        basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+    )
+    return df
+
+
+def write_partition(df, path, value, csv=EXPORT_CSV):
+    """
+    Remplace uniquement les lignes de la partition 'code_bss' = `value` (les autres piézomètres ne
+    sont pas réécrits). Si le jeu n'existe encore qu'en CSV, il est réécrit en entier au format Parquet.
+    """
+    target = parquet_path(path)
+    if not os.path.exists(target):
+        current = read_table(path) if os.path.exists(csv_path(path)) else df.iloc[:0]
+        if PARTITION_COLUMN in current.columns:
+            current = current[current[PARTITION_COLUMN].astype(str) != str(value)]
+        write_table(pd.concat([current, df], ignore_index=True), path, export_csv=csv)
+        return
+
+    # Dossier de partition Hive : la valeur y est encodée comme dans une URL ('/' -> '%2F')
+    name = f"{PARTITION_COLUMN}={quote(str(value), safe='')}"
+    partition = os.path.join(target, name)
+    # Nouvelle partition écrite à part (dossiers préfixés par '.', ignorés à la lecture) puis mise en place
+    # par deux renommages : pendant l'écriture, les lecteurs voient toujours l'ancienne partition, et un
+    # arrêt en cours d'écriture la laisse intacte
+    staging = os.path.join(target, f'.staging-{uuid.uuid4().hex}')
+    previous = os.path.join(target, f'.previous-{uuid.uuid4().hex}')
+    try:
+        if not df.empty:
+            _write_parquet(df, staging, _schema(path))
+        if os.path.isdir(partition):
+            os.replace(partition, previous)
+        if not df.empty:
+            try:
+                os.replace(os.path.join(staging, name), partition)
+            except OSError:
+                if os.path.isdir(previous):
+                    os.replace(previous, partition)
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.rmtree(previous, ignore_errors=True)
+    if csv:
+        export_csv(path)
+
+
+def _dataset(path):
+    partitioning = ds.HivePartitioning.discover(infer_dictionary=True)
+    dataset = ds.dataset(parquet_path(path), format='parquet', partitioning=partitioning)
+    schema = _schema(path)
+    if schema is not None:
+        # Le schéma est déduit d'un seul fichier : une colonne vide dans ce fichier (type 'null') prend son
+        # type déclaré, pour que les fichiers où elle est renseignée restent lisibles ; les colonnes
+        # déclarées absentes de ce fichier sont ajoutées
+        declared = {field.name: field.type for field in schema if field.name != PARTITION_COLUMN}
+        fields = []
+        for field in dataset.schema:
+            declared_type = declared.pop(field.name, None)
+            if declared_type is not None and pa.types.is_null(field.type):
+                field = pa.field(field.name, declared_type)
+            fields.append(field)
+        dataset = dataset.replace_schema(pa.schema(fields + [pa.field(n, t) for n, t in declared.items()]))
+    return dataset
+
+
+def read_table(path, columns=None, filters=None):
+    """
+    Lit un jeu de données en ne chargeant que les colonnes demandées (projection) et
+    les lignes satisfaisant `filters` (prédicats poussés jusqu'aux fichiers/partitions).
+    `filters` suit la syntaxe de pandas/pyarrow : [('nom_piezo', '==', 'LACAN'), ...].
+    Si le Parquet n'existe pas, le CSV correspondant est lu à la place.
+    """
+    if not os.path.exists(parquet_path(path)):
+        return _read_csv(path, columns, filters)
+
+    expression = pq.filters_to_expression(filters) if filters else None
+    table = _dataset(path).to_table(columns=columns, filter=expression)
+    return table.to_pandas()
+
+
+def _read_csv(path, columns=None, filters=None):
+    """Repli CSV : mêmes projection et filtres, appliqués après lecture."""
+    filter_columns = [f[0] for f in filters] if filters else []
+    usecols = None if columns is None else list(dict.fromkeys(list(columns) + filter_columns))
+    df = pd.read_csv(csv_path(path), usecols=usecols)
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col, op, value in filters or []:
+        df = df[_mask(df[col], op, value)]
+    return df[columns] if columns is not None else df
+
+
+def _mask(series, op, value):
+    if op in ('=', '=='):
+        return series == value
+    if op == '!=':
+        return series != value
+    if op == '<':
+        return series < value
+    if op == '<=':
+        return series <= value
+    if op == '>':
+        return series > value
+    if op == '>=':
+        return series >= value
+    if op == 'in':
+        return series.isin(value)
+    if op == 'not in':
+        return ~series.isin(value)
+    raise ValueError(f"Opérateur de filtre non supporté : {op}")
+
+
+def export_csv(path):
+    """Réécrit le CSV de compatibilité à partir du jeu de données Parquet."""
+    read_table(path).to_csv(csv_path(path), index=False)
@@ -0,0 +1,234 @@
+# alignment.py
+# Alignement des chroniques piézométriques et météo sur un calendrier journalier complet, avec
+# repérage des jours manquants et interpolation vectorisée (tous les piézomètres en une passe)
+import numpy as np
+import pandas as pd
+
+# Règles de comblement par colonne :
+#   'linear'   : interpolation linéaire entre les mesures qui encadrent le trou
+#   'seasonal' : interpolation linéaire de l'écart à la moyenne du jour de l'année (du piézomètre),
+#                repli sur 'linear' si ce jour de l'année n'a jamais été mesuré
+#   'zero'     : jours manquants mis à 0 (pluie : station sans relevé considérée sans pluie)
+#   'none'     : aucun comblement
+# Seuls les trous d'au plus `limit` jours consécutifs sont comblés (entièrement) ; 'linear' et
+# 'seasonal' ne comblent que les trous encadrés par deux mesures
+DEFAULT_RULES = {
+    'niveau_nappe_eau': {'method': 'linear', 'limit': 7},
+    'profondeur_nappe': {'method': 'linear', 'limit': 7},
+    'TX': {'method': 'linear', 'limit': 3},
+    'TN': {'method': 'linear', 'limit': 3},
+    'TM': {'method': 'linear', 'limit': 3},
+    'RR': {'method': 'none'},
+}
+
+METHODS = ('linear', 'seasonal', 'zero', 'none')
+
+PIEZO_COLUMNS = ['niveau_nappe_eau', 'profondeur_nappe']
+METEO_COLUMNS = ['RR', 'TX', 'TN', 'TM']
+
+
+def _day_numbers(dates):
+    """Dates -> numéros de jour (entiers depuis 1970-01-01)."""
+    return pd.to_datetime(dates).to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+def _bounds(valid, starts, ends):
+    """
+    Pour chaque ligne : indice de la dernière mesure valide avant (ou sur) la ligne et de la première
+    après, bornés au piézomètre de la ligne (start - 1 / end + 1 s'il n'y en a pas).
+    """
+    n = len(valid)
+    positions = np.arange(n)
+    previous = np.maximum.accumulate(np.where(valid, positions, -1))
+    following = np.minimum.accumulate(np.where(valid, positions, n)[::-1])[::-1]
+    previous = np.maximum(previous, starts - 1)
+    following = np.minimum(following, ends + 1)
+    return previous, following
+
+
+def _linear(values, valid, previous, following, starts, ends):
+    """Interpolation linéaire entre les mesures encadrantes ; NaN pour les trous non encadrés."""
+    inside = ~valid & (previous >= starts) & (following <= ends)
+    result = np.full(len(values), np.nan)
+    p, f = previous[inside], following[inside]
+    weight = (np.flatnonzero(inside) - p) / (f - p)
+    result[inside] = values[p] + weight * (values[f] - values[p])
+    return result
+
+
+def _climatology(values, valid, groups, day_of_year):
+    """Moyenne de chaque (piézomètre, jour de l'année) sur les jours mesurés ; NaN si jamais mesuré."""
+    keys = groups * 367 + day_of_year
+    size = (groups.max() + 1) * 367 if len(groups) else 0
+    sums = np.bincount(keys[valid], weights=values[valid], minlength=size)
+    counts = np.bincount(keys[valid], minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (sums / counts)[keys]
+
+
+def fill_gaps(values, groups, starts, ends, day_of_year, rule):
+    """
+    Comble les NaN de `values` (lignes triées par piézomètre puis par jour, calendrier complet)
+    selon `rule` ; retourne (valeurs complétées, masque des valeurs comblées).
+    """
+    method = rule.get('method', 'none')
+    if method not in METHODS:
+        raise ValueError(f"Méthode de comblement inconnue : {method}")
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    if method == 'none' or valid.all():
+        return values, np.zeros(len(values), dtype=bool)
+
+    previous, following = _bounds(valid, starts, ends)
+    gap_length = following - previous - 1
+    limit = rule.get('limit')
+    eligible = ~valid if limit is None else ~valid & (gap_length <= limit)
+
+    if method == 'zero':
+        candidate = np.zeros(len(values))
+    elif method == 'linear':
+        candidate = _linear(values, valid, previous, following, starts, ends)
+    else:
+        climatology = _climatology(values, valid, groups, day_of_year)
+        anomaly = _linear(values - climatology, valid, previous, following, starts, ends)
+        candidate = np.where(np.isnan(climatology), _linear(values, valid, previous, following, starts, ends),
+                             climatology + anomaly)
+
+    filled = eligible & ~np.isnan(candidate)
+    return np.where(filled, candidate, values), filled
+
+
+def _runs(missing, starts, group_of_row):
+    """Trous (suites de jours manquants d'un même piézomètre) : (piézomètre de chaque trou, longueur)."""
+    first_of_run = missing.copy()
+    first_of_run[1:] &= ~missing[:-1] | (starts[1:] == np.arange(1, len(missing)))
+    run_id = np.cumsum(first_of_run) - 1
+    lengths = np.bincount(run_id[missing], minlength=int(first_of_run.sum()))
+    return group_of_row[first_of_run], lengths
+
+
+def align_daily(piezo, stations, associations, rules=DEFAULT_RULES):
+    """
+    Calendrier journalier complet de chaque piézomètre (du premier au dernier jour mesuré), complété
+    des mesures de sa station météo. Au lieu d'une jointure interne sur (station, date), qui supprime
+    tout jour absent d'un côté, chaque jour est conservé avec :
+      - gap_piezo / gap_meteo : pas de mesure piézométrique / météo ce jour-là,
+      - filled_<colonne>      : valeur comblée selon `rules`.
+    `piezo` : code_bss, date_mesure, nom_piezo et colonnes de PIEZO_COLUMNS ;
+    `stations` : station_name, date_mesure et colonnes de METEO_COLUMNS ;
+    `associations` : code_bss, station_name.
+    Retourne (données alignées, rapport de couverture par piézomètre).
+    """
+    piezo = piezo.dropna(subset=['code_bss', 'date_mesure'])
+    stations = stations.dropna(subset=['station_name', 'date_mesure'])
+    associations = associations[['code_bss', 'station_name']].drop_duplicates('code_bss').set_index('code_bss')
+    piezo = piezo[piezo['code_bss'].isin(associations.index)]
+
+    groups, codes = pd.factorize(piezo['code_bss'], sort=True)
+    days = _day_numbers(piezo['date_mesure'])
+
+    # Nom et station de chaque piézomètre
+    first_rows = np.flatnonzero(~pd.Series(groups).duplicated().to_numpy())
+    nom_of_group = np.empty(len(codes), dtype=object)
+    nom_of_group[groups[first_rows]] = piezo['nom_piezo'].iloc[first_rows].to_numpy()
+    station_of_group = associations['station_name'].reindex(codes).to_numpy()
+
+    # Calendrier : une ligne par (piézomètre, jour), construite sans jointure
+    first = np.full(len(codes), np.iinfo(np.int64).max)
+    last = np.full(len(codes), np.iinfo(np.int64).min)
+    np.minimum.at(first, groups, days)
+    np.maximum.at(last, groups, days)
+    lengths = last - first + 1
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    n = int(lengths.sum())
+    group_of_row = np.repeat(np.arange(len(codes)), lengths)
+    starts = offsets[group_of_row]
+    ends = starts + lengths[group_of_row] - 1
+    calendar_days = first[group_of_row] + (np.arange(n) - starts)
+
+    # Valeurs piézométriques placées à leur position dans le calendrier ; si un jour est mesuré
+    # plusieurs fois, la dernière mesure est conservée
+    positions = offsets[groups] + (days - first[groups])
+    rows = np.arange(len(positions))
+    if len(positions) and np.bincount(positions, minlength=n).max() > 1:
+        last_row = np.full(n, -1)
+        np.maximum.at(last_row, positions, rows)
+        rows = last_row[last_row >= 0]
+        positions = positions[rows]
+    gap_piezo = np.ones(n, dtype=bool)
+    gap_piezo[positions] = False
+    columns = {}
+    for col in PIEZO_COLUMNS:
+        values = np.full(n, np.nan)
+        values[positions] = piezo[col].to_numpy(dtype=float)[rows]
+        columns[col] = values
+
+    # Valeurs météo : recherche (station, jour) par clé entière
+    station_codes, station_names = pd.factorize(
+        pd.concat([pd.Series(station_of_group), stations['station_name']], ignore_index=True))
+    group_station = station_codes[:len(codes)]
+    meteo_station = station_codes[len(codes):]
+    meteo_days = _day_numbers(stations['date_mesure'])
+    # Jours comptés depuis le plus ancien (les archives remontent avant 1970) : clés sans collision
+    base = min(calendar_days.min(initial=0), meteo_days.min(initial=0))
+    span = int(max(calendar_days.max(initial=0), meteo_days.max(initial=0)) - base) + 1
+    meteo_keys = pd.Index(meteo_station.astype(np.int64) * span + (meteo_days - base))
+    unique = ~meteo_keys.duplicated(keep='last')
+    lookup = meteo_keys[unique].get_indexer(
+        group_station[group_of_row].astype(np.int64) * span + (calendar_days - base))
+    gap_meteo = lookup < 0
+    for col in METEO_COLUMNS:
+        source = stations[col].to_numpy(dtype=float)[unique]
+        columns[col] = np.where(gap_meteo, np.nan, source[lookup])
+
+    # Comblement colonne par colonne, sans dépasser les limites d'un piézomètre
+    day_of_year = pd.DatetimeIndex(calendar_days.astype('datetime64[D]')).dayofyear.to_numpy()
+    filled = {}
+    for col, values in columns.items():
+        columns[col], filled[col] = fill_gaps(values, group_of_row, starts, ends, day_of_year,
+                                              rules.get(col, {'method': 'none'}))
+
+    nom_codes, nom_categories = pd.factorize(pd.Series(nom_of_group, dtype=object).fillna(''))
+    aligned = pd.DataFrame({
+        'code_bss': pd.Categorical.from_codes(group_of_row, categories=codes),
+        'date_mesure': calendar_days.astype('datetime64[D]').astype('datetime64[ns]'),
+        **{col: columns[col] for col in PIEZO_COLUMNS},
+        'nom_piezo': pd.Categorical.from_codes(nom_codes[group_of_row], categories=nom_categories),
+        'station_name': pd.Categorical.from_codes(group_station[group_of_row], categories=station_names),
+        **{col: columns[col] for col in METEO_COLUMNS},
+        'gap_piezo': gap_piezo,
+        'gap_meteo': gap_meteo,
+        **{f'filled_{col}': mask for col, mask in filled.items()},
+    })
+    return aligned, coverage_report(aligned, group_of_row, starts, codes)
+
+
+def coverage_report(aligned, group_of_row, starts, codes):
+    """
+    Couverture par piézomètre : période, jours mesurés de chaque côté, nombre et longueur maximale
+    des trous, jours comblés et jours complets après comblement (utilisables par les analyses).
+    """
+    n_groups = len(codes)
+    days = np.bincount(group_of_row, minlength=n_groups)
+    report = pd.DataFrame({
+        'code_bss': list(codes),
+        'nom_piezo': aligned.groupby(group_of_row)['nom_piezo'].first().astype(str).to_numpy(),
+        'date_debut': aligned.groupby(group_of_row)['date_mesure'].min().to_numpy(),
+        'date_fin': aligned.groupby(group_of_row)['date_mesure'].max().to_numpy(),
+        'n_jours': days,
+    })
+    for side in ('piezo', 'meteo'):
+        missing = aligned[f'gap_{side}'].to_numpy()
+        report[f'jours_{side}'] = days - np.bincount(group_of_row[missing], minlength=n_groups)
+        report[f'couverture_{side}'] = report[f'jours_{side}'] / days
+        run_group, lengths = _runs(missing, starts, group_of_row)
+        report[f'trous_{side}'] = np.bincount(run_group, minlength=n_groups)
+        longest = np.zeros(n_groups, dtype=np.int64)
+        np.maximum.at(longest, run_group, lengths)
+        report[f'trou_max_{side}'] = longest
+    for col in PIEZO_COLUMNS + METEO_COLUMNS:
+        report[f'combles_{col}'] = np.bincount(group_of_row[aligned[f'filled_{col}'].to_numpy()], minlength=n_groups)
+    complete = aligned[['niveau_nappe_eau'] + METEO_COLUMNS].notna().all(axis=1).to_numpy()
+    report['jours_complets'] = np.bincount(group_of_row[complete], minlength=n_groups)
+    report['couverture_complete'] = report['jours_complets'] / days
+    return report
@@ -1,9 +1,17 @@
 import pandas as pd
+import os
+import sys
+from alignment import DEFAULT_RULES, align_daily
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.instrumentation import stage
+from Pipeline.storage import write_table
 
 # Charger les fichiers
-chronique_piezo = pd.read_csv('chroniques_piezo.csv')
-filtered_stations = pd.read_csv('filtered_stations.csv')
-associations = pd.read_csv('piezometres_association_stations.csv')
+with stage('combinaison.lecture') as m:
+    chronique_piezo = pd.read_csv('chroniques_piezo.csv')
+    filtered_stations = pd.read_csv('filtered_stations.csv')
+    associations = pd.read_csv('piezometres_association_stations.csv')
+    m.rows = len(chronique_piezo) + len(filtered_stations)
 
 # Sélectionner les colonnes nécessaires
 piezo_cols = ['code_bss', 'date_mesure', 'niveau_nappe_eau', 'profondeur_nappe', 'nom_piezo']
@@ -21,18 +29,21 @@ filtered_stations['DATE'] = pd.to_datetime(filtered_stations['DATE'], format='%Y
 # Renommer la colonne 'DATE' pour correspondre
 filtered_stations = filtered_stations.rename(columns={'DATE': 'date_mesure'})
 
-# Joindre les associations pour s'assurer que chaque piézomètre a la bonne station associée
-chronique_piezo = pd.merge(chronique_piezo, associations, on='code_bss', how='inner')
+with stage('combinaison.fusion') as m:
+    # Chaque piézomètre est placé sur un calendrier journalier complet avec les mesures de sa station :
+    # les jours absents d'un côté sont conservés et signalés (gap_piezo, gap_meteo), les trous courts
+    # sont comblés selon alignment.DEFAULT_RULES (filled_<colonne>), au lieu d'être supprimés par une
+    # jointure interne qui rendrait les décalages (lags) faux
+    combined_data, coverage = align_daily(chronique_piezo, filtered_stations, associations, DEFAULT_RULES)
+    m.rows = len(combined_data)
 
-# Vérifier que chaque ligne est associée à la bonne station
-combined_data = pd.merge(
-    chronique_piezo, 
-    filtered_stations, 
-    on=['station_name', 'date_mesure'],  # Fusionner sur station_name et date_mesure
-    how='inner'
-)
+# Rapport de couverture par piézomètre (jours mesurés, trous, jours comblés)
+coverage.to_csv('couverture_chroniques.csv', index=False)
+print(coverage[['nom_piezo', 'n_jours', 'couverture_piezo', 'couverture_meteo', 'trou_max_piezo',
+                'couverture_complete']].to_string(index=False))
 
 # Enregistrer les données combinées
-combined_data.to_csv('combined_chroniques.csv', index=False)
+with stage('combinaison.ecriture', rows=len(combined_data)):
+    write_table(combined_data, 'combined_chroniques')
 
-print("Données corrigées et enregistrées dans 'combined_chroniques.csv'.")
\ No newline at end of file
+print("Données corrigées et enregistrées dans 'combined_chroniques.parquet' (et 'combined_chroniques.csv').")
\ No newline at end of file
@@ -1,45 +1,39 @@
-import requests
+import os
+import sys
 import pandas as pd
-from io import StringIO
+from hubeau_client import fetch_chroniques
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.storage import parquet_path, read_table, remove_table, write_table
+
+# Mise à jour incrémentale : ne télécharger que les mesures postérieures à la dernière date stockée
+INCREMENTAL = True
+
+# Nombre maximal de requêtes simultanées vers Hub'Eau
+CONCURRENCY = 4
 
 # Charger les données des piézomètres
 piezometres_data = pd.read_csv("piezometres_association_stations_cleaned.csv")
 piezometres_bss_id = piezometres_data['code_bss']
-nbr_piezo_data = piezometres_data['nb_mesures_piezo']
-piezometres_name = piezometres_data['nom_de_piezometre']
-print(nbr_piezo_data[0] + nbr_piezo_data[1] + nbr_piezo_data[2])
-if nbr_piezo_data[0] + nbr_piezo_data[1] + nbr_piezo_data[2] > 20000:
-    nbr_piezo_data = [20000, 0, 0]
-# Construire l'URL pour récupérer les chroniques des piézomètres
-url = (
-    f"https://hubeau.eaufrance.fr/api/v1/niveaux_nappes/chroniques.csv?"
-    f"code_bss={piezometres_bss_id[0]},{piezometres_bss_id[1]},{piezometres_bss_id[2]}&"
-    f"size={nbr_piezo_data[0] + nbr_piezo_data[1] + nbr_piezo_data[2]}"
-)
-
-# Envoyer la requête pour récupérer les chroniques
-response = requests.get(url)
+piezometres_name = dict(zip(piezometres_data['code_bss'], piezometres_data['nom_de_piezometre']))
 
-# Vérifier si la requête a réussi
-if response.status_code in [200, 206]:  # Code 200 (OK) ou 206 (Partial Content)
-    # Charger les chroniques dans un DataFrame
-    chroniques_piezo = pd.read_csv(StringIO(response.text), delimiter=';')
+# Dernière date déjà stockée pour chaque piézomètre
+since = {}
+if INCREMENTAL and os.path.exists(parquet_path('chroniques_piezo')):
+    stored = read_table('chroniques_piezo', columns=['code_bss', 'date_mesure'])
+    since = stored.groupby('code_bss', observed=True)['date_mesure'].max().to_dict()
+    print(f"Mise à jour incrémentale de {len(since)} piézomètres déjà stockés.")
+elif not INCREMENTAL:
+    remove_table('chroniques_piezo')
 
-    # Ajouter une colonne 'nom_piezo' en fonction du 'bss_id'
-    # Effectuer une jointure avec piezometres_data
-    chroniques_piezo = pd.merge(
-        chroniques_piezo,
-        piezometres_data[['code_bss', 'nom_de_piezometre']],
-        left_on='code_bss',
-        right_on='code_bss',
-        how='left'
-    )
+# Enregistrer chaque page reçue dès son arrivée
+def store_page(page):
+    # Ajouter une colonne 'nom_piezo' en fonction du 'code_bss'
+    page['nom_piezo'] = page['code_bss'].map(piezometres_name)
+    write_table(page, 'chroniques_piezo', append=True)
 
-    # Renommer la colonne 'libelle_pe' en 'nom_piezo'
-    chroniques_piezo = chroniques_piezo.rename(columns={'nom_de_piezometre': 'nom_piezo'})
+# Récupérer les chroniques de tous les piézomètres en suivant la pagination de l'API
+nbr_piezo_data = fetch_chroniques(piezometres_bss_id, store_page, since=since, concurrency=CONCURRENCY)
 
-    # Sauvegarder les chroniques dans un fichier CSV
-    chroniques_piezo.to_csv('chroniques_piezo.csv', index=False)
-    print("Les chroniques des piézomètres ont été sauvegardées dans 'chroniques_piezo.csv'.")
-else:
-    print(f"Erreur lors de la récupération des données des piézomètres: {response.status_code}")
\ No newline at end of file
+for code_bss, n_rows in nbr_piezo_data.items():
+    print(f"{code_bss} ({piezometres_name[code_bss]}) : {n_rows} nouvelles mesures.")
+print("Les chroniques des piézomètres ont été sauvegardées dans 'chroniques_piezo.parquet'.")
@@ -0,0 +1,117 @@
+# hubeau_client.py
+# Client asynchrone de l'API Hub'Eau (niveaux des nappes) avec pagination et limite de concurrence
+import asyncio
+
+import aiohttp
+import pandas as pd
+
+BASE_URL = 'https://hubeau.eaufrance.fr/api/v1/niveaux_nappes'
+
+# Taille de page maximale acceptée par l'API ; au-delà de page * size = 20000 l'API ne
+# fournit plus de lien 'next' et la suite est obtenue en avançant date_debut_mesure
+PAGE_SIZE = 20000
+
+# Codes HTTP renvoyant des données (206 = contenu partiel, d'autres pages suivent)
+OK_STATUSES = (200, 206)
+
+# Codes HTTP pour lesquels la requête est relancée après une attente exponentielle
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HubEauClient:
+    """
+    Récupère les chroniques piézométriques d'un nombre quelconque de 'code_bss'.
+    `base_url` peut pointer vers un serveur HTTP local (bouchon) pour les essais.
+    """
+
+    def __init__(self, base_url=BASE_URL, concurrency=4, page_size=PAGE_SIZE, max_retries=5, backoff=1.0,
+                 timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def _get(self, session, semaphore, url, params=None):
+        """Requête GET avec relance sur 429/5xx et erreurs réseau (attente exponentielle)."""
+        for attempt in range(self.max_retries + 1):
+            delay = self.backoff * 2 ** attempt
+            try:
+                async with semaphore, session.get(url, params=params) as response:
+                    if response.status in OK_STATUSES:
+                        return await response.json(content_type=None)
+                    if response.status not in RETRY_STATUSES or attempt == self.max_retries:
+                        response.raise_for_status()
+                        raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                          status=response.status)
+                    retry_after = response.headers.get('Retry-After')
+                    if retry_after and retry_after.isdigit():
+                        delay = float(retry_after)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+            await asyncio.sleep(delay)
+
+    async def iter_pages(self, session, semaphore, code_bss, date_debut=None):
+        """Produit les pages (DataFrame) d'un piézomètre, par ordre chronologique."""
+        cursor = date_debut
+        while True:
+            params = {'code_bss': code_bss, 'size': self.page_size, 'sort': 'asc'}
+            if cursor is not None:
+                params['date_debut_mesure'] = cursor
+            url = f'{self.base_url}/chroniques'
+            received = 0
+            last_date = None
+            payload = {}
+            while url:
+                payload = await self._get(session, semaphore, url, params)
+                rows = payload.get('data') or []
+                if rows:
+                    received += len(rows)
+                    last_date = rows[-1]['date_mesure']
+                    yield pd.DataFrame(rows)
+                # Le lien 'next' contient déjà tous les paramètres de la requête
+                url = payload.get('next')
+                params = None
+
+            # Profondeur maximale atteinte : reprendre après la dernière date reçue
+            if last_date is None or received >= payload.get('count', received):
+                break
+            cursor = (pd.Timestamp(last_date) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+    async def _fetch_one(self, session, semaphore, code_bss, on_page, date_debut):
+        n_rows = 0
+        async for page in self.iter_pages(session, semaphore, code_bss, date_debut):
+            n_rows += len(page)
+            on_page(page)
+        return code_bss, n_rows
+
+    async def fetch(self, codes_bss, on_page, since=None):
+        """
+        Télécharge les chroniques de tous les 'code_bss' (au plus `concurrency` requêtes
+        simultanées) et transmet chaque page à `on_page` dès sa réception.
+        `since` associe un code_bss à la dernière date déjà stockée (mise à jour incrémentale).
+        Retourne le nombre de mesures reçues par code_bss.
+        """
+        since = since or {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            tasks = [
+                self._fetch_one(session, semaphore, code, on_page, _next_day(since.get(code)))
+                for code in codes_bss
+            ]
+            return dict(await asyncio.gather(*tasks))
+
+
+def _next_day(date):
+    """Date de début pour une mise à jour incrémentale : lendemain de la dernière mesure stockée."""
+    if date is None or pd.isna(date):
+        return None
+    return (pd.Timestamp(date) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def fetch_chroniques(codes_bss, on_page, since=None, **client_options):
+    """Point d'entrée synchrone : voir HubEauClient.fetch."""
+    client = HubEauClient(**client_options)
+    return asyncio.run(client.fetch(list(codes_bss), on_page, since))
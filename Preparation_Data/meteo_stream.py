@@ -0,0 +1,86 @@
+# meteo_stream.py
+# Lecture en flux (par blocs) des archives quotidiennes Météo-France Q_<département>
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# Colonnes utiles des archives RR-T-Vent (les colonnes de vent ne sont jamais chargées)
+USECOLS = ['NUM_POSTE', 'NOM_USUEL', 'AAAAMMJJ', 'RR', 'TN', 'TX', 'TM']
+DTYPES = {
+    'NUM_POSTE': str,
+    'NOM_USUEL': str,
+    'AAAAMMJJ': str,
+    'RR': 'float64',
+    'TN': 'float64',
+    'TX': 'float64',
+    'TM': 'float64',
+}
+
+# Archives quotidiennes Météo-France à traiter (une ou plusieurs par département), relatives à data/
+ARCHIVES = [
+    'Q_34_previous-1950-2023_RR-T-Vent.csv.gz',
+    'Q_34_latest-2024-2025_RR-T-Vent.csv.gz',
+]
+
+# Nombre de lignes décompressées à la fois
+CHUNKSIZE = 500_000
+
+
+def measurement_intervals(piezometres):
+    """Intervalles [date_debut_mesure, date_fin_mesure] à conserver pour chaque station associée."""
+    intervals = piezometres[['station_name', 'date_debut_mesure', 'date_fin_mesure']].copy()
+    intervals['date_debut_mesure'] = pd.to_datetime(intervals['date_debut_mesure'], format='%Y-%m-%d', errors='coerce')
+    intervals['date_fin_mesure'] = pd.to_datetime(intervals['date_fin_mesure'], format='%Y-%m-%d', errors='coerce')
+    return intervals
+
+
+def _filter_chunk(chunk, intervals):
+    """Filtre un bloc sur les stations retenues puis sur les intervalles de mesure des piézomètres."""
+    chunk = chunk[chunk['NOM_USUEL'].isin(intervals['station_name'])]
+    if chunk.empty:
+        return chunk, 0
+
+    # Convertir la colonne de date au format 'AAAA-MM-JJ' et écarter les dates invalides
+    chunk = chunk.assign(DATE=pd.to_datetime(chunk['AAAAMMJJ'], format='%Y%m%d', errors='coerce'))
+    n_invalid = int(chunk['DATE'].isna().sum())
+    chunk = chunk.dropna(subset=['DATE'])
+
+    merged = pd.merge(chunk, intervals, left_on='NOM_USUEL', right_on='station_name', how='inner')
+    within = (merged['DATE'] >= merged['date_debut_mesure']) & (merged['DATE'] <= merged['date_fin_mesure'])
+    return merged[within], n_invalid
+
+
+def stream_archive(path, intervals, chunksize=CHUNKSIZE):
+    """
+    Lit une archive .csv.gz par blocs de `chunksize` lignes avec uniquement les colonnes utiles.
+    Seules les lignes des stations retenues et dans les intervalles de mesure sont accumulées.
+    """
+    kept = []
+    n_invalid = 0
+    reader = pd.read_csv(path, compression='gzip', sep=';', usecols=USECOLS, dtype=DTYPES, chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            filtered, invalid = _filter_chunk(chunk, intervals)
+            n_invalid += invalid
+            if not filtered.empty:
+                kept.append(filtered)
+    if n_invalid:
+        print(f"{path} : {n_invalid} dates invalides ignorées.")
+    if not kept:
+        return pd.DataFrame(columns=USECOLS + ['DATE', 'station_name', 'date_debut_mesure', 'date_fin_mesure'])
+    return pd.concat(kept, ignore_index=True)
+
+
+def load_archives(paths, piezometres, chunksize=CHUNKSIZE, max_workers=None):
+    """
+    Traite une liste d'archives départementales en parallèle (un processus par archive)
+    et retourne les chroniques filtrées de toutes les stations associées.
+    """
+    intervals = measurement_intervals(piezometres)
+    if len(paths) == 1 or max_workers == 1:
+        frames = [stream_archive(path, intervals, chunksize) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(stream_archive, paths, [intervals] * len(paths), [chunksize] * len(paths)))
+    stations = pd.concat(frames, ignore_index=True)
+    return stations.sort_values(by=['NOM_USUEL', 'DATE'], kind='stable').reset_index(drop=True)
@@ -0,0 +1,83 @@
+# spatial_index.py
+# Index spatial pour associer chaque piézomètre à la station météo la plus proche
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+R_TERRE_KM = 6371.0  # Rayon de la Terre en km
+
+
+class StationIndex:
+    """BallTree (métrique haversine) construit une seule fois sur les coordonnées des stations."""
+
+    def __init__(self, stations_df, lat_col='Latitude', lon_col='Longitude'):
+        self.stations = stations_df.dropna(subset=[lat_col, lon_col]).reset_index(drop=True)
+        self.lat_col = lat_col
+        self.lon_col = lon_col
+        coords = np.radians(self.stations[[lat_col, lon_col]].to_numpy(dtype=float))
+        self.tree = BallTree(coords, metric='haversine')
+
+    def query(self, lat, lon, radius_km=10.0, fallback=False):
+        """
+        Retourne (indices des stations, distances en km) pour chaque point.
+        Les points sans station dans le rayon reçoivent la plus proche station si
+        `fallback`, sinon -1 et NaN ; les points sans coordonnées reçoivent toujours -1 et NaN.
+        """
+        points = np.radians(np.column_stack([np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)]))
+        n = len(points)
+        indices = np.full(n, -1, dtype=np.int64)
+        distances = np.full(n, np.nan)
+        # Points sans coordonnées écartés, comme les stations (dropna)
+        located = np.flatnonzero(np.isfinite(points).all(axis=1))
+        if len(located) == 0 or len(self.stations) == 0:
+            return indices, distances
+
+        # Requête de rayon groupée : une seule traversée de l'arbre pour tous les points
+        ind, dist = self.tree.query_radius(points[located], r=radius_km / R_TERRE_KM,
+                                           return_distance=True, sort_results=True)
+        for i, station_ind, station_dist in zip(located, ind, dist):
+            if len(station_ind):
+                indices[i] = station_ind[0]
+                distances[i] = station_dist[0] * R_TERRE_KM
+
+        # Repli sur la station la plus proche pour les points restés sans station
+        missing = located[indices[located] < 0]
+        if fallback and len(missing):
+            dist, ind = self.tree.query(points[missing], k=1)
+            indices[missing] = ind[:, 0]
+            distances[missing] = dist[:, 0] * R_TERRE_KM
+        return indices, distances
+
+
+# Association de tous les piézomètres en un seul appel
+def associate_piezometres(piezometres_df, stations_df, radius_km=10.0, fallback=False):
+    """
+    Construit la table d'association piézomètre -> station la plus proche.
+    Les colonnes produites sont celles de 'piezometres_association_stations.csv',
+    avec en plus la colonne 'distance' (km) calculée par le même moteur.
+    """
+    index = StationIndex(stations_df)
+    indices, distances = index.query(piezometres_df['y'], piezometres_df['x'],
+                                     radius_km=radius_km, fallback=fallback)
+    found = indices >= 0
+
+    for _, piezo in piezometres_df[~found].iterrows():
+        print(f"Aucune station trouvée pour le piézomètre {piezo['code_bss']} {piezo['libelle_pe']} "
+              f"dans un rayon de {radius_km:g} km.")
+
+    piezos = piezometres_df[found].reset_index(drop=True)
+    stations = index.stations.iloc[indices[found]].reset_index(drop=True)
+    return pd.DataFrame({
+        'code_bss': piezos['code_bss'],
+        'nom_de_piezometre': piezos['libelle_pe'],
+        'date_debut_mesure': piezos['date_debut_mesure'],
+        'date_fin_mesure': piezos['date_fin_mesure'],
+        'nb_mesures_piezo': piezos['nb_mesures_piezo'],
+        'station_id': stations['Id_station'],
+        'station_name': stations['Nom_usuel'],
+        'piézomètre_lat': piezos['y'],
+        'piézomètre_lon': piezos['x'],
+        'station_lat': stations['Latitude'],
+        'station_lon': stations['Longitude'],
+        'distance': distances[found],
+    })
@@ -0,0 +1,127 @@
+# granger.py
+# Tests de causalité de Granger pour tous les lags 1..L en une seule passe (équations normales par blocs)
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Lag maximal testé par défaut
+MAX_LAG = 15
+
+# Sens testés : (variable expliquée, variable causale candidate)
+DIRECTIONS = [('niveau_nappe_eau', 'RR'), ('RR', 'niveau_nappe_eau')]
+
+
+def lagged_grams(y, x, max_lag):
+    """
+    Matrices de Gram G[L-1] = Zᵀ Z pour chaque lag L, où Z a pour colonnes
+    [1, y(t-1..t-M), x(t-1..t-M), y(t)] (M = max_lag) et pour lignes les instants t >= L :
+    c'est l'échantillon utilisé par statsmodels pour le lag L. Les colonnes de lags > L sont
+    nulles sur les lignes ajoutées, mais elles ne servent pas aux modèles de lag L.
+
+    G[M-1] est calculée par un seul produit matriciel, puis les lags inférieurs s'obtiennent
+    par mises à jour de rang 1 (une ligne de plus à chaque fois).
+    Les séries sont centrées : l'intercept absorbe le décalage et le conditionnement s'améliore.
+    """
+    y = np.asarray(y, dtype=float)
+    x = np.asarray(x, dtype=float)
+    y = y - y.mean()
+    x = x - x.mean()
+    n = len(y)
+    width = 2 * max_lag + 2
+
+    def row(t):
+        z = np.zeros(width)
+        z[0] = 1.0
+        k = min(t, max_lag)
+        z[1:k + 1] = y[t - 1::-1][:k]
+        z[max_lag + 1:max_lag + k + 1] = x[t - 1::-1][:k]
+        z[-1] = y[t]
+        return z
+
+    Z = np.empty((n - max_lag, width))
+    Z[:, 0] = 1.0
+    for k in range(1, max_lag + 1):
+        Z[:, k] = y[max_lag - k:n - k]
+        Z[:, max_lag + k] = x[max_lag - k:n - k]
+    Z[:, -1] = y[max_lag:]
+
+    grams = np.empty((max_lag, width, width))
+    grams[-1] = Z.T @ Z
+    for lag in range(max_lag - 1, 0, -1):
+        z = row(lag)
+        grams[lag - 1] = grams[lag] + np.outer(z, z)
+    return grams
+
+
+def _ssr(grams, columns):
+    """Somme des carrés des résidus de y(t) sur `columns`, pour une pile de matrices de Gram."""
+    xtx = grams[:, columns][:, :, columns]
+    xty = grams[:, columns, -1]
+    try:
+        beta = np.linalg.solve(xtx, xty[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        # Colonne constante (ex. aucune pluie sur la période) : pseudo-inverse, comme OLS de statsmodels
+        beta = (np.linalg.pinv(xtx) @ xty[..., None])[..., 0]
+    return grams[:, -1, -1] - np.einsum('ij,ij->i', xty, beta)
+
+
+def granger_from_grams(grams, n_obs, max_lag):
+    """
+    Statistiques F (ssr_ftest de statsmodels) pour chaque lag, à partir des matrices de Gram
+    d'une pile de séries : grams de forme (séries, lags, p, p), n_obs de forme (séries,).
+    Retourne F, p-values et degrés de liberté du dénominateur, de forme (séries, lags).
+    """
+    n_series = grams.shape[0]
+    f_stat = np.full((n_series, max_lag), np.nan)
+    df_denom = np.full((n_series, max_lag), np.nan)
+    for lag in range(1, max_lag + 1):
+        own = [0] + list(range(1, lag + 1))
+        joint = own + list(range(max_lag + 1, max_lag + lag + 1))
+        stack = grams[:, lag - 1]
+        ssr_own = _ssr(stack, own)
+        ssr_joint = _ssr(stack, joint)
+        # statsmodels utilise les n - lag dernières observations pour le lag `lag`
+        df = n_obs - lag - len(joint)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            f = (ssr_own - ssr_joint) / ssr_joint / lag * df
+        valid = (df > 0) & (ssr_joint > 0)
+        f_stat[:, lag - 1] = np.where(valid, np.maximum(f, 0.0), np.nan)
+        df_denom[:, lag - 1] = np.where(df > 0, df, np.nan)
+    lags = np.arange(1, max_lag + 1)
+    p_value = stats.f.sf(f_stat, lags, df_denom)
+    return f_stat, p_value, df_denom
+
+
+def granger_batch(data, max_lag=MAX_LAG, group_col='nom_piezo', date_col='date_mesure', directions=DIRECTIONS):
+    """
+    Tests de Granger de lag 1 à `max_lag`, dans les deux sens, pour tous les piézomètres.
+    Chaque série est lue une fois pour construire ses matrices de Gram ; les systèmes des
+    modèles restreint et complet sont ensuite résolus ensemble pour tous les piézomètres.
+    Retourne un tableau : nom_piezo, direction, lag_tested, f_stat, p_value, df_num, df_denom.
+    """
+    records = []
+    for target, cause in directions:
+        names, grams, n_obs = [], [], []
+        for name, part in data.groupby(group_col, sort=True, observed=True):
+            part = part.sort_values(by=date_col).dropna(subset=[target, cause])
+            # Les lags sans assez d'observations ressortent en NaN
+            if len(part) <= max_lag + 1:
+                continue
+            names.append(name)
+            grams.append(lagged_grams(part[target].to_numpy(), part[cause].to_numpy(), max_lag))
+            n_obs.append(len(part))
+        if not names:
+            continue
+        f_stat, p_value, df_denom = granger_from_grams(np.stack(grams), np.array(n_obs), max_lag)
+        for i, name in enumerate(names):
+            for lag in range(1, max_lag + 1):
+                records.append({
+                    group_col: name,
+                    'direction': f'{cause} -> {target}',
+                    'lag_tested': lag,
+                    'f_stat': f_stat[i, lag - 1],
+                    'p_value': p_value[i, lag - 1],
+                    'df_num': lag,
+                    'df_denom': df_denom[i, lag - 1],
+                })
+    return pd.DataFrame(records)
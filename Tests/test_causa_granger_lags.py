@@ -1,67 +1,65 @@
-from statsmodels.tsa.stattools import grangercausalitytests
 import pandas as pd
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.cache import ResultCache, data_fingerprint
+from Pipeline.instrumentation import stage
+from Pipeline.storage import read_table
+from granger import MAX_LAG, granger_batch
 
 # Fonction pour normaliser les noms de fichiers
 def normalize_filename(name):
     """Remplace les espaces et caractères spéciaux par des underscores."""
     return name.replace(" ", "_").replace("-", "_").replace("/", "_").replace("(", "").replace(")", "")
 
-# Charger les données nettoyées
-data = pd.read_csv('./data/data_with_lags15.csv')
+if __name__ == '__main__':
+    # Charger les séries brutes (les lags sont construits par le test lui-même : utiliser une
+    # colonne RR_lagN pré-décalée reviendrait à doubler les décalages)
+    with stage('granger.lecture') as m:
+        data = read_table('./data/data_cleaned_outliers', columns=['nom_piezo', 'date_mesure', 'niveau_nappe_eau', 'RR'])
+        m.rows = len(data)
 
-# Charger les lags optimaux par piézomètre
-optimal_lags = pd.read_csv('./assets/max_corr_lags.csv')  # Fichier contenant les colonnes 'nom_piezo' et 'lag'
+    # Charger les lags optimaux par piézomètre (conservés pour information dans les résultats)
+    optimal_lags = pd.read_csv('./assets/max_corr_lags.csv')  # Fichier contenant les colonnes 'nom_piezo' et 'lag'
+    lags = dict(zip(optimal_lags['nom_piezo'], optimal_lags['lag'].astype(int)))
 
-# Créer un dictionnaire pour stocker les résultats
-results = []
+    # Résultats déjà calculés pour les piézomètres dont les données n'ont pas changé
+    cache = ResultCache()
+    params = {'max_lag': MAX_LAG, 'engine': 'ols-batch'}
+    results, keys, to_compute = [], {}, []
+    for piezometre, piezo_data in data.groupby('nom_piezo', sort=True, observed=True):
+        keys[piezometre] = cache.key('granger', data_fingerprint(piezo_data), params)
+        cached = cache.get(keys[piezometre]) if cache.enabled else None
+        if cached is not None:
+            results.append(cached)
+        else:
+            to_compute.append(piezometre)
 
-# Itérer sur les piézomètres et leurs lags optimaux
-for _, row in optimal_lags.iterrows():
-    piezometre = row['nom_piezo']
-    lag = int(row['lag'])  # S'assurer que le lag est un entier
-    lag_column = f'RR_lag{lag}'  # Construire dynamiquement le nom de la colonne
+    # Tests de lag 1 à MAX_LAG, dans les deux sens, pour tous les piézomètres restants en une passe
+    if to_compute:
+        with stage('granger.tests') as m:
+            subset = data[data['nom_piezo'].isin(to_compute)]
+            computed = granger_batch(subset, max_lag=MAX_LAG)
+            m.rows = len(subset)
+        for piezometre, piezo_results in computed.groupby('nom_piezo', sort=True, observed=True):
+            if cache.enabled:
+                cache.put(keys[piezometre], piezo_results)
+            results.append(piezo_results)
+    print(f"Piézomètres testés : {len(to_compute)}, relus depuis le cache : {len(keys) - len(to_compute)}")
 
-    if lag > 15:
-        print(f"\nPiézomètre : {piezometre}")
-        print(f"Lag optimal : {lag} -> Ignoré car supérieur à 15.")
-        continue
-    
-    # Filtrer les données pour le piézomètre et les colonnes nécessaires
-    piezo_data = data[data['nom_piezo'] == piezometre].dropna(subset=[lag_column, 'niveau_nappe_eau'])
-    
-    if not piezo_data.empty:
-        # Préparer les données pour le test de causalité
-        lags_data = piezo_data[['niveau_nappe_eau', lag_column]]
+    results_df = pd.concat(results, ignore_index=True)
+    results_df['optimal_lag'] = results_df['nom_piezo'].map(lags)
+    results_df['nom_piezo'] = results_df['nom_piezo'].astype(str).map(normalize_filename)
+    results_df = results_df.sort_values(by=['nom_piezo', 'direction', 'lag_tested']).reset_index(drop=True)
+    results_df = results_df[['nom_piezo', 'direction', 'lag_tested', 'optimal_lag',
+                             'f_stat', 'p_value', 'df_num', 'df_denom']]
 
-        # Effectuer le test de causalité de Granger
-        print(f"\nPiézomètre : {piezometre}")
-        test_result = grangercausalitytests(lags_data, maxlag=lag, verbose=False)
+    # Créer un dossier pour enregistrer les résultats
+    output_dir = './assets'
+    os.makedirs(output_dir, exist_ok=True)
 
-        # Enregistrer les résultats pour chaque lag
-        for lag_key, result in test_result.items():
-            p_value = result[0]['ssr_ftest'][1]  # P-value du test F
-            results.append({
-                'piezometre': normalize_filename(piezometre),
-                'lag_tested': lag_key,
-                'optimal_lag': lag,
-                'p_value': p_value
-            })
-    else:
-        print(f"\nPiézomètre : {piezometre}")
-        print(f"Lag optimal : {lag}")
-        print("Aucune donnée disponible après filtrage.")
+    # Sauvegarder les résultats dans un fichier CSV
+    results_file_path = os.path.join(output_dir, 'granger_results.csv')
+    results_df.to_csv(results_file_path, index=False)
 
-# Convertir les résultats en DataFrame
-results_df = pd.DataFrame(results)
-
-# Créer un dossier pour enregistrer les résultats
-output_dir = './assets'
-os.makedirs(output_dir, exist_ok=True)
-
-# Sauvegarder les résultats dans un fichier CSV
-results_file_path = os.path.join(output_dir, 'granger_results.csv')
-results_df.rename(columns={'piezometre': 'nom_piezo'}, inplace=True)
-results_df.to_csv('./assets/granger_results.csv', index=False)
-
-print(f"Les résultats des tests de causalité de Granger ont été sauvegardés dans '{results_file_path}'.")
\ No newline at end of file
+    print(f"Les résultats des tests de causalité de Granger ont été sauvegardés dans '{results_file_path}'.")
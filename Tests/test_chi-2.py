@@ -1,72 +1,89 @@
 import pandas as pd
 from scipy.stats import chi2_contingency
 import seaborn as sns
-import matplotlib.pyplot as plt
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.cache import process_cache
+from Pipeline.instrumentation import stage
+from Pipeline.render import RenderJob, render_all
+from Pipeline.runner import collect_records, run_per_piezometre, split_by_piezometre
 
 # Fonction pour normaliser les noms de fichiers
 def normalize_filename(name):
     """Remplace les espaces et caractères spéciaux par des underscores."""
     return name.replace(" ", "_").replace("-", "_").replace("/", "_").replace("(", "").replace(")", "")
 
-# Charger les données nettoyées avec les colonnes ajoutées
-data = pd.read_csv('./data/data_cleaned_outliers.csv')
-
-# Créer un dossier pour enregistrer les visualisations
+# Dossier pour enregistrer les visualisations
 output_dir = './assets/chi2_visualizations'
-os.makedirs(output_dir, exist_ok=True)
-
-# Initialiser une liste pour stocker les résultats
-chi2_results = []
 
-# Obtenir la liste unique des piézomètres
-piezometres = data['nom_piezo'].unique()
+# Visualisation de la table de contingence pour un piézomètre
+def plot_contingency(fig, contingency_table, piezometre, chi2, p):
+    ax = fig.add_subplot()
+    sns.heatmap(contingency_table, annot=True, fmt="d", cmap="coolwarm", cbar=True, ax=ax)
+    ax.set_title(f"Type d'averse vs Niveau des nappes\n(Piézomètre : {piezometre})")
+    ax.set_xlabel("Niveau des nappes (catégorisé)")
+    ax.set_ylabel("Type d'averse")
+    
+    # Ajouter les résultats du Chi-deux sur le graphique
+    ax.text(
+        0.5, -0.2,
+        f"Chi2 : {chi2:.4f} | p-value : {p:.4e} | Dépendance : {'Oui' if p < 0.05 else 'Non'}",
+        transform=ax.transAxes,
+        horizontalalignment='center', fontsize=10, color="black"
+    )
+    
+    fig.tight_layout()
 
-# Effectuer le test Chi-deux pour chaque piézomètre
-for piezometre in piezometres:
+# Effectuer le test Chi-deux pour un piézomètre
+def chi2_piezometre(piezometre, piezo_data):
     print(f"\nPiézomètre : {piezometre}")
     
-    # Filtrer les données pour le piézomètre en cours
-    piezo_data = data[data['nom_piezo'] == piezometre]
-    
     # Créer une table de contingence entre 'type_averse' et 'niveau_categorise'
     contingency_table = pd.crosstab(piezo_data['type_averse'], piezo_data['niveau_categorise'])
     
-    # Réaliser le test de Chi-deux
-    chi2, p, dof, expected = chi2_contingency(contingency_table)
-    
-    # Enregistrer les résultats dans une liste
-    chi2_results.append({
+    # Réaliser le test de Chi-deux (relu depuis le cache si les données n'ont pas changé)
+    chi2, p, dof, expected = process_cache().cached(
+        'chi2', piezo_data[['type_averse', 'niveau_categorise']], {'table': 'type_averse x niveau_categorise'},
+        lambda: tuple(chi2_contingency(contingency_table))
+    )
+
+    return {
         'piezometre': normalize_filename(piezometre),
         'chi2': chi2,
         'p_value': p,
         'dof': dof,
         'dependent': p < 0.05
-    })
-    
-    # Visualisation de la table de contingence pour le piézomètre en cours
-    plt.figure(figsize=(10, 6))
-    heatmap = sns.heatmap(contingency_table, annot=True, fmt="d", cmap="coolwarm", cbar=True)
-    plt.title(f"Type d'averse vs Niveau des nappes\n(Piézomètre : {piezometre})")
-    plt.xlabel("Niveau des nappes (catégorisé)")
-    plt.ylabel("Type d'averse")
-    
-    # Ajouter les résultats du Chi-deux sur le graphique
-    plt.text(
-        0.5, -0.2,
-        f"Chi2 : {chi2:.4f} | p-value : {p:.4e} | Dépendance : {'Oui' if p < 0.05 else 'Non'}",
-        transform=plt.gca().transAxes,
-        horizontalalignment='center', fontsize=10, color="black"
-    )
-    
-    plt.tight_layout()
-    output_file = os.path.join(output_dir, f"chi2_{normalize_filename(piezometre)}.png")
-    plt.savefig(output_file)
-    plt.close()
+    }
+
+if __name__ == '__main__':
+    # Charger les données nettoyées avec les colonnes ajoutées
+    with stage('chi2.lecture') as m:
+        data = pd.read_csv('./data/data_cleaned_outliers.csv')
+        m.rows = len(data)
+
+    # Créer un dossier pour enregistrer les visualisations
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Effectuer le test Chi-deux pour chaque piézomètre (en parallèle)
+    with stage('chi2.tests', rows=len(data)):
+        results = run_per_piezometre(chi2_piezometre, data)
+
+    # Visualisation des tables de contingence (rendu en parallèle, graphiques inchangés ignorés)
+    statistics = dict(results)
+    jobs = [
+        RenderJob(os.path.join(output_dir, f"chi2_{normalize_filename(piezometre)}.png"), plot_contingency,
+                  pd.crosstab(piezo_data['type_averse'], piezo_data['niveau_categorise']),
+                  {'piezometre': piezometre, 'chi2': statistics[piezometre]['chi2'],
+                   'p': statistics[piezometre]['p_value']})
+        for piezometre, piezo_data in split_by_piezometre(data)
+    ]
+    rendered = render_all(jobs)
+    print(f"Graphiques Chi-deux : {rendered['rendered']} générés, {rendered['skipped']} inchangés.")
 
-# Sauvegarder les résultats dans un fichier CSV
-chi2_results_df = pd.DataFrame(chi2_results)
-chi2_results_file = os.path.join('./assets', 'chi2_results.csv')
-chi2_results_df.to_csv(chi2_results_file, index=False)
+    # Sauvegarder les résultats dans un fichier CSV (ordre déterministe)
+    chi2_results_df = collect_records(results, sort_by=['piezometre'])
+    chi2_results_file = os.path.join('./assets', 'chi2_results.csv')
+    chi2_results_df.to_csv(chi2_results_file, index=False)
 
-print(f"Les résultats des tests Chi-deux ont été sauvegardés dans '{chi2_results_file}'.")
\ No newline at end of file
+    print(f"Les résultats des tests Chi-deux ont été sauvegardés dans '{chi2_results_file}'.")
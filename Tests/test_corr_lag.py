@@ -1,89 +1,118 @@
 import pandas as pd
 from scipy.stats import spearmanr
-import matplotlib.pyplot as plt
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.cache import ResultCache
+from Pipeline.render import RenderJob, render_all
+from Pipeline.storage import read_table
+from Visualize_data.ccf import lag_scan
+
+# Lags explorés par le balayage (jours) : jusqu'à 6 mois pour les nappes à réponse lente
+SCAN_MAX_LAG = 180
 
 # Fonction pour normaliser les noms de fichiers
 def normalize_filename(name):
     """Remplace les espaces et caractères spéciaux par des underscores."""
     return name.replace(" ", "_").replace("-", "_").replace("/", "_").replace("(", "").replace(")", "")
 
-# Charger les données nettoyées
-data = pd.read_csv('./data/data_with_lags15.csv')
+# Texte des résultats affiché sur les graphiques
+def annotation(correlation, p_value, lag):
+    return f"Corrélation : {correlation:.4f}\nP-value : {p_value:.4f}\nLag optimal : {lag}"
+
+# Scatterplot avec annotations
+def plot_scatter(fig, piezo_data, piezometre, lag, correlation, p_value):
+    ax = fig.add_subplot()
+    ax.scatter(piezo_data[f'RR_lag{lag}'], piezo_data['niveau_nappe_eau'], alpha=0.6, label=f"Lag {lag}")
+    ax.set_title(f"Relation entre précipitations décalées et niveau des nappes\n(Piézomètre : {piezometre})")
+    ax.set_xlabel(f"Précipitations décalées (RR_lag{lag})")
+    ax.set_ylabel("Niveau des nappes (mètre NGF)")
+    ax.legend()
+    ax.grid()
+    ax.text(0.95, 0.05, annotation(correlation, p_value, lag), fontsize=10, transform=ax.transAxes,
+            verticalalignment='bottom', horizontalalignment='right',
+            bbox=dict(boxstyle="round", facecolor="white", alpha=0.8))
 
-# Charger les lags optimaux par piézomètre
-optimal_lags = pd.read_csv('./assets/max_corr_lags.csv')  # Fichier contenant les colonnes 'nom_piezo' et 'lag'
+# Courbes temporelles avec annotations (données triées par date)
+def plot_temporal(fig, piezo_data, piezometre, lag, correlation, p_value):
+    ax1 = fig.add_subplot()
+    ax1.plot(piezo_data['date_mesure'], piezo_data['niveau_nappe_eau'], label='Niveau des nappes', color='blue')
+    ax1.set_ylabel('Niveau des nappes (mètre NGF)', color='blue')
+    ax1.tick_params(axis='y', labelcolor='blue')
+    ax2 = ax1.twinx()
+    ax2.plot(piezo_data['date_mesure'], piezo_data[f'RR_lag{lag}'], label=f'RR_lag{lag}', color='orange')
+    ax2.set_ylabel('Précipitations (mm)', color='orange')
+    ax2.tick_params(axis='y', labelcolor='orange')
+    ax2.text(0.95, 0.95, annotation(correlation, p_value, lag), fontsize=10, transform=ax2.transAxes,
+             verticalalignment='top', horizontalalignment='right',
+             bbox=dict(boxstyle="round", facecolor="white", alpha=0.8))
+    ax2.set_title(f"Évolution temporelle des précipitations décalées et niveau des nappes\n(Piézomètre : {piezometre})")
+    fig.tight_layout()
+    ax2.grid()
 
-# Créer un répertoire pour enregistrer les visualisations
-output_dir = './assets/corr_lag_visualizations'
-os.makedirs(output_dir, exist_ok=True)
+if __name__ == '__main__':
+    # Corrélogrammes de Spearman et de Pearson pour les lags 1..SCAN_MAX_LAG de tous les piézomètres
+    # (chaque série n'est classée qu'une fois), lus directement par le tableau de bord
+    series = read_table('./data/data_cleaned_outliers', columns=['nom_piezo', 'date_mesure', 'niveau_nappe_eau', 'RR'])
+    correlogram = lag_scan(series, x_col='RR', y_col='niveau_nappe_eau', max_lag=SCAN_MAX_LAG)
+    os.makedirs('./assets', exist_ok=True)
+    correlogram.to_csv('./assets/lag_correlogram.csv', index=False)
+    print("Corrélogrammes sauvegardés dans './assets/lag_correlogram.csv'.")
 
-# Itérer sur les piézomètres et leurs lags optimaux
-for _, row in optimal_lags.iterrows():
-    piezometre = row['nom_piezo']
-    lag = int(row['lag'])  # S'assurer que le lag est un entier
+    # Charger les lags optimaux par piézomètre
+    optimal_lags = pd.read_csv('./assets/max_corr_lags.csv')  # Fichier contenant les colonnes 'nom_piezo' et 'lag'
 
-    if lag > 15:
-        print(f"\nPiézomètre : {piezometre}")
-        print(f"Lag optimal : {lag} -> Ignoré car supérieur à 15.")
-        continue
+    # Cache des corrélations déjà calculées (données du piézomètre inchangées)
+    cache = ResultCache()
 
-    lag_column = f'RR_lag{lag}'  # Construire dynamiquement le nom de la colonne
+    # Créer un répertoire pour enregistrer les visualisations
+    output_dir = './assets/corr_lag_visualizations'
+    os.makedirs(output_dir, exist_ok=True)
 
-    # Vérifier si la colonne existe
-    if lag_column not in data.columns:
-        print(f"\nPiézomètre : {piezometre}")
-        print(f"Lag optimal : {lag} -> Colonne {lag_column} absente dans les données.")
-        continue
+    # Itérer sur les piézomètres et leurs lags optimaux ; les graphiques sont rendus ensuite en un lot
+    jobs = []
+    for _, row in optimal_lags.iterrows():
+        piezometre = row['nom_piezo']
+        lag = int(row['lag'])  # S'assurer que le lag est un entier
 
-    # Filtrer les données pour le piézomètre et les colonnes nécessaires
-    piezo_data = data[data['nom_piezo'] == piezometre].dropna(subset=[lag_column, 'niveau_nappe_eau'])
+        if lag > 15:
+            print(f"\nPiézomètre : {piezometre}")
+            print(f"Lag optimal : {lag} -> Ignoré car supérieur à 15.")
+            continue
 
-    if not piezo_data.empty:
-        # Extraire les données pertinentes
-        rr_lag = piezo_data[lag_column]
-        niveau = piezo_data['niveau_nappe_eau']
+        lag_column = f'RR_lag{lag}'  # Construire dynamiquement le nom de la colonne
 
-        # Calculer la corrélation de Spearman pour le lag optimal
-        correlation, p_value = spearmanr(rr_lag, niveau)
+        # Charger uniquement les colonnes nécessaires et les lignes du piézomètre (projection + prédicat)
+        try:
+            piezo_data = read_table(
+                './data/data_with_lags15',
+                columns=['nom_piezo', 'date_mesure', 'niveau_nappe_eau', lag_column],
+                filters=[('nom_piezo', '==', piezometre)]
+            )
+        except (KeyError, ValueError):
+            print(f"\nPiézomètre : {piezometre}")
+            print(f"Lag optimal : {lag} -> Colonne {lag_column} absente dans les données.")
+            continue
+        piezo_data = piezo_data.dropna(subset=[lag_column, 'niveau_nappe_eau'])
 
-        # Scatterplot avec annotations
-        plt.figure(figsize=(10, 6))
-        plt.scatter(rr_lag, niveau, alpha=0.6, label=f"Lag {lag}")
-        plt.title(f"Relation entre précipitations décalées et niveau des nappes\n(Piézomètre : {piezometre})")
-        plt.xlabel(f"Précipitations décalées (RR_lag{lag})")
-        plt.ylabel("Niveau des nappes (mètre NGF)")
-        plt.legend()
-        plt.grid()
-        text = (f"Corrélation : {correlation:.4f}\nP-value : {p_value:.4f}\nLag optimal : {lag}")
-        plt.gca().text(0.95, 0.05, text, fontsize=10, transform=plt.gca().transAxes,
-                       verticalalignment='bottom', horizontalalignment='right',
-                       bbox=dict(boxstyle="round", facecolor="white", alpha=0.8))
-        scatter_path = os.path.join(output_dir, f"scatter_{normalize_filename(piezometre)}_lag{lag}.png")
-        plt.savefig(scatter_path)
-        plt.close()
+        if not piezo_data.empty:
+            # Calculer la corrélation de Spearman pour le lag optimal
+            correlation, p_value = cache.cached(
+                'spearman', piezo_data[[lag_column, 'niveau_nappe_eau']], {'lag': lag},
+                lambda: tuple(spearmanr(piezo_data[lag_column], piezo_data['niveau_nappe_eau']))
+            )
+            params = {'piezometre': piezometre, 'lag': lag, 'correlation': correlation, 'p_value': p_value}
+            piezo_data = piezo_data.sort_values(by='date_mesure')  # Assurer l'ordre chronologique
+            plotted = piezo_data[['date_mesure', 'niveau_nappe_eau', lag_column]].reset_index(drop=True)
+            jobs.append(RenderJob(os.path.join(output_dir, f"scatter_{normalize_filename(piezometre)}_lag{lag}.png"),
+                                  plot_scatter, plotted[[lag_column, 'niveau_nappe_eau']], params))
+            jobs.append(RenderJob(os.path.join(output_dir, f"temporal_{normalize_filename(piezometre)}_lag{lag}.png"),
+                                  plot_temporal, plotted, params, figsize=(12, 6)))
+        else:
+            print(f"\nPiézomètre : {piezometre}")
+            print(f"Lag optimal : {lag}")
+            print("Aucune donnée disponible après filtrage.")
 
-        # Courbes temporelles avec annotations
-        piezo_data = piezo_data.sort_values(by='date_mesure')  # Assurer l'ordre chronologique
-        fig, ax1 = plt.subplots(figsize=(12, 6))
-        ax1.plot(piezo_data['date_mesure'], niveau, label='Niveau des nappes', color='blue')
-        ax1.set_ylabel('Niveau des nappes (mètre NGF)', color='blue')
-        ax1.tick_params(axis='y', labelcolor='blue')
-        ax2 = ax1.twinx()
-        ax2.plot(piezo_data['date_mesure'], rr_lag, label=f'RR_lag{lag}', color='orange')
-        ax2.set_ylabel('Précipitations (mm)', color='orange')
-        ax2.tick_params(axis='y', labelcolor='orange')
-        text = (f"Corrélation : {correlation:.4f}\nP-value : {p_value:.4f}\nLag optimal : {lag}")
-        plt.gca().text(0.95, 0.95, text, fontsize=10, transform=plt.gca().transAxes,
-                       verticalalignment='top', horizontalalignment='right',
-                       bbox=dict(boxstyle="round", facecolor="white", alpha=0.8))
-        plt.title(f"Évolution temporelle des précipitations décalées et niveau des nappes\n(Piézomètre : {piezometre})")
-        fig.tight_layout()
-        plt.grid()
-        temporal_path = os.path.join(output_dir, f"temporal_{normalize_filename(piezometre)}_lag{lag}.png")
-        plt.savefig(temporal_path)
-        plt.close()
-    else:
-        print(f"\nPiézomètre : {piezometre}")
-        print(f"Lag optimal : {lag}")
-        print("Aucune donnée disponible après filtrage.")
\ No newline at end of file
+    # Graphiques rendus en parallèle ; ceux dont les données n'ont pas changé ne sont pas régénérés
+    rendered = render_all(jobs)
+    print(f"Graphiques des lags : {rendered['rendered']} générés, {rendered['skipped']} inchangés.")
@@ -1,111 +1,109 @@
 import pandas as pd
-import numpy as np
 from scipy.stats import spearmanr
-import matplotlib.pyplot as plt
 from sklearn.preprocessing import MinMaxScaler
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.cache import process_cache
+from Pipeline.render import RenderJob, render_all
+from Pipeline.runner import collect_records, run_per_piezometre, split_by_piezometre
+from Traitement_Data.categorisation import classify_rainfall_quantiles
 
 # Fonction pour normaliser les noms de fichiers
 def normalize_filename(name):
     """Remplace les espaces et caractères spéciaux par des underscores."""
     return name.replace(" ", "_").replace("-", "_").replace("/", "_").replace("(", "").replace(")", "")
 
-# Charger les données nettoyées
-data = pd.read_csv('./data/data_cleaned_outliers.csv')
+# Types d'averse, dans l'ordre des résultats
+TYPES_AVERSE = ["légère/nulle", "modérée", "forte", "très forte"]
 
-# Créer un dossier pour enregistrer les visualisations
-output_dir = './assets/correlation_visualizations'
-os.makedirs(output_dir, exist_ok=True)
-
-piezometres = data['nom_piezo'].unique()
-
-# -----------------------------
-# Corrélation de Spearman par type d'averse
-# -----------------------------
-results = []
-
-for piezometre in piezometres:
-    piezo_data = data[data['nom_piezo'] == piezometre]
-
-    # Exclure les valeurs de RR égales à 0
-    rr_non_zero = piezo_data[piezo_data['RR'] > 0]['RR']
-
-    # Calculer les quantiles uniquement pour les RR > 0
-    quantiles = rr_non_zero.quantile([0.25, 0.5, 0.75])
-
-    # Ajuster les seuils pour éviter les duplications
-    thresholds = quantiles.unique()
-    if len(thresholds) < 3:
-        thresholds = np.linspace(rr_non_zero.min(), rr_non_zero.max(), num=4)
-
-    # Créer les bins
-    bins = [-np.inf] + list(thresholds) + [np.inf]
-
-    # Reclassification des types d'averses
-    piezo_data['type_averse'] = pd.cut(
-        piezo_data['RR'],
-        bins=bins,
-        labels=["légère/nulle", "modérée", "forte", "très forte"],
-        duplicates="drop"
+# Nuage de points pour un piézomètre et un type d'averse
+def plot_scatter(fig, filtered_data, piezometre, type_averse):
+    ax = fig.add_subplot()
+    ax.scatter(
+        filtered_data['RR_normalized'], 
+        filtered_data['niveau_diff_normalized'], 
+        alpha=0.5, label=type_averse
     )
+    ax.set_title(f"Relation entre précipitations et variation du niveau des nappes\n(Piézomètre : {piezometre}, Type d'averse : {type_averse})")
+    ax.set_xlabel("Précipitations (RR normalisé)")
+    ax.set_ylabel("Variation du niveau des nappes (normalisé)")
+    ax.legend()
+    ax.grid()
+
+# Corrélation de Spearman par type d'averse pour un piézomètre
+def correlations_piezometre(piezometre, piezo_data):
+    results = []
+    for type_averse in TYPES_AVERSE:
+        filtered_data = piezo_data[piezo_data['type_averse_quantile'] == type_averse]
 
-    # Calcul des corrélations par type d'averse
-    for type_averse in ["légère/nulle", "modérée", "forte", "très forte"]:
-        filtered_data = piezo_data[piezo_data['type_averse'] == type_averse]
-        
         if len(filtered_data) > 1:
             rr = filtered_data['RR']
             niveau_nappe = filtered_data['niveau_nappe_eau']
-            
-            # Calculer la corrélation de Spearman
-            correlation, p_value = spearmanr(rr, niveau_nappe)
-            
+
+            # Calculer la corrélation de Spearman (relue depuis le cache si les données n'ont pas changé)
+            correlation, p_value = process_cache().cached(
+                'spearman', filtered_data[['RR', 'niveau_nappe_eau']],
+                {'type_averse': type_averse, 'binning': 'quantiles'},
+                lambda: tuple(spearmanr(rr, niveau_nappe))
+            )
+
             results.append({
                 'piezometre': piezometre,
                 'type_averse': type_averse,
                 'correlation': correlation,
                 'p_value': p_value
             })
-
-# Sauvegarder les résultats dans un fichier CSV
-results_df = pd.DataFrame(results)
-results_file = os.path.join(output_dir, 'correlation_results.csv')
-results_df.to_csv(results_file, index=False)
-print(f"Les résultats de corrélation ont été sauvegardés dans {results_file}")
-
-# -----------------------------
-# Scatterplot par type d'averse
-# -----------------------------
-scaler = MinMaxScaler()
-data['niveau_diff'] = data.groupby('nom_piezo')['niveau_nappe_eau'].diff()
-data = data.dropna(subset=['niveau_diff'])
-data[['RR_normalized', 'niveau_diff_normalized']] = scaler.fit_transform(data[['RR', 'niveau_diff']])
-
-# Scatterplot pour chaque type d'averse
-for piezometre in piezometres:
-    piezo_data = data[data['nom_piezo'] == piezometre]
-    for type_averse in ["légère/nulle", "modérée", "forte", "très forte"]:
-        filtered_data = piezo_data[piezo_data['type_averse'] == type_averse]
-        
-        if not filtered_data.empty:
-            plt.figure(figsize=(10, 6))
-            plt.scatter(
-                filtered_data['RR_normalized'], 
-                filtered_data['niveau_diff_normalized'], 
-                alpha=0.5, label=type_averse
-            )
-            plt.title(f"Relation entre précipitations et variation du niveau des nappes\n(Piézomètre : {piezometre}, Type d'averse : {type_averse})")
-            plt.xlabel("Précipitations (RR normalisé)")
-            plt.ylabel("Variation du niveau des nappes (normalisé)")
-            plt.legend()
-            plt.grid()
-            
-            # Normaliser les noms pour éviter les problèmes
-            safe_piezometre = normalize_filename(piezometre)
-            safe_type_averse = normalize_filename(type_averse)
-            
-            scatter_path = os.path.join(output_dir, f"scatter_{safe_piezometre}_{safe_type_averse}.png")
-            plt.savefig(scatter_path)
-            plt.close()
-
-print(f"Toutes les visualisations ont été sauvegardées dans {output_dir}")
\ No newline at end of file
+    return results
+
+if __name__ == '__main__':
+    # Charger les données nettoyées
+    data = pd.read_csv('./data/data_cleaned_outliers.csv')
+
+    # Créer un dossier pour enregistrer les visualisations
+    output_dir = './assets/correlation_visualizations'
+    os.makedirs(output_dir, exist_ok=True)
+
+    # -----------------------------
+    # Corrélation de Spearman par type d'averse
+    # -----------------------------
+    # Reclassification des types d'averses selon les quantiles (25 %, 50 %, 75 %) des jours de pluie
+    # (RR > 0) de chaque piézomètre, calculée en une seule passe vectorisée
+    data['type_averse_quantile'] = classify_rainfall_quantiles(data['RR'], data['nom_piezo'])
+
+    # Corrélations de chaque piézomètre (en parallèle)
+    results = run_per_piezometre(correlations_piezometre, data)
+
+    # Sauvegarder les résultats dans un fichier CSV
+    results_df = collect_records(results)
+    results_file = os.path.join(output_dir, 'correlation_results.csv')
+    results_df.to_csv(results_file, index=False)
+    print(f"Les résultats de corrélation ont été sauvegardés dans {results_file}")
+
+    # -----------------------------
+    # Scatterplot par type d'averse
+    # -----------------------------
+    scaler = MinMaxScaler()
+    data['niveau_diff'] = data.groupby('nom_piezo')['niveau_nappe_eau'].diff()
+    data = data.dropna(subset=['niveau_diff'])
+    data[['RR_normalized', 'niveau_diff_normalized']] = scaler.fit_transform(data[['RR', 'niveau_diff']])
+
+    # Scatterplot pour chaque type d'averse (rendu en parallèle, graphiques inchangés ignorés)
+    jobs = []
+    for piezometre, piezo_data in split_by_piezometre(data):
+        for type_averse in TYPES_AVERSE:
+            filtered_data = piezo_data[piezo_data['type_averse'] == type_averse]
+
+            if not filtered_data.empty:
+                # Normaliser les noms pour éviter les problèmes
+                safe_piezometre = normalize_filename(piezometre)
+                safe_type_averse = normalize_filename(type_averse)
+
+                scatter_path = os.path.join(output_dir, f"scatter_{safe_piezometre}_{safe_type_averse}.png")
+                jobs.append(RenderJob(scatter_path, plot_scatter,
+                                      filtered_data[['RR_normalized', 'niveau_diff_normalized']].reset_index(drop=True),
+                                      {'piezometre': piezometre, 'type_averse': type_averse}))
+
+    rendered = render_all(jobs)
+    print(f"Nuages de points : {rendered['rendered']} générés, {rendered['skipped']} inchangés.")
+    print(f"Toutes les visualisations ont été sauvegardées dans {output_dir}")
@@ -0,0 +1,80 @@
+# test_granger.py
+# Tests de Granger par matrices de Gram : mêmes statistiques F (ssr_ftest) que statsmodels
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.tsa.stattools import grangercausalitytests
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from granger import DIRECTIONS, granger_batch
+
+MAX_LAG = 5
+N_OBS = 120
+
+
+def _frame(name, niveau, rr):
+    return pd.DataFrame({
+        'nom_piezo': name,
+        'date_mesure': pd.date_range('2020-01-01', periods=len(niveau), freq='D'),
+        'niveau_nappe_eau': niveau,
+        'RR': rr,
+    })
+
+
+@pytest.fixture(scope='module')
+def series():
+    rng = np.random.default_rng(42)
+    rr = rng.gamma(0.8, 3.0, N_OBS)
+    # Niveau influencé par la pluie des jours précédents
+    niveau = 100 + np.cumsum(rng.normal(scale=0.2, size=N_OBS)) + 0.05 * np.convolve(rr, np.ones(3), 'full')[:N_OBS]
+    return {
+        'ALEATOIRE': _frame('ALEATOIRE', 50 + rng.normal(size=N_OBS), rng.gamma(0.5, 2.0, N_OBS)),
+        'PLUIE': _frame('PLUIE', niveau, rr),
+        # Aucune pluie sur la période : colonnes de lags de RR colinéaires à l'intercept
+        'SEC': _frame('SEC', niveau, np.zeros(N_OBS)),
+    }
+
+
+@pytest.fixture(scope='module')
+def results(series):
+    # Toutes les séries dans un même lot : la série constante force la pseudo-inverse pour tout le lot
+    shuffled = pd.concat(series.values()).sample(frac=1, random_state=0)
+    return granger_batch(shuffled, MAX_LAG)
+
+
+def _result(results, name, target, cause):
+    rows = results[(results['nom_piezo'] == name) & (results['direction'] == f'{cause} -> {target}')]
+    return rows.sort_values('lag_tested')
+
+
+@pytest.mark.parametrize('name', ['ALEATOIRE', 'PLUIE'])
+@pytest.mark.parametrize('target, cause', DIRECTIONS)
+def test_matches_statsmodels(results, series, name, target, cause):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = grangercausalitytests(series[name][[target, cause]].to_numpy(), MAX_LAG)
+    rows = _result(results, name, target, cause)
+
+    assert rows['lag_tested'].tolist() == list(range(1, MAX_LAG + 1))
+    f_expected = [expected[lag][0]['ssr_ftest'][0] for lag in range(1, MAX_LAG + 1)]
+    df_expected = [expected[lag][0]['ssr_ftest'][2] for lag in range(1, MAX_LAG + 1)]
+    np.testing.assert_allclose(rows['f_stat'], f_expected, rtol=1e-6)
+    np.testing.assert_allclose(rows['df_denom'], df_expected)
+    assert rows['df_num'].tolist() == list(range(1, MAX_LAG + 1))
+
+
+def test_constant_rainfall_uses_pinv(results):
+    # statsmodels refuse ce cas (InfeasibleTestError) : la pluie n'apporte rien au-delà de l'intercept
+    rows = _result(results, 'SEC', 'niveau_nappe_eau', 'RR')
+    np.testing.assert_allclose(rows['f_stat'], 0.0, atol=1e-8)
+    # Degrés de liberté nominaux (rang plein) : n - lag - (2 lag + 1)
+    lags = np.arange(1, MAX_LAG + 1)
+    np.testing.assert_allclose(rows['df_denom'], N_OBS - lags - (2 * lags + 1))
+
+    # Série expliquée constante : résidus nuls, statistique indéfinie
+    rows = _result(results, 'SEC', 'RR', 'niveau_nappe_eau')
+    assert rows['f_stat'].isna().all()
@@ -0,0 +1,106 @@
+# test_hubeau_client.py
+# Client Hub'Eau contre un serveur HTTP local (bouchon) : pagination, relance, mise à jour incrémentale
+# et stockage page par page dans le jeu 'chroniques_piezo'
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'Preparation_Data'))
+from hubeau_client import fetch_chroniques
+from Pipeline.storage import parquet_path, read_table, write_table
+
+CODE_BSS = '09888X0111/LACAN'
+
+# Deux pages : 'qualification' est entièrement vide dans la première (type Arrow 'null')
+MESURES = [
+    {'code_bss': CODE_BSS, 'date_mesure': f'2024-01-0{day}', 'niveau_nappe_eau': 10.0 + day,
+     'profondeur_nappe': 5.0 - day, 'qualification': None if day <= 3 else 'Correcte'}
+    for day in range(1, 7)
+]
+PAGE_SIZE = 3
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Réponses au format de niveaux_nappes/chroniques ; la première requête reçoit un 429."""
+    requests = []
+
+    def do_GET(self):
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        type(self).requests.append(query)
+        if len(type(self).requests) == 1:
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+            return
+
+        rows = [row for row in MESURES if row['code_bss'] == query['code_bss']
+                and row['date_mesure'] >= query.get('date_debut_mesure', '')]
+        page = int(query.get('page', 1))
+        data = rows[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        payload = {'count': len(rows), 'data': data, 'next': None}
+        if page * PAGE_SIZE < len(rows):
+            params = {key: value for key, value in query.items() if key != 'page'}
+            payload['next'] = (f'http://{self.headers["Host"]}/chroniques?'
+                               + '&'.join(f'{key}={value}' for key, value in params.items()) + f'&page={page + 1}')
+        body = json.dumps(payload).encode()
+        self.send_response(206 if payload['next'] else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StubHandler.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+def fetch_into(path, stub_url, since=None):
+    def store_page(page):
+        page['nom_piezo'] = 'LACAN'
+        write_table(page, path, append=True, export_csv=False)
+
+    return fetch_chroniques([CODE_BSS], store_page, since=since, base_url=stub_url, backoff=0)
+
+
+def test_pages_with_null_column_are_stored_with_one_schema(tmp_path, stub_url):
+    path = str(tmp_path / 'chroniques_piezo')
+    assert fetch_into(path, stub_url) == {CODE_BSS: len(MESURES)}
+
+    # Toutes les pages ont le même schéma physique, quel que soit l'ordre des fichiers
+    schemas = {fragment.physical_schema for fragment in ds.dataset(parquet_path(path), format='parquet').get_fragments()}
+    assert len(schemas) == 1
+
+    stored = read_table(path).sort_values('date_mesure').reset_index(drop=True)
+    assert len(stored) == len(MESURES)
+    assert stored['qualification'].tolist()[3:] == ['Correcte'] * 3
+    assert stored['qualification'].isna().sum() == 3
+    assert stored['code_bss'].astype(str).unique().tolist() == [CODE_BSS]
+
+
+def test_incremental_fetch_requests_only_new_dates(tmp_path, stub_url):
+    path = str(tmp_path / 'chroniques_piezo')
+    fetch_into(path, stub_url)
+    last = read_table(path, columns=['date_mesure'], filters=[('code_bss', '==', CODE_BSS)])['date_mesure'].max()
+    assert last == pd.Timestamp('2024-01-06')
+
+    StubHandler.requests = [{}]
+    assert fetch_into(path, stub_url, since={CODE_BSS: last}) == {CODE_BSS: 0}
+    assert StubHandler.requests[-1]['date_debut_mesure'] == '2024-01-07'
+    assert len(read_table(path)) == len(MESURES)
@@ -0,0 +1,23 @@
+# test_kmeans_selection.py
+# Sélection de k sur des piézomètres à très peu de points : pas de score silhouette hors de son domaine
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Visualize_data'))
+from kmeans_selection import select_k
+
+
+@pytest.mark.filterwarnings('ignore')
+@pytest.mark.parametrize('n', [1, 2, 3])
+def test_select_k_on_tiny_inputs(n):
+    X = np.random.default_rng(n).normal(size=(n, 3))
+    selection = select_k(X)
+
+    assert 1 <= selection.k <= n
+    assert len(selection.labels) == n
+    assert set(selection.inertia) == set(range(1, n + 1))
+    # Silhouette calculée uniquement pour 2 <= k < n
+    assert all(2 <= k < n for k in selection.silhouette)
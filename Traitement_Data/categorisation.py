@@ -0,0 +1,71 @@
+# categorisation.py
+# Catégorisation vectorisée des précipitations et des niveaux de nappe
+import numpy as np
+import pandas as pd
+
+# Classes de précipitations utilisées par clean_data.py (bornes supérieures incluses, en mm)
+RAINFALL_BINS = [-np.inf, 0, 10, 30, 50, np.inf]
+RAINFALL_LABELS = ["légère/nulle", "légère", "modérée", "forte", "très forte"]
+
+# Classes de précipitations utilisées par add_lags.py
+AVERSE_BINS = [-np.inf, 0, 5, 20, np.inf]
+AVERSE_LABELS = ["légère/nulle", "modérée", "forte", "très forte"]
+
+# Classes de niveaux par piézomètre (quantiles 33 % et 66 %)
+NIVEAU_QUANTILES = (0.33, 0.66)
+NIVEAU_LABELS = ["bas", "moyen", "haut"]
+
+# Classes de précipitations par quantiles des jours de pluie (Tests/test_corrélation.py)
+RAINFALL_QUANTILES = (0.25, 0.5, 0.75)
+
+
+def classify_rainfall(rr, bins=RAINFALL_BINS, labels=RAINFALL_LABELS):
+    """Classe les précipitations selon des seuils fixes ; retourne une série catégorielle ordonnée."""
+    return pd.cut(rr, bins=bins, labels=labels, right=True, ordered=True)
+
+
+def classify_averse(rr):
+    """Type d'averse avec les seuils de add_lags.py (0 / 5 / 20 mm)."""
+    return classify_rainfall(rr, bins=AVERSE_BINS, labels=AVERSE_LABELS)
+
+
+def _from_thresholds(values, thresholds, labels):
+    """
+    Classe chaque valeur selon ses propres seuils (une ligne de `thresholds` par valeur) :
+    code = nombre de seuils strictement dépassés. Les valeurs manquantes restent NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    codes = (values[:, None] > thresholds).sum(axis=1)
+    codes[np.isnan(values)] = -1
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+
+
+def classify_by_group_quantiles(values, groups, quantiles=NIVEAU_QUANTILES, labels=NIVEAU_LABELS):
+    """
+    Classe des valeurs selon les quantiles calculés pour chaque groupe (par ex. chaque piézomètre).
+    Le calcul se fait par groupby().transform : le résultat est aligné sur l'index d'origine.
+    """
+    grouped = values.groupby(groups, observed=True, sort=False)
+    thresholds = np.column_stack([grouped.transform('quantile', q).to_numpy(dtype=float) for q in quantiles])
+    return pd.Series(_from_thresholds(values, thresholds, labels), index=values.index, name=values.name)
+
+
+def classify_rainfall_quantiles(rr, groups, quantiles=RAINFALL_QUANTILES, labels=AVERSE_LABELS):
+    """
+    Classe les précipitations selon les quantiles des jours de pluie (RR > 0) de chaque groupe.
+    Si les quantiles d'un groupe ne sont pas distincts, des seuils régulièrement espacés
+    entre le minimum et le maximum des jours de pluie sont utilisés à la place.
+    """
+    rainy = rr.where(rr > 0)
+    grouped = rainy.groupby(groups, observed=True, sort=False)
+    thresholds = np.column_stack([grouped.transform('quantile', q).to_numpy(dtype=float) for q in quantiles])
+
+    # Seuils de repli pour les groupes dont les quantiles se confondent
+    duplicated = (np.diff(thresholds, axis=1) <= 0).any(axis=1)
+    if duplicated.any():
+        low = grouped.transform('min').to_numpy(dtype=float)
+        high = grouped.transform('max').to_numpy(dtype=float)
+        steps = np.arange(1, len(quantiles) + 1) / (len(quantiles) + 1)
+        regular = low[:, None] + (high - low)[:, None] * steps
+        thresholds[duplicated] = regular[duplicated]
+    return pd.Series(_from_thresholds(rr, thresholds, labels), index=rr.index, name=rr.name)
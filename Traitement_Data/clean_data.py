@@ -1,58 +1,31 @@
-import pandas as pd
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.instrumentation import stage
+from Pipeline.storage import read_table, write_table
+from categorisation import classify_by_group_quantiles, classify_rainfall
 
 # Charger les données avec lags
-data = pd.read_csv('combined_chroniques.csv')
+with stage('nettoyage.lecture') as m:
+    data = read_table('combined_chroniques')
+    m.rows = len(data)
 
-# Supprimer les lignes avec des valeurs manquantes
-data_cleaned = data.dropna()
+with stage('nettoyage.categorisation', rows=len(data)):
+    # Supprimer les lignes avec des valeurs manquantes
+    data_cleaned = data.dropna().copy()
 
-# Ajouter une colonne pour classifier les averses
-def classify_rainfall(rr):
-    if rr == 0:
-        return "légère/nulle"
-    elif rr <= 10:
-        return "légère"
-    elif rr <= 30:
-        return "modérée"
-    elif rr <= 50:
-        return "forte"
-    else:
-        return "très forte"
+    # Ajouter une colonne pour classifier les averses
+    data_cleaned['type_averse'] = classify_rainfall(data_cleaned['RR'])
 
-data_cleaned['type_averse'] = data_cleaned['RR'].apply(classify_rainfall)
-
-# Déterminer les niveaux 'bas', 'moyen', 'haut' pour chaque piézomètre
-def classify_niveau(row, quantiles):
-    if row['niveau_nappe_eau'] <= quantiles['q33']:
-        return "bas"
-    elif row['niveau_nappe_eau'] <= quantiles['q66']:
-        return "moyen"
-    else:
-        return "haut"
-
-# Ajouter une colonne 'niveau_categorise' pour chaque piézomètre
-niveau_labels = []
-for piezometre in data_cleaned['nom_piezo'].unique():
-    # Filtrer les données pour le piézomètre en cours
-    piezo_data = data_cleaned[data_cleaned['nom_piezo'] == piezometre]
-    
-    # Calculer les quantiles pour ce piézomètre
-    quantiles = {
-        'q33': piezo_data['niveau_nappe_eau'].quantile(0.33),
-        'q66': piezo_data['niveau_nappe_eau'].quantile(0.66)
-    }
-    
-    # Classifier les niveaux pour ce piézomètre
-    for index, row in piezo_data.iterrows():
-        niveau_labels.append(classify_niveau(row, quantiles))
-
-# Ajouter les niveaux catégorisés au dataframe nettoyé
-data_cleaned['niveau_categorise'] = niveau_labels
+    # Ajouter une colonne 'niveau_categorise' ('bas', 'moyen', 'haut') selon les quantiles
+    # 33 % et 66 % de chaque piézomètre (alignée sur l'index, quel que soit l'ordre des lignes)
+    data_cleaned['niveau_categorise'] = classify_by_group_quantiles(data_cleaned['niveau_nappe_eau'], data_cleaned['nom_piezo'])
 
 # Afficher les informations sur les niveaux
 print("Distribution des niveaux par catégorie (bas, moyen, haut) :")
 print(data_cleaned['niveau_categorise'].value_counts())
 
 # Enregistrer les données nettoyées
-data_cleaned.to_csv('data_cleaned.csv', index=False)
-print(f"Données nettoyées et sauvegardées dans 'data_cleaned.csv' avec la classification des averses et niveaux.")
\ No newline at end of file
+with stage('nettoyage.ecriture', rows=len(data_cleaned)):
+    write_table(data_cleaned, 'data_cleaned')
+print(f"Données nettoyées et sauvegardées dans 'data_cleaned.parquet' avec la classification des averses et niveaux.")
\ No newline at end of file
@@ -0,0 +1,145 @@
+# features.py
+# Moteur de variables décalées (lags) et glissantes calculées par piézomètre
+import numpy as np
+import pandas as pd
+
+# Spécification déclarative : variables x plage de lags x tailles de fenêtres
+DEFAULT_SPEC = {
+    'lags': {'variables': ['RR', 'TX', 'TN'], 'range': range(1, 16)},
+    'rolling_sum': [
+        {'source': 'RR', 'windows': [3, 7, 15], 'name': 'RR_cum{window}'},
+        {'source': 'is_rainy', 'windows': [3, 7, 15], 'name': 'days_with_rain_{window}'},
+    ],
+}
+
+# Nombre de lignes maximal traité en une fois (borne la mémoire du bloc NumPy)
+BATCH_ROWS = 1_000_000
+
+
+def feature_names(spec, max_lag=None):
+    """Liste ordonnée des colonnes produites par la spécification (lags limités à max_lag)."""
+    names = []
+    for rolling in spec.get('rolling_sum', []):
+        names += [rolling['name'].format(window=w) for w in rolling['windows']]
+    lags = spec.get('lags')
+    if lags:
+        for lag in lags['range']:
+            if max_lag is None or lag <= max_lag:
+                names += [f'{var}_lag{lag}' for var in lags['variables']]
+    return names
+
+
+def _group_starts(codes):
+    """Indice de la première ligne du groupe de chaque ligne (données triées par groupe)."""
+    n = len(codes)
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = codes[1:] != codes[:-1]
+    return np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+
+
+def _fill_block(frame, spec, codes, days=None):
+    """
+    Remplit un bloc NumPy préalloué avec toutes les variables, sans fuite entre piézomètres.
+    Avec `days` (numéros de jour), lags et fenêtres portent sur le calendrier : un jour absent
+    donne un lag NaN et n'entre dans aucune somme, au lieu de décaler les lignes suivantes.
+    """
+    n = len(frame)
+    names = feature_names(spec)
+    block = np.full((n, len(names)), np.nan)
+    positions = np.arange(n)
+    starts = _group_starts(codes)
+    rank_in_group = positions - starts
+    keys = None
+    if days is not None and n:
+        # Clé croissante (piézomètre, jour) : la ligne du jour j - k est retrouvée par recherche dichotomique
+        keys = codes.astype(np.int64) * int(days.max() - days.min() + 1) + (days - days.min())
+
+    col = 0
+    for rolling in spec.get('rolling_sum', []):
+        values = frame[rolling['source']].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        # Sommes cumulées (avec 0 en tête) : somme sur [a, b] = cum[b + 1] - cum[a]
+        cum_sum = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+        cum_count = np.concatenate([[0], np.cumsum(valid)])
+        for window in rolling['windows']:
+            if keys is None:
+                first = np.maximum(positions - window + 1, starts)
+            else:
+                first = np.maximum(np.searchsorted(keys, keys - window + 1, side='left'), starts)
+            sums = cum_sum[positions + 1] - cum_sum[first]
+            counts = cum_count[positions + 1] - cum_count[first]
+            # Équivalent de rolling(window, min_periods=1).sum() : NaN si aucune valeur
+            block[:, col] = np.where(counts > 0, sums, np.nan)
+            col += 1
+
+    lags = spec.get('lags')
+    if lags:
+        sources = [frame[var].to_numpy(dtype=float) for var in lags['variables']]
+        for lag in lags['range']:
+            if keys is None:
+                source, keep = positions - lag, rank_in_group >= lag
+            else:
+                source = np.searchsorted(keys, keys - lag, side='left')
+                keep = (source >= starts) & (keys[np.minimum(source, n - 1)] == keys - lag)
+            source = np.where(keep, source, 0)
+            for values in sources:
+                block[:, col] = np.where(keep, values[source], np.nan)
+                col += 1
+    return pd.DataFrame(block, columns=names, index=frame.index)
+
+
+def iter_feature_batches(data, spec=DEFAULT_SPEC, group_col='nom_piezo', date_col='date_mesure',
+                         batch_rows=BATCH_ROWS):
+    """
+    Trie les données par piézomètre et par date puis produit, lot par lot, les données
+    d'origine complétées des variables. Un lot contient des piézomètres entiers.
+    """
+    data = data.sort_values(by=[group_col, date_col], kind='stable').reset_index(drop=True)
+    codes = pd.factorize(data[group_col])[0]
+    days = None
+    if pd.api.types.is_datetime64_any_dtype(data[date_col]) and not data[date_col].isna().any():
+        days = data[date_col].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    group_edges = np.concatenate([[0], bounds, [len(data)]])
+
+    start = 0
+    while start < len(data):
+        # Étendre le lot piézomètre par piézomètre jusqu'à dépasser le budget de lignes
+        candidates = group_edges[group_edges > start]
+        within = candidates[candidates - start <= batch_rows]
+        stop = within[-1] if len(within) else candidates[0]
+        frame = data.iloc[start:stop]
+        features = _fill_block(frame, spec, codes[start:stop], None if days is None else days[start:stop])
+        yield pd.concat([frame, features], axis=1)
+        start = stop
+
+
+def compute_features(data, spec=DEFAULT_SPEC, group_col='nom_piezo', date_col='date_mesure'):
+    """Calcule toutes les variables en mémoire et retourne un unique DataFrame."""
+    batches = list(iter_feature_batches(data, spec, group_col, date_col, batch_rows=len(data) or 1))
+    if not batches:
+        # Aucune ligne : colonnes d'origine et variables, sans lignes
+        return pd.concat([data.reset_index(drop=True), pd.DataFrame(columns=feature_names(spec), dtype=float)],
+                         axis=1)
+    return pd.concat(batches, ignore_index=True)
+
+
+def _write_csv(frame, path, append):
+    frame.to_csv(path, mode='a' if append else 'w', header=not append, index=False)
+
+
+def write_feature_variants(data, outputs, spec=DEFAULT_SPEC, group_col='nom_piezo', date_col='date_mesure',
+                           batch_rows=BATCH_ROWS, writer=_write_csv):
+    """
+    Écrit plusieurs variantes (par ex. lags 1-7 et 1-15) à partir d'un seul calcul.
+    `outputs` associe une destination au lag maximal à conserver ; chaque lot est
+    transmis à `writer(frame, destination, append)` (CSV par défaut).
+    """
+    base_columns = list(data.columns)
+    columns = {path: base_columns + feature_names(spec, max_lag) for path, max_lag in outputs.items()}
+
+    first = True
+    for batch in iter_feature_batches(data, spec, group_col, date_col, batch_rows):
+        for path, cols in columns.items():
+            writer(batch[cols], path, not first)
+        first = False
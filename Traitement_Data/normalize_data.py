@@ -1,26 +1,39 @@
-import pandas as pd
-from sklearn.preprocessing import MinMaxScaler, StandardScaler
+import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.instrumentation import stage
+from Pipeline.scaling import COLUMNS, METHODS, PiezoScaler
+from Pipeline.storage import read_table, write_table
 
-# Charger les données discrétisées
-data = pd.read_csv('data_cleaned_outliers.csv')
+# Statistiques de normalisation par piézomètre (lues par Pipeline.scaling.read_normalized)
+STATS_FILE = 'scalers.json'
 
-# Sélectionner les colonnes numériques à normaliser
-columns_to_normalize = ['niveau_nappe_eau', 'RR', 'TX', 'TN']
+parser = argparse.ArgumentParser(description="Met à jour les statistiques de normalisation par piézomètre.")
+parser.add_argument('--refit', action='store_true', help="Recalculer les statistiques sur tout l'historique.")
+parser.add_argument('--export', nargs='*', choices=METHODS, default=[],
+                    help="Écrire aussi les données normalisées (data_normalized_<méthode>).")
+args = parser.parse_args()
 
-# MinMaxScaler
-minmax_scaler = MinMaxScaler()
-data_minmax = data.copy()
-data_minmax[columns_to_normalize] = minmax_scaler.fit_transform(data[columns_to_normalize])
+# Charger les données sans valeurs aberrantes
+with stage('normalisation.lecture') as m:
+    data = read_table('data_cleaned_outliers')
+    m.rows = len(data)
 
-# Sauvegarder les données normalisées (MinMaxScaler)
-data_minmax.to_csv('data_normalized_minmax.csv', index=False)
-print("Données normalisées (MinMaxScaler) sauvegardées dans 'data_normalized_minmax.csv'.")
+# Reprendre les statistiques existantes et n'intégrer que les nouvelles mesures
+if os.path.exists(STATS_FILE) and not args.refit:
+    scaler = PiezoScaler.load(STATS_FILE)
+else:
+    scaler = PiezoScaler(COLUMNS)
+new_data = scaler.new_rows(data)
 
-# Z-score (StandardScaler)
-zscore_scaler = StandardScaler()
-data_zscore = data.copy()
-data_zscore[columns_to_normalize] = zscore_scaler.fit_transform(data[columns_to_normalize])
+with stage('normalisation.mise_a_jour', rows=len(new_data)):
+    scaler.partial_fit(new_data)
+scaler.save(STATS_FILE)
+print(f"Statistiques de normalisation mises à jour avec {len(new_data)} nouvelles lignes "
+      f"sur {len(data)} ; sauvegardées dans '{STATS_FILE}'.")
 
-# Sauvegarder les données normalisées (Z-score)
-data_zscore.to_csv('data_normalized_zscore.csv', index=False)
-print("Données normalisées (Z-score) sauvegardées dans 'data_normalized_zscore.csv'.")
\ No newline at end of file
+# Les colonnes normalisées sont calculées à la lecture (read_normalized) ; export complet sur demande
+for method in args.export:
+    write_table(scaler.transform(data, method), f'data_normalized_{method}')
+    print(f"Données normalisées ({method}) sauvegardées dans 'data_normalized_{method}.parquet'.")
@@ -0,0 +1,92 @@
+# outliers.py
+# Détection des valeurs aberrantes par piézomètre (statistiques robustes), en un seul masque vectorisé
+import numpy as np
+import pandas as pd
+
+# Facteur rendant le MAD comparable à un écart-type pour une loi normale (score z modifié d'Iglewicz-Hoaglin)
+MAD_SCALE = 0.6745
+
+# Règles par colonne :
+#   'mad'     : |0.6745 (x - médiane) / MAD| > seuil, médiane et MAD calculées par piézomètre
+#   'rolling' : |x - moyenne glissante| / écart-type glissant > seuil, fenêtre centrée de `window` mesures
+#   'range'   : valeur hors des bornes physiques [min, max]
+DEFAULT_RULES = {
+    'niveau_nappe_eau': {'method': 'rolling', 'window': 365, 'threshold': 4.0},
+    'TX': {'method': 'mad', 'threshold': 3.5},
+    'TN': {'method': 'mad', 'threshold': 3.5},
+    'RR': {'method': 'range', 'min': 0.0},  # RR ne doit jamais être négatif
+}
+
+
+def _mad_flags(values, groups, threshold):
+    grouped = values.groupby(groups, observed=True)
+    median = grouped.transform('median')
+    mad = (values - median).abs().groupby(groups, observed=True).transform('median')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = MAD_SCALE * (values - median) / mad
+    # MAD nul (série constante) : aucun point n'est déclaré aberrant
+    return score.abs().gt(threshold) & mad.gt(0), median, mad
+
+
+def _rolling_flags(values, groups, window, threshold):
+    rolling = values.groupby(groups, observed=True).rolling(window, center=True, min_periods=max(window // 4, 2))
+    mean = rolling.mean().reset_index(level=0, drop=True).reindex(values.index)
+    std = rolling.std().reset_index(level=0, drop=True).reindex(values.index)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = (values - mean) / std
+    return score.abs().gt(threshold) & std.gt(0), mean, std
+
+
+def _range_flags(values, rule):
+    low, high = rule.get('min', -np.inf), rule.get('max', np.inf)
+    return (values < low) | (values > high)
+
+
+def outlier_flags(data, rules=DEFAULT_RULES, group_col='nom_piezo', date_col='date_mesure'):
+    """
+    Un indicateur booléen par règle (colonnes 'outlier_<colonne>'), aligné sur l'index de `data`.
+    Les statistiques sont calculées par piézomètre avec groupby().transform / rolling, sans boucle
+    sur les lignes ; les fenêtres glissantes suivent l'ordre chronologique de chaque piézomètre.
+    """
+    ordered = data.sort_values(by=[group_col, date_col], kind='stable') if date_col in data.columns else data
+    groups = ordered[group_col]
+    flags = {}
+    for col, rule in rules.items():
+        if col not in ordered.columns:
+            continue
+        values = ordered[col].astype(float)
+        method = rule['method']
+        if method == 'mad':
+            flag, _, _ = _mad_flags(values, groups, rule['threshold'])
+        elif method == 'rolling':
+            flag, _, _ = _rolling_flags(values, groups, rule['window'], rule['threshold'])
+        elif method == 'range':
+            flag = _range_flags(values, rule)
+        else:
+            raise ValueError(f"Méthode de détection inconnue pour {col} : {method}")
+        flags[f'outlier_{col}'] = flag.reindex(data.index)
+    return pd.DataFrame(flags, index=data.index)
+
+
+def outlier_report(data, flags, group_col='nom_piezo'):
+    """Rapport par piézomètre et par colonne : nombre de mesures, de valeurs aberrantes et proportion."""
+    counts = flags.groupby(data[group_col], observed=True).agg(['size', 'sum'])
+    report = []
+    for column in flags.columns:
+        part = counts[column].rename(columns={'size': 'n_mesures', 'sum': 'n_aberrantes'})
+        part['colonne'] = column.removeprefix('outlier_')
+        report.append(part.reset_index())
+    report = pd.concat(report, ignore_index=True)
+    report['proportion'] = report['n_aberrantes'] / report['n_mesures']
+    return report[[group_col, 'colonne', 'n_mesures', 'n_aberrantes', 'proportion']]
+
+
+def remove_outliers(data, rules=DEFAULT_RULES, group_col='nom_piezo', date_col='date_mesure'):
+    """
+    Supprime en une seule sélection les lignes signalées par au moins une règle.
+    Retourne (données filtrées, lignes écartées avec leurs indicateurs, rapport par piézomètre).
+    """
+    flags = outlier_flags(data, rules, group_col, date_col)
+    mask = flags.any(axis=1)
+    removed = pd.concat([data[mask], flags[mask]], axis=1)
+    return data[~mask], removed, outlier_report(data, flags, group_col)
@@ -1,48 +1,34 @@
-import pandas as pd
-import numpy as np
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.instrumentation import stage
+from Pipeline.storage import read_table, write_table
+from outliers import DEFAULT_RULES, remove_outliers
 
 # Charger les données nettoyées
-data = pd.read_csv('data_cleaned.csv')
-
-# Détection des valeurs aberrantes avec des seuils spécifiques pour `RR`
-threshold_std = 3  # Seuil d'écart-type pour les autres colonnes
-outliers = {}
-
-# Colonnes à analyser
-columns = ['niveau_nappe_eau', 'RR', 'TX', 'TN']
-
-# Définir des seuils spécifiques pour RR
-rain_categories = {
-    'légère/nulle': (0, 2),
-    'modérée': (2, 10),
-    'forte': (10, 50),
-    'très forte': (50, np.inf)
-}
-
-# Traiter chaque colonne
-for col in columns:
-    if col == 'RR':
-        # Vérification pour `RR` en utilisant les seuils des catégories
-        outliers[col] = data[(data['RR'] < 0)]  # Par exemple, RR ne doit jamais être négatif
-    else:
-        # Pour les autres colonnes, détecter les valeurs aberrantes basées sur l'écart-type
-        mean = data[col].mean()
-        std = data[col].std()
-        outliers[col] = data[(data[col] < mean - threshold_std * std) | (data[col] > mean + threshold_std * std)]
-
-    print(f"\nValeurs aberrantes détectées pour {col} :")
-    print(outliers[col])
-
-# Supprimer les valeurs aberrantes sauf pour les fortes et très fortes averses dans `RR`
-data_cleaned = data.copy()
-for col in outliers.keys():
-    if col == 'RR':
-        # Garder les fortes et très fortes averses
-        data_cleaned = data_cleaned[~((data_cleaned.index.isin(outliers[col].index)) & (data_cleaned['RR'] < 10))]
-    else:
-        # Supprimer les valeurs aberrantes détectées pour les autres colonnes
-        data_cleaned = data_cleaned[~data_cleaned.index.isin(outliers[col].index)]
+with stage('valeurs_aberrantes.lecture') as m:
+    data = read_table('data_cleaned')
+    m.rows = len(data)
+
+# Détection par piézomètre (statistiques robustes, voir outliers.DEFAULT_RULES) :
+#  - niveau_nappe_eau : score z sur une fenêtre glissante (suit la tendance propre à chaque nappe)
+#  - TX, TN : score z modifié (médiane / MAD) du piézomètre
+#  - RR : ne doit jamais être négatif ; les fortes averses ne sont pas des valeurs aberrantes
+# Toutes les règles sont combinées en un seul masque : les lignes sont supprimées en une seule sélection
+with stage('valeurs_aberrantes.detection', rows=len(data)):
+    data_cleaned, removed, report = remove_outliers(data, DEFAULT_RULES)
+
+for col in DEFAULT_RULES:
+    flagged = removed[removed[f'outlier_{col}']] if f'outlier_{col}' in removed.columns else removed.iloc[:0]
+    print(f"\nValeurs aberrantes détectées pour {col} : {len(flagged)}")
+    if len(flagged):
+        print(flagged[['nom_piezo', 'date_mesure', col]])
+
+# Rapport par piézomètre et lignes écartées (avec la ou les règles déclenchées)
+report.to_csv('outliers_report.csv', index=False)
+removed.to_csv('outliers_rows.csv', index=False)
+print(f"\nLignes supprimées : {len(removed)} sur {len(data)} ; rapport sauvegardé dans 'outliers_report.csv'.")
 
 # Sauvegarder les données nettoyées
-data_cleaned.to_csv('data_cleaned_outliers.csv', index=False)
-print("Données sans valeurs aberrantes sauvegardées dans 'data_cleaned_outliers.csv'.")
\ No newline at end of file
+write_table(data_cleaned, 'data_cleaned_outliers')
+print("Données sans valeurs aberrantes sauvegardées dans 'data_cleaned_outliers.parquet'.")
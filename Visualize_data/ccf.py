@@ -0,0 +1,143 @@
+# ccf.py
+# Corrélation croisée normalisée (Pearson) par FFT, sur calendrier journalier avec masquage des trous
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Fenêtre de lags explorée par défaut (jours) : seuls les lags 0..MAX_LAG sont calculés
+MAX_LAG = 15
+
+# Quantile de la loi normale pour la bande de confiance à 95 %
+Z_95 = 1.96
+
+
+def daily_matrix(data, columns, group_col='nom_piezo', date_col='date_mesure'):
+    """
+    Place chaque piézomètre sur un calendrier journalier complet (du premier au dernier jour mesuré).
+    Retourne (noms, dates de début, {colonne: matrice piézomètres x jours}) ; les jours sans
+    mesure valent NaN.
+    """
+    frame = data[[group_col, date_col] + list(columns)].copy()
+    frame[date_col] = pd.to_datetime(frame[date_col], errors='coerce')
+    frame = frame.dropna(subset=[date_col])
+
+    codes, names = pd.factorize(frame[group_col], sort=True)
+    starts = frame.groupby(codes)[date_col].transform('min')
+    days = (frame[date_col] - starts).dt.days.to_numpy()
+    length = int(days.max()) + 1 if len(days) else 0
+
+    matrices = {}
+    for col in columns:
+        matrix = np.full((len(names), length), np.nan)
+        matrix[codes, days] = frame[col].to_numpy(dtype=float)
+        matrices[col] = matrix
+    first_days = frame.groupby(codes)[date_col].min().to_numpy()
+    return list(names), first_days, matrices
+
+
+def _lagged_products(u, v, nfft, max_lag):
+    """sum_t u[t] * v[t - k] pour k = 0..max_lag et pour chaque ligne, calculé par FFT."""
+    spectrum = np.fft.rfft(u, n=nfft, axis=1) * np.conj(np.fft.rfft(v, n=nfft, axis=1))
+    return np.fft.irfft(spectrum, n=nfft, axis=1)[:, :max_lag + 1]
+
+
+def masked_ccf(y, x, max_lag=MAX_LAG):
+    """
+    Corrélation de Pearson entre y[t] et x[t - k] pour k = 0..max_lag, ligne par ligne.
+    Seules les paires où les deux valeurs existent sont utilisées (les trous sont masqués).
+    Retourne (corrélations, nombre de paires), deux matrices lignes x (max_lag + 1).
+    """
+    # Centrer chaque série limite les erreurs d'arrondi sur les sommes calculées par FFT
+    with np.errstate(invalid='ignore'):
+        y = y - np.nanmean(y, axis=1, keepdims=True)
+        x = x - np.nanmean(x, axis=1, keepdims=True)
+    my = (~np.isnan(y)).astype(float)
+    mx = (~np.isnan(x)).astype(float)
+    y0 = np.nan_to_num(y)
+    x0 = np.nan_to_num(x)
+    nfft = 1 << int(np.ceil(np.log2(y.shape[1] + max_lag + 1)))
+
+    n = _lagged_products(my, mx, nfft, max_lag)
+    sy = _lagged_products(y0, mx, nfft, max_lag)
+    sx = _lagged_products(my, x0, nfft, max_lag)
+    syy = _lagged_products(y0 ** 2, mx, nfft, max_lag)
+    sxx = _lagged_products(my, x0 ** 2, nfft, max_lag)
+    sxy = _lagged_products(y0, x0, nfft, max_lag)
+
+    n = np.rint(n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sy * sx / n
+        var_y = syy - sy ** 2 / n
+        var_x = sxx - sx ** 2 / n
+        corr = cov / np.sqrt(var_y * var_x)
+    corr[(n < 3) | (var_y <= 0) | (var_x <= 0)] = np.nan
+    return np.clip(corr, -1.0, 1.0), n.astype(int)
+
+
+def correlogram(data, x_col='RR', y_col='niveau_nappe_eau', max_lag=MAX_LAG,
+                group_col='nom_piezo', date_col='date_mesure'):
+    """
+    Calcule en un seul appel le corrélogramme de tous les piézomètres : une ligne par
+    (piézomètre, lag) avec la corrélation, le nombre de paires et la bande de confiance à 95 %.
+    """
+    names, _, matrices = daily_matrix(data, [x_col, y_col], group_col, date_col)
+    corr, n_pairs = masked_ccf(matrices[y_col], matrices[x_col], max_lag)
+    lags = np.arange(max_lag + 1)
+    with np.errstate(divide='ignore'):
+        band = Z_95 / np.sqrt(n_pairs)
+    return pd.DataFrame({
+        group_col: np.repeat(names, len(lags)),
+        'lag': np.tile(lags, len(names)),
+        'correlation': corr.ravel(),
+        'n_pairs': n_pairs.ravel(),
+        'conf_band': band.ravel(),
+    })
+
+
+def optimal_lags(ccf, group_col='nom_piezo'):
+    """Lag de corrélation maximale par piézomètre, avec sa significativité au seuil de 95 %."""
+    valid = ccf.dropna(subset=['correlation'])
+    best = valid.loc[valid.groupby(group_col)['correlation'].idxmax()].reset_index(drop=True)
+    best['ci_low'] = -best['conf_band']
+    best['ci_high'] = best['conf_band']
+    best['significant'] = best['correlation'].abs() > best['conf_band']
+    return best[[group_col, 'lag', 'correlation', 'n_pairs', 'ci_low', 'ci_high', 'significant']]
+
+
+def _p_values(corr, n_pairs):
+    """P-values bilatérales du test t de nullité de la corrélation (comme spearmanr / pearsonr)."""
+    df = n_pairs - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = corr * np.sqrt(df / ((1.0 - corr) * (1.0 + corr)))
+    return 2 * stats.t.sf(np.abs(t), np.where(df > 0, df, np.nan))
+
+
+def lag_scan(data, x_col='RR', y_col='niveau_nappe_eau', max_lag=MAX_LAG,
+             group_col='nom_piezo', date_col='date_mesure'):
+    """
+    Corrélations de Pearson et de Spearman entre y[t] et x[t - k] pour tous les lags k = 1..max_lag
+    et tous les piézomètres. Chaque série est classée (rangs moyens, trous ignorés) une seule fois,
+    puis la corrélation de Spearman est la corrélation de Pearson des rangs, calculée pour tous les
+    lags par le même produit FFT masqué que la corrélation croisée.
+    Les rangs portent sur la série entière : les valeurs sans paire (bords décalés, trous) ne sont
+    pas retirées du classement, d'où un écart à spearmanr de l'ordre de 1e-3 au plus en pratique.
+    Retourne une ligne par (piézomètre, lag) : nombre de paires, corrélations et p-values.
+    """
+    names, _, matrices = daily_matrix(data, [x_col, y_col], group_col, date_col)
+    y, x = matrices[y_col], matrices[x_col]
+    pearson, n_pairs = masked_ccf(y, x, max_lag)
+    rank_y = pd.DataFrame(y).rank(axis=1).to_numpy()
+    rank_x = pd.DataFrame(x).rank(axis=1).to_numpy()
+    spearman, _ = masked_ccf(rank_y, rank_x, max_lag)
+
+    lags = np.arange(1, max_lag + 1)
+    pearson, spearman, n_pairs = pearson[:, 1:], spearman[:, 1:], n_pairs[:, 1:]
+    return pd.DataFrame({
+        group_col: np.repeat(names, len(lags)),
+        'lag': np.tile(lags, len(names)),
+        'n_pairs': n_pairs.ravel(),
+        'pearson': pearson.ravel(),
+        'pearson_p_value': _p_values(pearson, n_pairs).ravel(),
+        'spearman': spearman.ravel(),
+        'spearman_p_value': _p_values(spearman, n_pairs).ravel(),
+    })
@@ -1,8 +1,13 @@
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import MinMaxScaler
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.runner import run_per_piezometre
 
 # Fonction pour normaliser les noms de fichiers
 def normalize_filename(name):
@@ -12,72 +17,81 @@ def normalize_filename(name):
 # Dossier pour enregistrer les graphiques
 ASSETS_DIR = './assets/clustering_lags'
 
-# Créer le dossier s'il n'existe pas
-os.makedirs(ASSETS_DIR, exist_ok=True)
+# Clustering d'un piézomètre sur son lag optimal ; retourne les moyennes par cluster (None si aucune donnée)
+def cluster_piezometre_lag(piezometre, piezo_data, lags):
+    lag = lags[piezometre]
+    lag_column = f'RR_lag{lag}'  # Construire dynamiquement le nom de la colonne
 
-# Charger les données nettoyées avec les lags
-data = pd.read_csv('./data/data_with_lags15.csv')
+    # Filtrer les données pour les colonnes nécessaires
+    piezo_data = piezo_data.dropna(subset=[lag_column, 'niveau_nappe_eau']).copy()
+    if piezo_data.empty:
+        return None
 
-# Charger les lags optimaux par piézomètre
-optimal_lags = pd.read_csv('./assets/max_corr_lags.csv')  # Fichier contenant 'nom_piezo' et 'lag'
+    # Préparer les données pour le clustering (normalisation propre au piézomètre)
+    scaler = MinMaxScaler()
+    X = scaler.fit_transform(piezo_data[[lag_column, 'niveau_nappe_eau']])
 
-# Initialiser le scaler pour normalisation
-scaler = MinMaxScaler()
+    # Effectuer le clustering KMeans
+    kmeans = KMeans(n_clusters=3, random_state=42)
+    piezo_data['cluster'] = kmeans.fit_predict(X)
 
-# Itérer sur les piézomètres et leurs lags optimaux
-for _, row in optimal_lags.iterrows():
-    piezometre = row['nom_piezo']
-    lag = int(row['lag'])
-    lag_column = f'RR_lag{lag}'  # Construire dynamiquement le nom de la colonne
+    # Visualisation des clusters
+    plt.figure(figsize=(10, 6))
+    plt.scatter(
+        piezo_data[lag_column], piezo_data['niveau_nappe_eau'],
+        c=piezo_data['cluster'], cmap='viridis', alpha=0.6
+    )
+    plt.title(f"Clustering pour {piezometre} (Lag {lag})")
+    plt.xlabel(f"Précipitations décalées (RR_lag{lag})")
+    plt.ylabel("Niveau des nappes (mètre NGF)")
+    plt.colorbar(label="Cluster")
+    plt.grid()
+
+    # Ajouter le centre des clusters au graphique
+    cluster_centers = kmeans.cluster_centers_
+    cluster_centers_unnormalized = scaler.inverse_transform(cluster_centers)
+    for center in cluster_centers_unnormalized:
+        plt.scatter(center[0], center[1], c='red', marker='x', s=100, label="Centroid")
+
+    plt.legend()
+
+    # Normaliser le nom du fichier
+    normalized_piezometre = normalize_filename(piezometre)
+    output_file = f"{ASSETS_DIR}/clustering_{normalized_piezometre}_lag{lag}.png"
+
+    # Enregistrer le graphique
+    plt.savefig(output_file)
+    plt.close()
+
+    # Statistiques descriptives de chaque cluster
+    return piezo_data.groupby('cluster')[[lag_column, 'niveau_nappe_eau']].mean()
+
+if __name__ == '__main__':
+    # Créer le dossier s'il n'existe pas
+    os.makedirs(ASSETS_DIR, exist_ok=True)
+
+    # Charger les données nettoyées avec les lags
+    data = pd.read_csv('./data/data_with_lags15.csv')
+
+    # Charger les lags optimaux par piézomètre
+    optimal_lags = pd.read_csv('./assets/max_corr_lags.csv')  # Fichier contenant 'nom_piezo' et 'lag'
 
     # Ignorer les lags supérieurs à 15 ou les colonnes inexistantes
-    if lag > 15 or lag_column not in data.columns:
-        continue
-
-    # Filtrer les données pour le piézomètre et les colonnes nécessaires
-    piezo_data = data[data['nom_piezo'] == piezometre].dropna(subset=[lag_column, 'niveau_nappe_eau'])
-
-    if not piezo_data.empty:
-        # Préparer les données pour le clustering
-        X = scaler.fit_transform(piezo_data[[lag_column, 'niveau_nappe_eau']])
-
-        # Effectuer le clustering KMeans
-        kmeans = KMeans(n_clusters=3, random_state=42)
-        piezo_data['cluster'] = kmeans.fit_predict(X)
-
-        # Visualisation des clusters
-        plt.figure(figsize=(10, 6))
-        plt.scatter(
-            piezo_data[lag_column], piezo_data['niveau_nappe_eau'], 
-            c=piezo_data['cluster'], cmap='viridis', alpha=0.6
-        )
-        plt.title(f"Clustering pour {piezometre} (Lag {lag})")
-        plt.xlabel(f"Précipitations décalées (RR_lag{lag})")
-        plt.ylabel("Niveau des nappes (mètre NGF)")
-        plt.colorbar(label="Cluster")
-        plt.grid()
-
-        # Ajouter le centre des clusters au graphique
-        cluster_centers = kmeans.cluster_centers_
-        cluster_centers_unnormalized = scaler.inverse_transform(cluster_centers)
-        for center in cluster_centers_unnormalized:
-            plt.scatter(center[0], center[1], c='red', marker='x', s=100, label="Centroid")
-        
-        plt.legend()
-
-        # Normaliser le nom du fichier
-        normalized_piezometre = normalize_filename(piezometre)
-        output_file = f"{ASSETS_DIR}/clustering_{normalized_piezometre}_lag{lag}.png"
-
-        # Enregistrer le graphique
-        plt.savefig(output_file)
-        plt.close()
-
-        # Calculer et afficher les statistiques descriptives pour chaque cluster
-        stats = piezo_data.groupby('cluster')[[lag_column, 'niveau_nappe_eau']].mean()
-        print(f"\nStatistiques descriptives pour le piézomètre {piezometre} (Lag {lag}):")
-        print(stats)
-    else:
-        print(f"\nPiézomètre : {piezometre}")
-        print(f"Lag optimal : {lag}")
-        print("Aucune donnée disponible après filtrage.")
\ No newline at end of file
+    lags = {row['nom_piezo']: int(row['lag']) for _, row in optimal_lags.iterrows()
+            if int(row['lag']) <= 15 and f"RR_lag{int(row['lag'])}" in data.columns}
+
+    # Clustering de chaque piézomètre (en parallèle) : seules les colonnes utilisées sont transmises
+    columns = ['nom_piezo', 'niveau_nappe_eau'] + sorted({f'RR_lag{lag}' for lag in lags.values()})
+    results = dict(run_per_piezometre(cluster_piezometre_lag, data.loc[data['nom_piezo'].isin(lags), columns],
+                                      lags=lags))
+
+    # Afficher les statistiques descriptives pour chaque cluster
+    for piezometre, lag in lags.items():
+        stats = results.get(piezometre)
+        if stats is not None:
+            print(f"\nStatistiques descriptives pour le piézomètre {piezometre} (Lag {lag}):")
+            print(stats)
+        else:
+            print(f"\nPiézomètre : {piezometre}")
+            print(f"Lag optimal : {lag}")
+            print("Aucune donnée disponible après filtrage.")
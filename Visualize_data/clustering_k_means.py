@@ -1,57 +1,35 @@
-import pandas as pd
-import numpy as np
-from sklearn.cluster import KMeans
 from sklearn.preprocessing import MinMaxScaler
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
-from kneed import KneeLocator
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.instrumentation import stage
+from Pipeline.runner import collect_records, run_per_piezometre
+from Pipeline.scaling import read_normalized
+from kmeans_selection import K_RANGE, cluster_summary, select_k
 
-# Charger les données
-data = pd.read_csv('./data/data_normalized_minmax.csv')
+# Dossier 'assets/clustering' (lu par l'application)
+output_dir = './assets/clustering'
 
-# Calculer la variation du niveau d'eau pour chaque piézomètre
-data['niveau_diff'] = data.groupby('nom_piezo')['niveau_nappe_eau'].diff()
+# Clustering K-Means d'un piézomètre avec détermination du nombre optimal de clusters
+def cluster_piezometre(piezometre, piezo_data):
+    piezo_data = piezo_data.copy()
 
-# Supprimer les NaN (causés par le calcul des variations)
-data = data.dropna(subset=['niveau_diff'])
-
-# Normaliser les colonnes nécessaires pour le clustering
-scaler = MinMaxScaler()
-data[['RR_normalized', 'niveau_diff_normalized']] = scaler.fit_transform(data[['RR', 'niveau_diff']])
-
-# Obtenir la liste des piézomètres uniques
-piezometres = data['nom_piezo'].unique()
-
-# Créer le dossier 'assets' s'il n'existe pas déjà
-output_dir = './assets'
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-
-# Tracer un clustering K-Means pour chaque piézomètre avec détermination du nombre optimal de clusters
-for piezometre in piezometres:
-    # Filtrer les données pour le piézomètre en cours
-    piezo_data = data[data['nom_piezo'] == piezometre]
-    
     # Variables pour le clustering
     X = piezo_data[['RR_normalized', 'niveau_diff_normalized']]
-    
-    # Déterminer le nombre optimal de clusters avec la méthode du coude
-    inertia = []
-    k_range = range(1, 10)  # Tester de 1 à 10 clusters
-    for k in k_range:
-        kmeans = KMeans(n_clusters=k, random_state=42)
-        kmeans.fit(X)
-        inertia.append(kmeans.inertia_)
-    
-    # Trouver le "coude"
-    knee = KneeLocator(k_range, inertia, curve="convex", direction="decreasing")
-    optimal_k = knee.knee
+
+    # Balayage de k (démarrage à chaud) et méthode du coude : le modèle retenu est déjà ajusté
+    with stage('clustering.selection_k', rows=len(X)):
+        selection = select_k(X, k_range=K_RANGE, random_state=42)
+    optimal_k = selection.k
     print(f"Nombre optimal de clusters pour le piézomètre {piezometre} : {optimal_k}")
-    
+
     # Tracer la courbe du coude et enregistrer en PNG
     plt.figure(figsize=(8, 6))
-    plt.plot(k_range, inertia, marker='o')
+    plt.plot(list(selection.inertia), list(selection.inertia.values()), marker='o')
     plt.axvline(optimal_k, color='r', linestyle='--', label=f"Optimal k = {optimal_k}")
     plt.title(f"Méthode du coude pour {piezometre}")
     plt.xlabel("Nombre de clusters")
@@ -62,29 +40,27 @@ for piezometre in piezometres:
     plt.savefig(elbow_plot_path)
     print(f"Courbe du coude sauvegardée : {elbow_plot_path}")
     plt.close()
-    
-    # Appliquer K-Means avec le nombre optimal de clusters
-    kmeans = KMeans(n_clusters=optimal_k, random_state=42)
-    piezo_data['cluster'] = kmeans.fit_predict(X)
-    
+
+    piezo_data['cluster'] = selection.labels
+
     # Centroides des clusters
-    centroids = kmeans.cluster_centers_
-    
+    centroids = selection.model.cluster_centers_
+
     # Créer le scatterplot pour le piézomètre en cours et enregistrer en PNG
     plt.figure(figsize=(10, 6))
     sns.scatterplot(
-        x=piezo_data['RR_normalized'], 
-        y=piezo_data['niveau_diff_normalized'], 
-        hue=piezo_data['cluster'], 
-        palette='viridis', 
+        x=piezo_data['RR_normalized'],
+        y=piezo_data['niveau_diff_normalized'],
+        hue=piezo_data['cluster'],
+        palette='viridis',
         alpha=0.7
     )
     plt.scatter(
-        centroids[:, 0], 
-        centroids[:, 1], 
-        c='red', 
-        s=200, 
-        label='Centroids', 
+        centroids[:, 0],
+        centroids[:, 1],
+        c='red',
+        s=200,
+        label='Centroids',
         marker='X'
     )
     plt.title(f"Clustering des précipitations et variations de niveau d'eau pour le piézomètre : {piezometre}")
@@ -96,7 +72,40 @@ for piezometre in piezometres:
     plt.savefig(scatter_plot_path)
     print(f"Scatterplot sauvegardé : {scatter_plot_path}")
     plt.close()
-    
-    # Afficher les statistiques descriptives pour chaque cluster
+
+    # Statistiques descriptives pour chaque cluster
+    summary = cluster_summary(piezo_data, selection.labels, ['RR', 'niveau_diff'])
     print(f"\nStatistiques descriptives pour le piézomètre {piezometre} :")
-    print(piezo_data.groupby('cluster')[['RR', 'niveau_diff']].mean())
\ No newline at end of file
+    print(summary)
+    summary.insert(0, 'nom_piezo', piezometre)
+    summary['k'] = optimal_k
+    summary['silhouette'] = selection.silhouette.get(optimal_k)
+    return summary.to_dict('records')
+
+if __name__ == '__main__':
+    # Charger les données normalisées par piézomètre (min-max, calculé à la lecture)
+    with stage('clustering.lecture') as m:
+        data = read_normalized('./data/data_cleaned_outliers', './data/scalers.json', method='minmax',
+                               columns=['nom_piezo', 'date_mesure', 'niveau_nappe_eau', 'RR', 'TX', 'TN'])
+        m.rows = len(data)
+
+    # Calculer la variation du niveau d'eau pour chaque piézomètre
+    data['niveau_diff'] = data.groupby('nom_piezo')['niveau_nappe_eau'].diff()
+
+    # Supprimer les NaN (causés par le calcul des variations)
+    data = data.dropna(subset=['niveau_diff'])
+
+    # Normaliser les colonnes nécessaires pour le clustering
+    scaler = MinMaxScaler()
+    data[['RR_normalized', 'niveau_diff_normalized']] = scaler.fit_transform(data[['RR', 'niveau_diff']])
+
+    # Créer le dossier de sortie s'il n'existe pas déjà
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Clustering de chaque piézomètre (en parallèle)
+    results = run_per_piezometre(cluster_piezometre, data)
+
+    # Résumé par cluster de tous les piézomètres
+    summary_file = os.path.join(output_dir, 'cluster_summary.csv')
+    collect_records(results, sort_by=['nom_piezo', 'cluster']).to_csv(summary_file, index=False)
+    print(f"Résumé des clusters sauvegardé : {summary_file}")
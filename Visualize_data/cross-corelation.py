@@ -1,56 +1,64 @@
-from scipy.signal import correlate
-import matplotlib.pyplot as plt
 import pandas as pd
-import numpy as np
 import os
+import sys
+from ccf import MAX_LAG, correlogram, optimal_lags
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.instrumentation import stage
+from Pipeline.render import RenderJob, render_all
 
 # Fonction pour normaliser les noms de fichiers
 def normalize_filename(name):
     """Remplace les espaces et caractères spéciaux par des underscores."""
     return name.replace(" ", "_").replace("-", "_").replace("/", "_")
 
-# Charger les données nettoyées
-data = pd.read_csv('./data/data_cleaned_outliers.csv')
-
-# Créer un dossier pour enregistrer les graphiques
-output_dir = './assets/cross_correlation'
-os.makedirs(output_dir, exist_ok=True)
-
-max_corr_lags = {}
-
-for piezometre in data['nom_piezo'].unique():
-    piezo_data = data[data['nom_piezo'] == piezometre].dropna(subset=['RR', 'niveau_nappe_eau'])
-    
-    rr = piezo_data['RR']
-    niveau = piezo_data['niveau_nappe_eau']
-    
-    # Calculer la corrélation croisée
-    corr = correlate(niveau, rr, mode='full')
-    lags = range(-len(niveau) + 1, len(niveau))
-    
-    # Trouver le décalage (lag) avec la corrélation maximale
-    max_corr_lag = lags[np.argmax(corr)]
-    max_corr_lags[piezometre] = max_corr_lag
-    print(f"\nPiézomètre : {piezometre}")
-    print(f"Décalage (lag) avec corrélation maximale : {max_corr_lag}")
-    
-    # Enregistrer le graphique de la corrélation croisée
-    plt.figure(figsize=(10, 6))
-    plt.plot(lags, corr, label="Corrélation croisée")
-    plt.axvline(x=max_corr_lag, color='red', linestyle='--', label=f"Lag max ({max_corr_lag} jours)")
-    plt.title(f"Corrélation croisée entre RR et niveau d'eau\n(Piézomètre : {piezometre})")
-    plt.xlabel("Décalage (jours)")
-    plt.ylabel("Corrélation")
-    plt.legend()
-    plt.grid()
-
-    # Normaliser le nom du fichier
-    normalized_piezometre = normalize_filename(piezometre)
-    output_file = os.path.join(output_dir, f'cross_correlation_{normalized_piezometre}.png')
-    plt.savefig(output_file, dpi=300)
-    plt.close()
-
-# Sauvegarder max_corr_lags dans un fichier CSV
-max_corr_lags_df = pd.DataFrame(max_corr_lags.items(), columns=['nom_piezo', 'lag'])
-max_corr_lags_df.to_csv('./data/max_corr_lags.csv', index=False)
-print("Fichier 'max_corr_lags.csv' sauvegardé avec succès.")
\ No newline at end of file
+# Graphique de la corrélation croisée avec la bande de confiance à 95 %
+def plot_cross_correlation(fig, piezo_ccf, piezometre, max_corr_lag):
+    ax = fig.add_subplot()
+    ax.plot(piezo_ccf['lag'], piezo_ccf['correlation'], marker='o', label="Corrélation croisée (Pearson)")
+    ax.fill_between(piezo_ccf['lag'], -piezo_ccf['conf_band'], piezo_ccf['conf_band'],
+                    color='grey', alpha=0.3, label="Intervalle de confiance à 95 %")
+    if max_corr_lag is not None:
+        ax.axvline(x=max_corr_lag, color='red', linestyle='--', label=f"Lag max ({max_corr_lag} jours)")
+    ax.set_title(f"Corrélation croisée entre RR et niveau d'eau\n(Piézomètre : {piezometre})")
+    ax.set_xlabel("Décalage (jours)")
+    ax.set_ylabel("Corrélation")
+    ax.legend()
+    ax.grid()
+
+if __name__ == '__main__':
+    # Charger les données nettoyées
+    with stage('correlation_croisee.lecture') as m:
+        data = pd.read_csv('./data/data_cleaned_outliers.csv')
+        m.rows = len(data)
+
+    # Créer un dossier pour enregistrer les graphiques
+    output_dir = './assets/cross_correlation'
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Corrélation croisée normalisée (Pearson) de tous les piézomètres en un seul appel :
+    # chaque série est replacée sur un calendrier journalier (trous masqués) et seuls
+    # les lags 0..MAX_LAG jours sont calculés
+    with stage('correlation_croisee.calcul', rows=len(data)):
+        ccf = correlogram(data, x_col='RR', y_col='niveau_nappe_eau', max_lag=MAX_LAG)
+        max_corr_lags = optimal_lags(ccf)
+
+    jobs = []
+    for piezometre, piezo_ccf in ccf.groupby('nom_piezo'):
+        best = max_corr_lags[max_corr_lags['nom_piezo'] == piezometre]
+        max_corr_lag = int(best['lag'].iloc[0]) if not best.empty else None
+        print(f"\nPiézomètre : {piezometre}")
+        print(f"Décalage (lag) avec corrélation maximale : {max_corr_lag}")
+
+        output_file = os.path.join(output_dir, f'cross_correlation_{normalize_filename(piezometre)}.png')
+        jobs.append(RenderJob(output_file, plot_cross_correlation,
+                              piezo_ccf[['lag', 'correlation', 'conf_band']].reset_index(drop=True),
+                              {'piezometre': piezometre, 'max_corr_lag': max_corr_lag}))
+
+    # Graphiques rendus en parallèle ; ceux dont les données n'ont pas changé ne sont pas régénérés
+    rendered = render_all(jobs)
+    print(f"\nGraphiques de corrélation croisée : {rendered['rendered']} générés, {rendered['skipped']} inchangés.")
+
+    # Sauvegarder max_corr_lags dans un fichier CSV (avec corrélation, nombre de paires et bande de confiance)
+    os.makedirs('./assets', exist_ok=True)
+    max_corr_lags.to_csv('./assets/max_corr_lags.csv', index=False)
+    print("Fichier './assets/max_corr_lags.csv' sauvegardé avec succès.")
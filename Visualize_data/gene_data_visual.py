@@ -2,30 +2,17 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.render import RenderJob, render_all
 
 # Fonction pour normaliser les noms de fichiers
 def normalize_filename(name):
     """Remplace les espaces et caractères spéciaux par des underscores."""
     return name.replace(" ", "_").replace("-", "_").replace("/", "_").replace("(", "").replace(")", "")
 
-# Charger les données
-current_dir = os.path.dirname(__file__)
-file_path = os.path.join(current_dir, '..', 'data', 'data_cleaned_outliers.csv')
-data = pd.read_csv(file_path)
-
-# Calculer les niveaux différenciés si besoin
-data['date_mesure'] = pd.to_datetime(data['date_mesure'])
-
-# Créer le dossier pour enregistrer les visualisations
-output_dir = os.path.join(current_dir, '..', 'assets', 'visualizations')
-os.makedirs(output_dir, exist_ok=True)
-
-# Liste des piézomètres
-piezometres = data['nom_piezo'].unique()
-
 # 1. Répartition des précipitations (RR) par type d'averse
-def plot_boxplot_rr(piezometre):
-    piezo_data = data[data['nom_piezo'] == piezometre]
+def plot_boxplot_rr(piezo_data, piezometre):
     fig = px.box(
         piezo_data, 
         x="type_averse", 
@@ -36,12 +23,10 @@ def plot_boxplot_rr(piezometre):
         template="plotly_white"
     )
     fig.update_layout(showlegend=False)
-    output_file = os.path.join(output_dir, f"boxplot_rr_{normalize_filename(piezometre)}.html")
-    fig.write_html(output_file)
+    return fig
 
 # 2. Évolution temporelle des précipitations
-def plot_temporal_rr(piezometre):
-    piezo_data = data[data['nom_piezo'] == piezometre]
+def plot_temporal_rr(piezo_data, piezometre):
     fig = px.line(
         piezo_data, 
         x="date_mesure", 
@@ -50,12 +35,10 @@ def plot_temporal_rr(piezometre):
         labels={'date_mesure': 'Date de mesure', 'RR': 'Précipitations (mm)'},
         template="plotly_white"
     )
-    output_file = os.path.join(output_dir, f"temporal_rr_{normalize_filename(piezometre)}.html")
-    fig.write_html(output_file)
+    return fig
 
 # 3. Évolution temporelle des niveaux de nappes
-def plot_temporal_niveau(piezometre):
-    piezo_data = data[data['nom_piezo'] == piezometre]
+def plot_temporal_niveau(piezo_data, piezometre):
     fig = px.line(
         piezo_data, 
         x="date_mesure", 
@@ -64,12 +47,10 @@ def plot_temporal_niveau(piezometre):
         labels={'date_mesure': 'Date de mesure', 'niveau_nappe_eau': 'Niveau des nappes (mètre NGF)'},
         template="plotly_white"
     )
-    output_file = os.path.join(output_dir, f"temporal_niveau_{normalize_filename(piezometre)}.html")
-    fig.write_html(output_file)
+    return fig
 
 # 4. Diagramme empilé des catégories
-def plot_stacked_categories(piezometre):
-    piezo_data = data[data['nom_piezo'] == piezometre]
+def plot_stacked_categories(piezo_data, piezometre):
     stacked_counts = pd.crosstab(piezo_data['type_averse'], piezo_data['niveau_categorise'])
     fig = go.Figure()
     for niveau in stacked_counts.columns:
@@ -81,18 +62,11 @@ def plot_stacked_categories(piezometre):
         yaxis_title="Nombre d'observations",
         template="plotly_white"
     )
-    output_file = os.path.join(output_dir, f"stacked_categories_{normalize_filename(piezometre)}.html")
-    fig.write_html(output_file)
+    return fig
 
 # 5. Matrice de corrélation
-def plot_correlation_matrix(piezometre):
-    piezo_data = data[data['nom_piezo'] == piezometre]
+def plot_correlation_matrix(piezo_data, piezometre):
     correlation_columns = ['niveau_nappe_eau', 'RR', 'TX', 'TN']
-    
-    # Vérifier si les colonnes nécessaires sont présentes
-    if not set(correlation_columns).issubset(piezo_data.columns):
-        print(f"Les colonnes nécessaires ne sont pas disponibles pour {piezometre}.")
-        return
 
     # Calculer la matrice de corrélation
     corr_matrix = piezo_data[correlation_columns].corr(method='spearman')
@@ -106,16 +80,41 @@ def plot_correlation_matrix(piezometre):
         labels={'color': 'Corrélation'}
     )
 
-    # Enregistrer le graphique en HTML
-    output_file = os.path.join(output_dir, f"correlation_matrix_{normalize_filename(piezometre)}.html")
-    fig.write_html(output_file)
+    return fig
+
+# Graphiques (fichier, fonction, colonnes utilisées) ; tous les HTML du dossier partagent un seul plotly.min.js
+PLOTS = [
+    ('boxplot_rr', plot_boxplot_rr, ['type_averse', 'RR']),
+    ('temporal_rr', plot_temporal_rr, ['date_mesure', 'RR']),
+    ('temporal_niveau', plot_temporal_niveau, ['date_mesure', 'niveau_nappe_eau']),
+    ('stacked_categories', plot_stacked_categories, ['type_averse', 'niveau_categorise']),
+    ('correlation_matrix', plot_correlation_matrix, ['niveau_nappe_eau', 'RR', 'TX', 'TN']),
+]
+
+if __name__ == '__main__':
+    # Charger les données
+    current_dir = os.path.dirname(__file__)
+    file_path = os.path.join(current_dir, '..', 'data', 'data_cleaned_outliers.csv')
+    data = pd.read_csv(file_path)
+
+    # Calculer les niveaux différenciés si besoin
+    data['date_mesure'] = pd.to_datetime(data['date_mesure'])
+
+    # Créer le dossier pour enregistrer les visualisations
+    output_dir = os.path.join(current_dir, '..', 'assets', 'visualizations')
+    os.makedirs(output_dir, exist_ok=True)
 
-# Générer les graphiques pour chaque piézomètre
-for piezometre in piezometres:
-    plot_boxplot_rr(piezometre)
-    plot_temporal_rr(piezometre)
-    plot_temporal_niveau(piezometre)
-    plot_stacked_categories(piezometre)
-    plot_correlation_matrix(piezometre)
+    # Générer les graphiques pour chaque piézomètre (en parallèle, graphiques inchangés ignorés)
+    jobs = []
+    for piezometre, piezo_data in data.groupby('nom_piezo', sort=True):
+        for name, plot, columns in PLOTS:
+            if not set(columns).issubset(piezo_data.columns):
+                print(f"Les colonnes nécessaires ne sont pas disponibles pour {piezometre} ({name}).")
+                continue
+            output_file = os.path.join(output_dir, f"{name}_{normalize_filename(piezometre)}.html")
+            jobs.append(RenderJob(output_file, plot, piezo_data[columns].reset_index(drop=True),
+                                  {'piezometre': piezometre}, kind='plotly'))
+    rendered = render_all(jobs)
+    print(f"Visualisations : {rendered['rendered']} générées, {rendered['skipped']} inchangées.")
 
-print("Les visualisations ont été générées et sauvegardées dans le dossier './assets/visualizations'.")
\ No newline at end of file
+    print("Les visualisations ont été générées et sauvegardées dans le dossier './assets/visualizations'.")
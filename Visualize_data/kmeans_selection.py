@@ -0,0 +1,113 @@
+# kmeans_selection.py
+# Choix du nombre de clusters K-Means : balayage de k avec démarrage à chaud et méthode du coude
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from kneed import KneeLocator
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+# Valeurs de k testées
+K_RANGE = range(1, 10)
+
+# Au-delà de ce nombre de points, MiniBatchKMeans remplace KMeans et l'inertie est estimée sur un échantillon
+MINIBATCH_THRESHOLD = 50_000
+
+# Paramètres de MiniBatchKMeans : grands lots et arrêt dès que les centres se stabilisent
+# (les centres de départ, hérités de k - 1, sont déjà proches de la solution)
+BATCH_SIZE = 16_384
+MINIBATCH_TOL = 1e-4
+
+# Taille des échantillons utilisés pour estimer l'inertie (grands jeux) et le score silhouette
+SAMPLE_SIZE = 10_000
+SILHOUETTE_SAMPLE_SIZE = 2_000
+
+
+@dataclass
+class KSelection:
+    """
+    Résultat de la sélection : k retenu, modèle déjà ajusté, étiquettes, inertie par k et
+    score silhouette (du k retenu, ou de tous les k si aucun coude n'a été trouvé).
+    """
+    k: int
+    model: object
+    labels: np.ndarray
+    inertia: dict = field(default_factory=dict)
+    silhouette: dict = field(default_factory=dict)
+
+
+def _next_centers(X, centers, rng):
+    """Centres de départ pour k + 1 : les k centres précédents plus un point tiré selon D² (k-means++)."""
+    if centers is None:
+        return X[rng.integers(len(X))][None, :]
+    distances = ((X[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+    total = distances.sum()
+    if total <= 0:
+        index = rng.integers(len(X))
+    else:
+        index = rng.choice(len(X), p=distances / total)
+    return np.vstack([centers, X[index]])
+
+
+def select_k(X, k_range=K_RANGE, random_state=42, threshold=MINIBATCH_THRESHOLD):
+    """
+    Ajuste un modèle par valeur de k, chacun initialisé avec les centres du modèle précédent
+    (une seule initialisation par k au lieu de refaire k-means++ de zéro), puis retient k
+    par la méthode du coude sur l'inertie (score silhouette maximal si aucun coude n'est trouvé).
+    Au-delà de `threshold` points, MiniBatchKMeans est utilisé et l'inertie est mesurée sur un
+    échantillon (ramenée à la taille totale).
+    """
+    X = np.asarray(X, dtype=float)
+    rng = np.random.default_rng(random_state)
+    large = len(X) > threshold
+    sample = X[rng.choice(len(X), SAMPLE_SIZE, replace=False)] if large else X
+    k_values = [k for k in k_range if k <= len(X)]
+
+    models, inertia = {}, {}
+    centers = None
+    for k in range(1, max(k_values) + 1):
+        centers = _next_centers(sample, centers, rng)
+        if large:
+            model = MiniBatchKMeans(n_clusters=k, init=centers, n_init=1, batch_size=BATCH_SIZE,
+                                    tol=MINIBATCH_TOL, max_no_improvement=3, compute_labels=False,
+                                    random_state=random_state).fit(X)
+        else:
+            model = KMeans(n_clusters=k, init=centers, n_init=1, random_state=random_state).fit(X)
+        centers = model.cluster_centers_
+        if k in k_values:
+            models[k] = model
+            # score() renvoie l'opposé de l'inertie sur les points fournis
+            inertia[k] = model.inertia_ if not large else -model.score(sample) * len(X) / len(sample)
+
+    def silhouette(k):
+        # Score défini seulement pour 2 <= nombre de clusters < nombre de points
+        if k < 2 or k >= len(sample):
+            return None
+        labels = models[k].predict(sample)
+        if not 2 <= len(np.unique(labels)) < len(sample):
+            return None
+        return silhouette_score(sample, labels, sample_size=min(SILHOUETTE_SAMPLE_SIZE, len(sample)),
+                                random_state=random_state)
+
+    # Le score silhouette (coûteux) n'est calculé pour tous les k que si aucun coude n'est trouvé
+    knee = KneeLocator(list(inertia), list(inertia.values()), curve="convex", direction="decreasing").knee
+    if knee is None:
+        scores = {k: silhouette(k) for k in models}
+        scores = {k: score for k, score in scores.items() if score is not None}
+        knee = max(scores, key=scores.get) if scores else k_values[0]
+    else:
+        scores = {int(knee): silhouette(int(knee))}
+    knee = int(knee)
+    model = models[knee]
+    labels = model.labels_ if not large else model.predict(X)
+    return KSelection(k=knee, model=model, labels=labels, inertia=inertia, silhouette=scores)
+
+
+def cluster_summary(data, labels, columns):
+    """Par cluster : effectif, moyenne et écart type des colonnes demandées."""
+    summary = data[columns].groupby(np.asarray(labels)).agg(['mean', 'std'])
+    summary.columns = [f'{col}_{stat}' for col, stat in summary.columns]
+    summary.insert(0, 'size', pd.Series(labels).value_counts().sort_index().to_numpy())
+    summary.index.name = 'cluster'
+    return summary.reset_index()
@@ -1,60 +1,69 @@
 import pandas as pd
 import plotly.express as px
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.runner import run_per_piezometre
 
 # Fonction pour normaliser les noms de fichiers
 def normalize_filename(name):
     """Remplace les espaces et caractères spéciaux par des underscores."""
     return name.replace(" ", "_").replace("-", "_").replace("/", "_").replace("(", "").replace(")", "")
 
-# Charger les données nettoyées
-current_dir = os.path.dirname(__file__)
-file_path_data = os.path.join(current_dir, '..', 'data', 'data_with_lags15.csv')
-file_path_lags = os.path.join(current_dir, '..', 'data', 'max_corr_lags.csv')
-output_dir = os.path.join(current_dir, '..', 'assets', 'correlation_matrices')
+# Matrice de corrélation d'un piézomètre avec son lag optimal ; retourne False si aucune donnée valide
+def correlation_matrix_piezometre(piezometre, piezo_data, lags, output_dir):
+    lag = lags[piezometre]
+    lag_column = f'RR_lag{lag}'  # Nom de la colonne du lag optimal
 
-# Charger les fichiers
-data = pd.read_csv(file_path_data)
-optimal_lags = pd.read_csv(file_path_lags)
+    piezo_data = piezo_data.dropna(subset=[lag_column, 'niveau_nappe_eau', 'TX', 'TN'])
+    if piezo_data.empty:
+        return False
 
-# Filtrer les lags ne dépassant pas 15 jours
-optimal_lags = optimal_lags[optimal_lags['lag'] <= 15]
+    # Sélectionner les colonnes pour la corrélation
+    correlation_columns = ['niveau_nappe_eau', lag_column, 'TX', 'TN']
+    corr_matrix = piezo_data[correlation_columns].corr(method='spearman')
 
-# Créer un dossier pour les matrices de corrélation
-os.makedirs(output_dir, exist_ok=True)
+    # Visualiser avec Plotly
+    fig = px.imshow(
+        corr_matrix,
+        text_auto=True,
+        color_continuous_scale='viridis',  # Utiliser une colorscale valide
+        title=f"Matrice de corrélation (Lag {lag}) - {piezometre}",
+        labels={'color': 'Corrélation'}
+    )
 
-# Liste des piézomètres
-piezometres = optimal_lags['nom_piezo'].unique()
+    # Sauvegarder chaque matrice au format HTML
+    normalized_name = normalize_filename(piezometre)
+    file_name = f"correlation_matrix_{normalized_name}_lag{lag}.html"
+    fig.write_html(os.path.join(output_dir, file_name))
+    return True
 
-# Générer les matrices de corrélation pour chaque piézomètre
-for _, row in optimal_lags.iterrows():
-    piezometre = row['nom_piezo']
-    lag = int(row['lag'])
-    lag_column = f'RR_lag{lag}'  # Nom de la colonne du lag optimal
+if __name__ == '__main__':
+    # Charger les données nettoyées
+    current_dir = os.path.dirname(__file__)
+    file_path_data = os.path.join(current_dir, '..', 'data', 'data_with_lags15.csv')
+    file_path_lags = os.path.join(current_dir, '..', 'assets', 'max_corr_lags.csv')
+    output_dir = os.path.join(current_dir, '..', 'assets', 'correlation_matrices')
 
-    # Filtrer les données pour le piézomètre
-    piezo_data = data[data['nom_piezo'] == piezometre].dropna(subset=[lag_column, 'niveau_nappe_eau', 'TX', 'TN'])
+    # Charger les fichiers
+    data = pd.read_csv(file_path_data)
+    optimal_lags = pd.read_csv(file_path_lags)
 
-    if not piezo_data.empty:
-        # Sélectionner les colonnes pour la corrélation
-        correlation_columns = ['niveau_nappe_eau', lag_column, 'TX', 'TN']
-        corr_matrix = piezo_data[correlation_columns].corr(method='spearman')
+    # Filtrer les lags ne dépassant pas 15 jours
+    optimal_lags = optimal_lags[optimal_lags['lag'] <= 15]
+    lags = dict(zip(optimal_lags['nom_piezo'], optimal_lags['lag'].astype(int)))
 
-        # Visualiser avec Plotly
-        fig = px.imshow(
-            corr_matrix,
-            text_auto=True,
-            color_continuous_scale='viridis',  # Utiliser une colorscale valide
-            title=f"Matrice de corrélation (Lag {lag}) - {piezometre}",
-            labels={'color': 'Corrélation'}
-        )
+    # Créer un dossier pour les matrices de corrélation
+    os.makedirs(output_dir, exist_ok=True)
 
-        # Sauvegarder chaque matrice au format HTML
-        normalized_name = normalize_filename(piezometre)
-        file_name = f"correlation_matrix_{normalized_name}_lag{lag}.html"
-        fig.write_html(os.path.join(output_dir, file_name))
+    # Générer les matrices de corrélation pour chaque piézomètre (en parallèle) ; seules les colonnes
+    # utilisées sont transmises
+    columns = ['nom_piezo', 'niveau_nappe_eau', 'TX', 'TN'] + sorted({f'RR_lag{lag}' for lag in lags.values()})
+    results = dict(run_per_piezometre(correlation_matrix_piezometre, data.loc[data['nom_piezo'].isin(lags), columns],
+                                      lags=lags, output_dir=output_dir))
 
-    else:
-        print(f"\nPas de données valides pour {piezometre} avec le lag {lag}")
+    for piezometre, lag in lags.items():
+        if not results.get(piezometre):
+            print(f"\nPas de données valides pour {piezometre} avec le lag {lag}")
 
-print(f"Les matrices de corrélation ont été enregistrées dans {output_dir}")
\ No newline at end of file
+    print(f"Les matrices de corrélation ont été enregistrées dans {output_dir}")
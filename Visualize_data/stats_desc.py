@@ -1,20 +1,14 @@
 import pandas as pd
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Pipeline.instrumentation import stage
+from Pipeline.runner import collect_records, run_per_piezometre
 
-# Charger les données nettoyées
-data = pd.read_csv('./data/data_cleaned_outliers.csv')
-
-# Liste des piézomètres uniques
-piezometres = data['nom_piezo'].unique()
-
-# Initialiser un dictionnaire pour stocker les statistiques descriptives
-stats_dict = {}
-
-# Calcul des statistiques descriptives pour chaque piézomètre
-for piezometre in piezometres:
-    piezo_data = data[data['nom_piezo'] == piezometre]
-    
-    # Calcul des statistiques descriptives
-    stats_dict[piezometre] = {
+# Calcul des statistiques descriptives pour un piézomètre
+def describe_piezometre(piezometre, piezo_data):
+    return {
+        'nom_piezo': piezometre,
         'niveau_min': piezo_data['niveau_nappe_eau'].min(),
         'niveau_mean': piezo_data['niveau_nappe_eau'][piezo_data['RR'] > 0].mean(),
         'niveau_max': piezo_data['niveau_nappe_eau'].max(),
@@ -28,12 +22,19 @@ for piezometre in piezometres:
         'RR_max': piezo_data['RR'].max()
     }
 
-# Convertir le dictionnaire en DataFrame pour affichage
-stats_df = pd.DataFrame(stats_dict).transpose()
+if __name__ == '__main__':
+    # Charger les données nettoyées
+    with stage('stats_descriptives.lecture') as m:
+        data = pd.read_csv('./data/data_cleaned_outliers.csv')
+        m.rows = len(data)
+
+    # Calcul des statistiques descriptives pour chaque piézomètre (en parallèle)
+    results = run_per_piezometre(describe_piezometre, data)
+
+    # Convertir les résultats en DataFrame, triés par piézomètre
+    stats_df = collect_records(results, sort_by=['nom_piezo'])
 
-# Sauvegarder les statistiques dans un fichier CSV
-stats_df.reset_index(inplace=True)
-stats_df.rename(columns={'index': 'nom_piezo'}, inplace=True)
-stats_df.to_csv('./assets/stats_descriptives.csv', index=False)
+    # Sauvegarder les statistiques dans un fichier CSV
+    stats_df.to_csv('./assets/stats_descriptives.csv', index=False)
 
-print("Statistiques descriptives par piézomètre sauvegardées dans './assets/stats_descriptives.csv'.")
\ No newline at end of file
+    print("Statistiques descriptives par piézomètre sauvegardées dans './assets/stats_descriptives.csv'.")
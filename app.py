@@ -1,148 +1,157 @@
 import dash
-from dash import dcc, html, Input, Output, dash_table
+from dash import dcc, html, Input, Output, State, MATCH, dash_table
 import os
 import pandas as pd
 
-# Fonction pour normaliser les noms de fichiers
-def normalize_filename(name):
-    """Remplace les espaces et caractères spéciaux par des underscores."""
-    return name.replace(" ", "_").replace("-", "_").replace("/", "_").replace("(", "").replace(")", "")
+from Dashboard.index import AssetIndex
+from Dashboard.tab_cache import TabCache
+from Dashboard import figures, tables
+from Pipeline import on_demand
+from Pipeline.instrumentation import instrumented, register_metrics_endpoint, set_metrics_log, stage
 
-# Créer l'application Dash
-app = dash.Dash(__name__, suppress_callback_exceptions=True)
-server = app.server
+# Dossier des graphiques et résultats CSV produits par le pipeline
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+# Calcul à la demande d'un piézomètre associé à une station mais pas encore traité par le pipeline
+def compute_options(candidates):
+    return [{'label': f"{row.nom_de_piezometre} ({row.code_bss})", 'value': row.code_bss}
+            for row in candidates.itertuples()]
 
 
-# Dossiers contenant les graphiques
-ASSETS_CLUSTER = 'assets/clustering'
-ASSETS_CLUSTER_LAGS = 'assets/clustering_lags'
-ASSETS_CROSS_CORR = 'assets/cross_correlation'
-ASSETS_GENE_VISUAL = './assets/visualizations'
-ASSETS_CORR_MATRICES = 'assets/correlation_matrices'
-
-# Charger les graphiques pour clustering_k_means.py
-def load_clustering_graphs():
-    files = os.listdir(ASSETS_CLUSTER)
-    return [f"/{ASSETS_CLUSTER}/{file}" for file in files if file.endswith('.png')]
-
-# Charger les graphiques pour cluster_k_means_lags.py
-def load_clustering_lags_graphs():
-    files = os.listdir(ASSETS_CLUSTER_LAGS)
-    graph_data = {}
-    for file in files:
-        if file.endswith('.png'):
-            parts = file.replace('clustering_', '').replace('.png', '').split('_lag')
-            piezometre, lag = parts[0], parts[1]
-            piezometre = normalize_filename(piezometre)  # Normaliser le nom du piézomètre
-            if piezometre not in graph_data:
-                graph_data[piezometre] = []
-            graph_data[piezometre].append({'lag': lag, 'path': f"/{ASSETS_CLUSTER_LAGS}/{file}"})
-    return graph_data
-
-# Charger les graphiques pour corrélation croisée
-def load_cross_corr_graphs():
-    files = os.listdir(ASSETS_CROSS_CORR)
-    return [f"/{ASSETS_CROSS_CORR}/{file}" for file in files if file.endswith('.png')]
-
-# Charger les graphiques pour gene_data_visual.py
-def load_gene_visual_graphs():
-    files = os.listdir(ASSETS_GENE_VISUAL)
-    graph_data = {}
-    for file in files:
-        if file.endswith('.html') or file.endswith('.png'):
-            # Extraire et normaliser le nom du piézomètre
-            piezometre = file.replace('boxplot_rr_', '').replace('temporal_rr_', '').replace('temporal_niveau_', '') \
-                            .replace('stacked_categories_', '').replace('correlation_matrix_', '').replace('.html', '').replace('.png', '')
-            piezometre = normalize_filename(piezometre)
-
-            # Ajouter les fichiers au dictionnaire
-            if piezometre not in graph_data:
-                graph_data[piezometre] = []
-            graph_data[piezometre].append(f"/{ASSETS_GENE_VISUAL}/{file}")
-    return graph_data
-
-# Charger les matrices de corrélation (HTML)
-def load_corr_matrices():
-    files = os.listdir(ASSETS_CORR_MATRICES)
-    return [f"{ASSETS_CORR_MATRICES}/{file}" for file in files if file.endswith('.html')]
-
-# Charger les graphiques
-clustering_graphs = load_clustering_graphs()
-clustering_lags_graphs = load_clustering_lags_graphs()
-cross_corr_graphs = load_cross_corr_graphs()
-gene_visual_graphs = load_gene_visual_graphs()
-corr_matrices_graphs = load_corr_matrices()
-piezometres_gene_visual = list(gene_visual_graphs.keys())
-piezometres_lags = list(clustering_lags_graphs.keys())
-
-# Charger les données supplémentaires
-stats_file_path = './assets/stats_descriptives.csv'
-stats_data = pd.read_csv(stats_file_path)
-granger_results_file_path = './assets/granger_results.csv'
-granger_results = pd.read_csv(granger_results_file_path)
-chi2_results_file_path = './assets/chi2_results.csv'
-chi2_results = pd.read_csv(chi2_results_file_path)
-chi2_visualizations_dir = './assets/chi2_visualizations'
-chi2_visualizations = [
-    os.path.join(chi2_visualizations_dir, file)
-    for file in os.listdir(chi2_visualizations_dir) if file.endswith('.png')
-]
-corr_lag_dir = './assets/corr_lag_visualizations'
-corr_lag_visualizations = [
-    os.path.join(corr_lag_dir, file)
-    for file in os.listdir(corr_lag_dir) if file.endswith('.png')
-]
-corr_visualizations_dir = './assets/correlation_visualizations'
-corr_scatter_visualizations = [
-    os.path.join(corr_visualizations_dir, file)
-    for file in os.listdir(corr_visualizations_dir) if file.endswith('.png')
-]
-correlation_results_file = os.path.join(corr_visualizations_dir, 'correlation_results.csv')
-correlation_results = pd.read_csv(correlation_results_file)
-
-# Liste de tous les piézomètres
-all_piezometres = list(stats_data['nom_piezo'].unique())
-
-# Layout de l'application
-app.layout = html.Div([
-    # Onglets
-    dcc.Tabs(id="tabs", value="gene-visual", children=[
-        dcc.Tab(label="Visualisation des Données par Piézomètre", value="gene-visual"),
-        dcc.Tab(label="Statistiques Descriptives par Piézomètre", value="stats-descriptives"),
-        dcc.Tab(label="Clustering (Sans Lags)", value="clustering"),
-        dcc.Tab(label="Tests de Corrélation", value="correlation-tests"),
-        dcc.Tab(label="Corrélation Croisée", value="cross-corr"),
-        dcc.Tab(label="Clustering (Avec Lags)", value="clustering-lags"),
-        dcc.Tab(label="Matrices de Corrélation", value="corr-matrices"),
-        dcc.Tab(label="Tests de Causalité de Granger", value="granger-tests"),
-        dcc.Tab(label="Tests Chi-deux", value="chi2-tests"),
-        dcc.Tab(label="Tests de Corrélation avec Lags", value="corr-lags"),
-    ]),
-    # Dropdown global pour sélectionner un piézomètre
-    html.Div([
-        html.Label("Sélectionnez un Piézomètre", style={'fontSize': '20px', 'marginBottom': '10px'}),
+def compute_section(candidates):
+    return html.Div([
+        html.Label("Calculer un piézomètre non traité", style={'fontSize': '16px', 'marginBottom': '10px'}),
         dcc.Dropdown(
-            id='global-piezometre-dropdown',
-            options=[{'label': piezo, 'value': piezo} for piezo in all_piezometres],
-            value=all_piezometres[0],
-            style={'width': '50%'}
-        )
-    ], style={'textAlign': 'center', 'marginBottom': '20px'}),
-    html.Div(id="tabs-content")
+            id='compute-piezometre',
+            options=compute_options(candidates),
+            style={'width': '50%', 'margin': '0 auto'}
+        ),
+        html.Button("Calculer maintenant", id='compute-button', n_clicks=0, style={'marginTop': '10px'}),
+        html.Div([
+            html.Progress(id='compute-progress', value='0', max='1', style={'width': '30%'}),
+            html.Span(id='compute-progress-label', style={'marginLeft': '10px'}),
+        ]),
+        html.Div(id='compute-status')
+    ], style={'textAlign': 'center', 'marginBottom': '20px'})
+
+
+# Layout de l'application, construit à chaque chargement de page (la liste des piézomètres est lue
+# au premier affichage puis relue si les statistiques descriptives changent)
+def serve_layout(asset_index, candidates=None):
+    all_piezometres = asset_index.piezometres
+    return html.Div([
+        # Onglets
+        dcc.Tabs(id="tabs", value="gene-visual", children=[
+            dcc.Tab(label="Visualisation des Données par Piézomètre", value="gene-visual"),
+            dcc.Tab(label="Statistiques Descriptives par Piézomètre", value="stats-descriptives"),
+            dcc.Tab(label="Clustering (Sans Lags)", value="clustering"),
+            dcc.Tab(label="Tests de Corrélation", value="correlation-tests"),
+            dcc.Tab(label="Corrélation Croisée", value="cross-corr"),
+            dcc.Tab(label="Clustering (Avec Lags)", value="clustering-lags"),
+            dcc.Tab(label="Matrices de Corrélation", value="corr-matrices"),
+            dcc.Tab(label="Tests de Causalité de Granger", value="granger-tests"),
+            dcc.Tab(label="Tests Chi-deux", value="chi2-tests"),
+            dcc.Tab(label="Tests de Corrélation avec Lags", value="corr-lags"),
+        ]),
+        # Dropdown global pour sélectionner un piézomètre
+        html.Div([
+            html.Label("Sélectionnez un Piézomètre", style={'fontSize': '20px', 'marginBottom': '10px'}),
+            dcc.Dropdown(
+                id='global-piezometre-dropdown',
+                options=[{'label': piezo, 'value': piezo} for piezo in all_piezometres],
+                value=all_piezometres[0] if all_piezometres else None,
+                style={'width': '50%'}
+            )
+        ], style={'textAlign': 'center', 'marginBottom': '20px'}),
+        *([compute_section(candidates)] if candidates is not None else []),
+        html.Div(id="tabs-content")
+
+    ])
+
+# Figures générées côté serveur : séries temporelles sous-échantillonnées (LTTB), les autres
+# graphiques à partir de statistiques agrégées, au lieu de fichiers HTML embarquant toutes les données
+def render_figures(selected_piezometre):
+    data = figures.load_piezometre(selected_piezometre)
+    if data.empty:
+        raise ValueError(f"Aucune donnée pour {selected_piezometre}")
+    graph_style = {'height': '600px', 'marginBottom': '20px'}
+    return html.Div([
+        html.H1(f"Visualisation des Données - {selected_piezometre}", style={'textAlign': 'center'}),
+        dcc.Graph(figure=figures.boxplot_rr_figure(selected_piezometre), style=graph_style),
+        *[
+            dcc.Graph(
+                id={'type': 'ts-graph', 'series': column},
+                figure=figures.time_series_figure(selected_piezometre, column),
+                style=graph_style
+            ) for column in figures.TIME_SERIES
+        ],
+        dcc.Graph(figure=figures.stacked_categories_figure(selected_piezometre), style=graph_style),
+        dcc.Graph(figure=figures.correlation_matrix_figure(selected_piezometre), style=graph_style),
+    ])
+
+
+# Table de résultats paginée, triée et filtrée côté serveur : la première page est envoyée avec
+# l'onglet, les suivantes par page_result_table (seules les lignes affichées transitent)
+def result_table(asset_index, table, selected_piezometre):
+    frame = asset_index.frame(table, selected_piezometre)
+    records, page_count = tables.query_page(frame if frame is not None else pd.DataFrame())
+    return dash_table.DataTable(
+        id={'type': 'result-table', 'table': table},
+        columns=[{"name": i, "id": i} for i in asset_index.columns(table)],
+        data=records,
+        page_current=0,
+        page_size=tables.PAGE_SIZE,
+        page_count=page_count,
+        page_action='custom',
+        sort_action='custom',
+        sort_mode='multi',
+        sort_by=[],
+        filter_action='custom',
+        filter_query='',
+        style_table={'overflowX': 'auto'},
+        style_cell={'textAlign': 'center', 'padding': '10px'},
+        style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'},
+    )
+
 
-])
+@instrumented("callback.page_result_table")
+def page_result_table(asset_index, page_current, page_size, sort_by, filter_query, table_id, selected_piezometre):
+    frame = asset_index.frame(table_id['table'], selected_piezometre)
+    if frame is None:
+        return [], 1
+    return tables.query_page(frame, page_current, page_size, sort_by, filter_query)
 
-# Callback pour mettre à jour le contenu selon l'onglet sélectionné
-@app.callback(
-    Output('tabs-content', 'children'),
-    [Input('tabs', 'value'), Input('global-piezometre-dropdown', 'value')]
-)
-def render_tab_content(tab, selected_piezometre):
-    filtered_graphs = []  # Valeur par défaut pour les graphiques filtrés
 
+# Version des fichiers lus par un onglet : dossiers et tables de résultats, plus les données nettoyées
+# pour les figures générées côté serveur
+def tab_version(asset_index, tab):
+    version = asset_index.version(tab)
     if tab == "gene-visual":
-        normalized_piezometre = normalize_filename(selected_piezometre)
-        graphs = gene_visual_graphs.get(normalized_piezometre, [])
+        version += (figures.data_version(),)
+    return version
+
+
+# Contenu de l'onglet sélectionné (relu depuis tab_cache s'il est donné et que les fichiers n'ont pas changé)
+def render_tab_content(asset_index, tab, selected_piezometre, tab_cache=None):
+    # Temps de réponse mesuré par onglet
+    with stage(f"callback.render_tab_content.{tab}"):
+        if tab_cache is None:
+            return _render_tab(asset_index, tab, selected_piezometre)
+        return tab_cache.get_or_render(
+            tab, selected_piezometre, tab_version(asset_index, tab),
+            lambda: _render_tab(asset_index, tab, selected_piezometre)
+        )
+
+
+def _render_tab(asset_index, tab, selected_piezometre):
+    # Chaque dossier ou table consulté est relu s'il a été réécrit par le pipeline
+    if tab == "gene-visual":
+        try:
+            return render_figures(selected_piezometre)
+        except (OSError, KeyError, ValueError):
+            # Données nettoyées indisponibles : on affiche les graphiques pré-générés
+            pass
+        graphs = asset_index.graph_paths("gene-visual", selected_piezometre)
         if graphs:
             return html.Div([
             html.H1(f"Visualisation des Données - {selected_piezometre}", style={'textAlign': 'center'}),
@@ -157,22 +166,13 @@ def render_tab_content(tab, selected_piezometre):
             return html.P(f"Aucun graphique disponible pour {selected_piezometre}.")
     
     elif tab == "stats-descriptives":
-        filtered_data = stats_data[stats_data['nom_piezo'] == selected_piezometre]
         return html.Div([
             html.H1(f"Statistiques Descriptives - {selected_piezometre}", style={'textAlign': 'center'}),
-            dash_table.DataTable(
-                id='stats-table',
-                columns=[{"name": i, "id": i} for i in filtered_data.columns],
-                data=filtered_data.to_dict('records'),
-                style_table={'overflowX': 'auto'},
-                style_cell={'textAlign': 'center', 'padding': '10px'},
-                style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'},
-                page_size=10
-            )
+            result_table(asset_index, "stats", selected_piezometre)
         ])
     
     elif tab == "clustering":
-        filtered_graphs = [graph for graph in clustering_graphs if selected_piezometre in graph]
+        filtered_graphs = asset_index.graph_paths("clustering", selected_piezometre)
         if filtered_graphs:
             return html.Div([
                 html.H1(f"Clustering des précipitations et variations (Sans Lags) - {selected_piezometre}", style={'textAlign': 'center'}),
@@ -184,8 +184,7 @@ def render_tab_content(tab, selected_piezometre):
             return html.P(f"Aucun graphique de clustering disponible pour {selected_piezometre}.")
     
     elif tab == "correlation-tests":
-        normalized_piezometre = normalize_filename(selected_piezometre)
-        scatter_graphs = [graph for graph in corr_scatter_visualizations if normalized_piezometre in graph]
+        scatter_graphs = asset_index.graph_paths("correlation-tests", selected_piezometre)
         if scatter_graphs:
             return html.Div([
             html.H1(f"Tests de Corrélation - {selected_piezometre}", style={'textAlign': 'center'}),
@@ -194,7 +193,7 @@ def render_tab_content(tab, selected_piezometre):
                     html.H3(f"{row['type_averse']}"),
                     html.P(f"Corrélation : {row['correlation']:.4f}, P-value : {row['p_value']:.4e}")
                 ])
-                for _, row in correlation_results[correlation_results['piezometre'] == selected_piezometre].iterrows()
+                for row in asset_index.records("correlation", selected_piezometre)
             ]),
             html.Div([
                 html.Img(src=graph, style={'width': '100%', 'marginBottom': '20px'}) for graph in scatter_graphs
@@ -204,8 +203,7 @@ def render_tab_content(tab, selected_piezometre):
             return html.P(f"Aucun graphique de corrélation disponible pour {selected_piezometre}.")
     
     elif tab == "cross-corr":
-        normalized_piezometre = normalize_filename(selected_piezometre)
-        filtered_graphs = [graph for graph in cross_corr_graphs if normalized_piezometre in graph]
+        filtered_graphs = asset_index.graph_paths("cross-corr", selected_piezometre)
         if filtered_graphs:  # Vérifiez si des graphiques ont été trouvés
             return html.Div([
             html.H1(f"Corrélation Croisée - {selected_piezometre}", style={'textAlign': 'center'}),
@@ -217,13 +215,12 @@ def render_tab_content(tab, selected_piezometre):
             return html.P(f"Aucun graphique de corrélation croisée disponible pour {selected_piezometre}.")
         
     elif tab == "clustering-lags":
-        normalized_piezometre = normalize_filename(selected_piezometre)
-        graphs = clustering_lags_graphs.get(normalized_piezometre, [])
+        graphs = asset_index.graph_paths("clustering-lags", selected_piezometre)
         if graphs:
             return html.Div([
             html.H1(f"Clustering (Avec Lags) - {selected_piezometre}", style={'textAlign': 'center'}),
             html.Div([
-                html.Img(src=graph['path'], style={'width': '100%', 'marginBottom': '20px'})
+                html.Img(src=graph, style={'width': '100%', 'marginBottom': '20px'})
                 for graph in graphs
             ])
         ])
@@ -232,8 +229,7 @@ def render_tab_content(tab, selected_piezometre):
     
     elif tab == "corr-matrices":
         if selected_piezometre:  # Vérifiez que selected_piezometre n'est pas None
-            normalized_piezometre = normalize_filename(selected_piezometre)
-            filtered_graphs = [graph for graph in corr_matrices_graphs if normalized_piezometre in graph]
+            filtered_graphs = asset_index.graph_paths("corr-matrices", selected_piezometre)
             if filtered_graphs:
                 return html.Div([
                 html.H1(f"Matrices de Corrélation - {selected_piezometre}", style={'textAlign': 'center'}),
@@ -248,32 +244,19 @@ def render_tab_content(tab, selected_piezometre):
             return html.P("Veuillez sélectionner un piézomètre pour afficher les matrices de corrélation.")
     
     elif tab == "granger-tests":
-        normalized_piezometre = normalize_filename(selected_piezometre)
-        if 'nom_piezo' in granger_results.columns:
-            filtered_data = granger_results[granger_results['nom_piezo'] == normalized_piezometre]
-            print(selected_piezometre)
-            if not filtered_data.empty:
+        if 'nom_piezo' in asset_index.columns("granger"):
+            if asset_index.frame("granger", selected_piezometre) is not None:
                 return html.Div([
                 html.H1(f"Tests de Causalité de Granger - {selected_piezometre}", style={'textAlign': 'center'}),
-                dash_table.DataTable(
-                    id='granger-table',
-                    columns=[{"name": i, "id": i} for i in filtered_data.columns],
-                    data=filtered_data.to_dict('records'),
-                    style_table={'overflowX': 'auto'},
-                    style_cell={'textAlign': 'center', 'padding': '10px'},
-                    style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'},
-                    page_size=10
-                )
+                result_table(asset_index, "granger", selected_piezometre)
             ])
             else:
-                print(selected_piezometre)
                 return html.P(f"Aucune donnée de Granger disponible pour {selected_piezometre}.")
         else:
             return html.P("Erreur : la colonne 'nom_piezo' est introuvable dans les résultats.")
     
     elif tab == "chi2-tests":
-        normalized_piezometre = normalize_filename(selected_piezometre)
-        filtered_graphs = [graph for graph in chi2_visualizations if normalized_piezometre in graph]
+        filtered_graphs = asset_index.graph_paths("chi2-tests", selected_piezometre)
         if filtered_graphs:
             return html.Div([
             html.H1(f"Tests Chi-deux - {selected_piezometre}", style={'textAlign': 'center'}),
@@ -286,11 +269,12 @@ def render_tab_content(tab, selected_piezometre):
             return html.P(f"Aucun graphique de test Chi-deux disponible pour {selected_piezometre}.")
     
     elif tab == "corr-lags":
-        normalized_piezometre = normalize_filename(selected_piezometre)
-        filtered_graphs = [graph for graph in corr_lag_visualizations if normalized_piezometre in graph]
-        if filtered_graphs:
+        filtered_graphs = asset_index.graph_paths("corr-lags", selected_piezometre)
+        correlogram = asset_index.records("correlogram", selected_piezometre)
+        if filtered_graphs or correlogram:
             return html.Div([
             html.H1(f"Tests de Corrélation avec Lags - {selected_piezometre}", style={'textAlign': 'center'}),
+            *([dcc.Graph(figure=figures.correlogram_figure(selected_piezometre, correlogram))] if correlogram else []),
             html.Div([
                 html.Img(src=graph, style={'width': '100%', 'marginBottom': '20px'}) for graph in filtered_graphs
             ])
@@ -299,7 +283,131 @@ def render_tab_content(tab, selected_piezometre):
             return html.P(f"Aucun graphique de corrélation avec lags disponible pour {selected_piezometre}.")
     
     return html.P("Contenu non disponible pour cet onglet.")
+
+
+# Zoom : la fenêtre sélectionnée est rééchantillonnée à pleine résolution,
+# le double-clic (autorange) revient à la série complète sous-échantillonnée
+@instrumented("callback.zoom_time_series")
+def zoom_time_series(relayout_data, graph_id, selected_piezometre):
+    if not relayout_data or not any(key.startswith('xaxis.') for key in relayout_data):
+        return dash.no_update
+    x_range = figures.relayout_range(relayout_data)
+    return figures.time_series_figure(selected_piezometre, graph_id['series'], x_range=x_range)
+
+
+# Calcul exécuté en arrière-plan ; une demande pour un piézomètre déjà en cours de calcul suit ce calcul.
+# Une fois terminé, la liste des piézomètres est relue, le nouveau piézomètre est sélectionné et retiré
+# des piézomètres à calculer
+@instrumented("callback.compute_now")
+def compute_now(asset_index, jobs, set_progress, code_bss):
+    unchanged = (dash.no_update,) * 4
+    if not code_bss:
+        return ("Sélectionnez un piézomètre à calculer.",) + unchanged
+    result = jobs.run(code_bss, lambda step, total, label: set_progress((step, total, f"{label} ({step}/{total})")))
+    if 'error' in result:
+        return (f"Échec du calcul de {code_bss} : {result['error']}",) + unchanged
+    message = f"{result['nom_piezo']} : {result['rows']} mesures traitées."
+    if result['failed']:
+        message += " Analyses en échec : " + ", ".join(result['failed'])
+    options = [{'label': piezo, 'value': piezo} for piezo in asset_index.piezometres]
+    return (message, options, result['nom_piezo'],
+            compute_options(on_demand.unprocessed(asset_index.piezometres)), None)
+
+
+def create_app(assets_dir=ASSETS_DIR):
+    """
+    Crée l'application sans lire aucun fichier de résultats : l'index des graphiques et des tables
+    est chargé au premier accès (puis rechargé si un fichier change), ce qui garde le démarrage de
+    chaque worker constant quelle que soit la taille des résultats.
+    """
+    # Un processus de longue durée n'écrit pas le journal metrics.jsonl (chaque callback y ajouterait une
+    # ligne sans limite) : les métriques sont exposées sur /metrics, METRICS_LOG=<fichier> réactive le journal
+    set_metrics_log(os.environ.get('METRICS_LOG'))
+
+    with stage('app.demarrage'):
+        # Le bundle plotly.js partagé par les HTML de assets/visualizations est servi, mais pas chargé par la page
+        app = dash.Dash(__name__, suppress_callback_exceptions=True, assets_ignore=r'.*plotly\.min\.js$')
+
+        # Métriques des callbacks (temps, mémoire) au format Prometheus sur /metrics
+        register_metrics_endpoint(app.server)
+
+        asset_index = AssetIndex(assets_dir)
+        app.asset_index = asset_index
+
+        # Calculs à la demande : callback en arrière-plan exécuté hors des workers web (diskcache)
+        jobs = None
+        if on_demand.diskcache is None:
+            print("diskcache n'est pas installé : calcul à la demande désactivé.")
+        else:
+            jobs = on_demand.JobQueue()
+            manager = dash.DiskcacheManager(on_demand.diskcache.Cache(os.path.join(on_demand.JOBS_DIR, 'dash')))
+        app.layout = lambda: serve_layout(
+            asset_index, on_demand.unprocessed(asset_index.piezometres) if jobs is not None else None)
+
+        # Contenu des onglets partagé entre les workers (TTL, nombre d'entrées borné), compteurs
+        # tab_cache.hit / tab_cache.miss sur /metrics
+        tab_cache = TabCache(app.server)
+        app.tab_cache = tab_cache
+
+        # Callback pour mettre à jour le contenu selon l'onglet sélectionné
+        @app.callback(
+            Output('tabs-content', 'children'),
+            [Input('tabs', 'value'), Input('global-piezometre-dropdown', 'value')]
+        )
+        def update_tab_content(tab, selected_piezometre):
+            return render_tab_content(asset_index, tab, selected_piezometre, tab_cache)
+
+        # Page, tri et filtre des tables de résultats
+        @app.callback(
+            Output({'type': 'result-table', 'table': MATCH}, 'data'),
+            Output({'type': 'result-table', 'table': MATCH}, 'page_count'),
+            Input({'type': 'result-table', 'table': MATCH}, 'page_current'),
+            Input({'type': 'result-table', 'table': MATCH}, 'page_size'),
+            Input({'type': 'result-table', 'table': MATCH}, 'sort_by'),
+            Input({'type': 'result-table', 'table': MATCH}, 'filter_query'),
+            State({'type': 'result-table', 'table': MATCH}, 'id'),
+            State('global-piezometre-dropdown', 'value'),
+            prevent_initial_call=True
+        )
+        def update_result_table(page_current, page_size, sort_by, filter_query, table_id, selected_piezometre):
+            return page_result_table(asset_index, page_current, page_size, sort_by, filter_query,
+                                     table_id, selected_piezometre)
+
+        if jobs is not None:
+            @app.callback(
+                Output('compute-status', 'children'),
+                Output('global-piezometre-dropdown', 'options'),
+                Output('global-piezometre-dropdown', 'value'),
+                Output('compute-piezometre', 'options'),
+                Output('compute-piezometre', 'value'),
+                Input('compute-button', 'n_clicks'),
+                State('compute-piezometre', 'value'),
+                background=True,
+                manager=manager,
+                running=[(Output('compute-button', 'disabled'), True, False)],
+                progress=[Output('compute-progress', 'value'), Output('compute-progress', 'max'),
+                          Output('compute-progress-label', 'children')],
+                prevent_initial_call=True
+            )
+            def update_compute(set_progress, n_clicks, code_bss):
+                return compute_now(asset_index, jobs, set_progress, code_bss)
+
+        app.callback(
+            Output({'type': 'ts-graph', 'series': MATCH}, 'figure'),
+            Input({'type': 'ts-graph', 'series': MATCH}, 'relayoutData'),
+            State({'type': 'ts-graph', 'series': MATCH}, 'id'),
+            State('global-piezometre-dropdown', 'value'),
+            prevent_initial_call=True
+        )(zoom_time_series)
+    return app
+
+
+# Point d'entrée WSGI pour un serveur multi-processus, par exemple :
+#   gunicorn app:server --workers 4 --preload
+# (--preload : l'application est créée une fois puis partagée ; les tables sont chargées par chaque worker à la demande)
+app = create_app()
+server = app.server
+
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 8050))  # Par défaut, utilisez le port 8050
-    app.run_server(host='0.0.0.0', port=port)
-    app.run_server(debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get("DASH_DEBUG", "0") == "1")
@@ -0,0 +1,102 @@
+# run_pipeline.py
+# Déclaration des étapes du pipeline et exécution incrémentale
+#   python run_pipeline.py                     -> reconstruit les étapes périmées
+#   python run_pipeline.py granger             -> 'granger' et ses dépendances si elles sont périmées
+#   python run_pipeline.py granger --no-deps   -> 'granger' seule
+import argparse
+
+from Pipeline.dag import Pipeline, Stage
+
+# Les scripts de Preparation_Data et Traitement_Data s'exécutent depuis data/,
+# ceux de Visualize_data et Tests depuis la racine du dépôt
+STAGES = [
+    # Préparation des données
+    Stage('piezometres', 'Preparation_Data/get_piezometre.py', cwd='data',
+          outputs=['selected_piezometres.csv']),
+    Stage('stations_meteo', 'Preparation_Data/get_station_meteo.py', cwd='data',
+          outputs=['stations_meteo.csv']),
+    Stage('associations', 'Preparation_Data/associations_station_piezo.py', cwd='data',
+          inputs=['selected_piezometres.csv', 'stations_meteo.csv', '../Preparation_Data/spatial_index.py'],
+          outputs=['piezometres_association_stations.csv', 'piezometres_association_stations_cleaned.csv']),
+    Stage('chroniques_piezo', 'Preparation_Data/get_chroniques_piezo.py', cwd='data',
+          inputs=['piezometres_association_stations_cleaned.csv', '../Preparation_Data/hubeau_client.py'],
+          outputs=['chroniques_piezo.csv']),
+    Stage('chroniques_station', 'Preparation_Data/get_chroniques_station.py', cwd='data',
+          inputs=['piezometres_association_stations_cleaned.csv',
+                  'Q_34_previous-1950-2023_RR-T-Vent.csv.gz', 'Q_34_latest-2024-2025_RR-T-Vent.csv.gz',
+                  '../Preparation_Data/meteo_stream.py'],
+          outputs=['filtered_stations.csv']),
+    Stage('combinaison', 'Preparation_Data/assiocations_chroniques.py', cwd='data',
+          inputs=['chroniques_piezo.csv', 'filtered_stations.csv', 'piezometres_association_stations.csv',
+                  '../Preparation_Data/alignment.py'],
+          outputs=['combined_chroniques.parquet', 'couverture_chroniques.csv']),
+
+    # Traitement des données
+    Stage('nettoyage', 'Traitement_Data/clean_data.py', cwd='data',
+          inputs=['combined_chroniques.parquet', '../Traitement_Data/categorisation.py'],
+          outputs=['data_cleaned.parquet', 'data_cleaned.csv']),
+    Stage('valeurs_aberrantes', 'Traitement_Data/verify_data.py', cwd='data',
+          inputs=['data_cleaned.parquet', '../Traitement_Data/outliers.py'],
+          outputs=['data_cleaned_outliers.parquet', 'data_cleaned_outliers.csv',
+                   'outliers_report.csv', 'outliers_rows.csv']),
+    Stage('normalisation', 'Traitement_Data/normalize_data.py', cwd='data',
+          inputs=['data_cleaned_outliers.parquet', '../Pipeline/scaling.py'],
+          outputs=['scalers.json']),
+    Stage('lags', 'Traitement_Data/add_lags.py', cwd='data',
+          inputs=['data_cleaned.parquet', '../Traitement_Data/features.py', '../Traitement_Data/categorisation.py'],
+          outputs=['data_with_lags7.csv', 'data_with_lags15.parquet', 'data_with_lags15.csv']),
+
+    # Analyses et visualisations (branches indépendantes exécutées en parallèle)
+    Stage('stats_descriptives', 'Visualize_data/stats_desc.py',
+          inputs=['data/data_cleaned_outliers.csv'],
+          outputs=['assets/stats_descriptives.csv']),
+    Stage('correlation_croisee', 'Visualize_data/cross-corelation.py',
+          inputs=['data/data_cleaned_outliers.csv', 'Visualize_data/ccf.py', 'Pipeline/render.py'],
+          outputs=['assets/max_corr_lags.csv', 'assets/cross_correlation']),
+    Stage('chi2', 'Tests/test_chi-2.py',
+          inputs=['data/data_cleaned_outliers.csv', 'Pipeline/render.py'],
+          outputs=['assets/chi2_results.csv', 'assets/chi2_visualizations']),
+    Stage('granger', 'Tests/test_causa_granger_lags.py',
+          inputs=['data/data_cleaned_outliers.parquet', 'assets/max_corr_lags.csv', 'Tests/granger.py'],
+          outputs=['assets/granger_results.csv']),
+    Stage('correlation_lags', 'Tests/test_corr_lag.py',
+          inputs=['data/data_with_lags15.parquet', 'data/data_cleaned_outliers.parquet', 'assets/max_corr_lags.csv',
+                  'Visualize_data/ccf.py', 'Pipeline/render.py'],
+          outputs=['assets/corr_lag_visualizations', 'assets/lag_correlogram.csv']),
+    Stage('correlation', 'Tests/test_corrélation.py',
+          inputs=['data/data_cleaned_outliers.csv', 'Traitement_Data/categorisation.py', 'Pipeline/render.py'],
+          outputs=['assets/correlation_visualizations/correlation_results.csv']),
+    Stage('clustering', 'Visualize_data/clustering_k_means.py',
+          inputs=['data/data_cleaned_outliers.parquet', 'data/scalers.json', 'Pipeline/scaling.py',
+                  'Visualize_data/kmeans_selection.py'],
+          outputs=['assets/clustering']),
+    Stage('clustering_lags', 'Visualize_data/cluster_k_means_lag.py',
+          inputs=['data/data_with_lags15.csv', 'assets/max_corr_lags.csv'],
+          outputs=['assets/clustering_lags']),
+    Stage('visualisations', 'Visualize_data/gene_data_visual.py',
+          inputs=['data/data_cleaned_outliers.csv', 'Pipeline/render.py'],
+          outputs=['assets/visualizations']),
+    Stage('matrices_correlation', 'Visualize_data/matr_corr_lag.py',
+          inputs=['data/data_with_lags15.csv', 'assets/max_corr_lags.csv'],
+          outputs=['assets/correlation_matrices']),
+]
+
+
+def build_pipeline():
+    return Pipeline(STAGES)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Exécution incrémentale du pipeline piézomètres / météo.")
+    parser.add_argument('stages', nargs='*', help="Étapes à exécuter (avec leurs dépendances) ; toutes par défaut.")
+    parser.add_argument('--force', action='store_true', help="Réexécuter les étapes même si elles sont à jour.")
+    parser.add_argument('--jobs', type=int, default=4, help="Nombre maximal d'étapes exécutées en parallèle.")
+    parser.add_argument('--no-deps', action='store_true', help="Ne pas inclure les dépendances amont des étapes demandées.")
+    parser.add_argument('--dry-run', action='store_true', help="Afficher les étapes à exécuter sans les lancer.")
+    args = parser.parse_args()
+
+    metrics = build_pipeline().run(args.stages, force=args.force, jobs=args.jobs, dry_run=args.dry_run,
+                                     with_deps=not args.no_deps)
+    for result in metrics:
+        print(f"{result['stage']:<22} {result['wall_time_s']:>8} s  "
+              f"CPU {result['cpu_time_s']} s  mémoire max {result['peak_memory_mb']} Mo")